@@ -0,0 +1,147 @@
+# analytics/session_stats.py
+"""
+Vectorized session analytics. Sessions are handled as parallel int64 arrays of
+epoch seconds; hour/day splitting and binning are NumPy ops, so the cost per
+session is a few array elements rather than a Python loop with tz conversions.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+TZ = ZoneInfo("America/Toronto")
+HOUR = 3600
+DAY = 86400
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday (Mon=0)
+
+@dataclass
+class SessionArrays:
+    start: np.ndarray       # int64 epoch seconds, UTC
+    end: np.ndarray         # int64 epoch seconds, UTC
+    task: np.ndarray        # int32 index into task_names
+    task_names: list[str]
+
+@dataclass
+class SessionStats:
+    heatmap: np.ndarray     # (7, 24) hours worked, Mon..Sun x local hour of day
+    days: np.ndarray        # local day numbers (days since epoch) covered by daily_hours
+    daily_hours: np.ndarray
+    task_hours: np.ndarray  # aligned with SessionArrays.task_names
+    total_hours: float
+
+def to_epoch_seconds(values: list[datetime]) -> np.ndarray:
+    """Naive-UTC datetimes (as the driver returns them) -> int64 epoch seconds, in C."""
+    return np.array(values, dtype="datetime64[s]").astype(np.int64)
+
+def utc_offset_table(start_s: int, end_s: int, tz=TZ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return (instants, offsets): offsets[i] (seconds) is the tz's UTC offset from
+    instants[i] onward. One probe per day finds the DST change days, then the
+    change is pinned to the hour, so years of data cost ~365 probes per year
+    instead of one conversion per session.
+    """
+    def offset_at(ts: int) -> int:
+        return int(datetime.fromtimestamp(ts, tz).utcoffset().total_seconds())
+
+    first_day = (start_s // DAY) * DAY
+    instants = [first_day]
+    offsets = [offset_at(first_day)]
+    for day in range(first_day + DAY, end_s + DAY, DAY):
+        off = offset_at(day)
+        if off == offsets[-1]:
+            continue
+        # The change happened within the previous 24h; find the hour it took effect
+        for hour in range(day - DAY + HOUR, day + HOUR, HOUR):
+            if offset_at(hour) == off:
+                instants.append(hour)
+                break
+        offsets.append(off)
+    return np.array(instants, dtype=np.int64), np.array(offsets, dtype=np.int64)
+
+def local_offsets(utc_s: np.ndarray, instants: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    idx = np.searchsorted(instants, utc_s, side="right") - 1
+    return offsets[np.clip(idx, 0, len(offsets) - 1)]
+
+def split_by_hour(start: np.ndarray, end: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Split [start, end) intervals on hour boundaries.
+    Returns (hour, seconds, owner): the hour number (seconds // 3600) of each piece,
+    the seconds of the interval falling in it, and the index of the source interval.
+    """
+    h0 = start // HOUR
+    h1 = (end - 1) // HOUR
+    counts = h1 - h0 + 1
+    owner = np.repeat(np.arange(len(start)), counts)
+    # Position of each piece within its interval: 0, 1, 2, ... per owner
+    step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    hour = h0[owner] + step
+    lo = np.maximum(start[owner], hour * HOUR)
+    hi = np.minimum(end[owner], (hour + 1) * HOUR)
+    return hour, hi - lo, owner
+
+def compute_stats(arrays: SessionArrays, window_start: int | None = None, window_end: int | None = None) -> SessionStats:
+    """
+    Heatmap, daily totals and per-task share for the sessions in `arrays`.
+    Each session is shifted to local time with the offset in effect at its start,
+    so its length is preserved even if it crosses a DST change.
+    """
+    valid = arrays.end > arrays.start
+    start, end, task = arrays.start[valid], arrays.end[valid], arrays.task[valid]
+    n_tasks = len(arrays.task_names)
+
+    if len(start) == 0:
+        return SessionStats(np.zeros((7, 24)), np.array([], dtype=np.int64), np.array([]), np.zeros(n_tasks), 0.0)
+
+    lo = int(start.min()) if window_start is None else min(window_start, int(start.min()))
+    hi = int(end.max()) if window_end is None else max(window_end, int(end.max()))
+    instants, offsets = utc_offset_table(lo, hi)
+    shift = local_offsets(start, instants, offsets)
+    local_start, local_end = start + shift, end + shift
+
+    hour, secs, _ = split_by_hour(local_start, local_end)
+    day = hour // 24
+    weekday = (day + EPOCH_WEEKDAY) % 7
+    heatmap = np.bincount(weekday * 24 + hour % 24, weights=secs, minlength=7 * 24).reshape(7, 24) / HOUR
+
+    first_day = (lo + int(local_offsets(np.array([lo]), instants, offsets)[0])) // DAY
+    last_day = (hi + int(local_offsets(np.array([hi]), instants, offsets)[0])) // DAY
+    first_day = min(first_day, int(day.min()))
+    last_day = max(last_day, int(day.max()))
+    daily = np.bincount(day - first_day, weights=secs, minlength=last_day - first_day + 1) / HOUR
+    days = np.arange(first_day, first_day + len(daily), dtype=np.int64)
+
+    task_hours = np.bincount(task, weights=(end - start), minlength=n_tasks) / HOUR
+    return SessionStats(heatmap, days, daily, task_hours, float(task_hours.sum()))
+
+SHADES = " ░▒▓█"
+SPARKS = "▁▂▃▄▅▆▇█"
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+def render_heatmap(heatmap: np.ndarray) -> str:
+    peak = heatmap.max()
+    if peak <= 0:
+        levels = np.zeros(heatmap.shape, dtype=np.int64)
+    else:
+        levels = np.ceil(heatmap / peak * (len(SHADES) - 1)).astype(np.int64)
+    header = "    " + "".join(f"{h:<6}" for h in range(0, 24, 6))
+    rows = [header.rstrip()]
+    for i, name in enumerate(WEEKDAYS):
+        rows.append(f"{name} " + "".join(SHADES[v] for v in levels[i]))
+    return "\n".join(rows)
+
+def render_sparkline(values: np.ndarray, width: int = 60) -> str:
+    """Sparkline of `values`, summed into at most `width` equal buckets."""
+    if len(values) == 0:
+        return ""
+    if len(values) > width:
+        edges = np.linspace(0, len(values), width + 1).astype(np.int64)
+        values = np.add.reduceat(values, edges[:-1])
+    peak = values.max()
+    if peak <= 0:
+        return SPARKS[0] * len(values)
+    idx = np.round(values / peak * (len(SPARKS) - 1)).astype(np.int64)
+    return "".join(SPARKS[i] for i in idx)
+
+def day_label(day_number: int) -> str:
+    return (datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(days=int(day_number))).strftime("%b %d")
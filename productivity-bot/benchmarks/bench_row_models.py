@@ -0,0 +1,77 @@
+# benchmarks/bench_row_models.py
+"""
+Row factory / row model benchmark for aggregating a large session set.
+
+Feeds synthetic pages through the driver's own row factories, so it runs without
+a cluster:
+  python -m benchmarks.bench_row_models [rows] [page_size]
+
+Compares, per row: the default named_tuple_factory plus the old getattr summing,
+tuple_factory decoded into SessionRow, and tuple_factory summed by index
+(what sum_session_hours does). Protocol decoding happens before the row
+factory and is the same for all three, so it is left out.
+"""
+import sys
+import time
+import tracemalloc
+
+from datetime import datetime, timedelta
+from cassandra.query import named_tuple_factory, tuple_factory
+from database.models import SessionRow, decode
+
+COLUMNS = ["start_time", "end_time", "duration_hours"]
+
+def make_pages(n: int, page_size: int) -> list[list[tuple]]:
+    base = datetime(2024, 1, 1)
+    rows = [(base + timedelta(hours=i), base + timedelta(hours=i, minutes=45), 0.75) for i in range(n)]
+    return [rows[i:i + page_size] for i in range(0, n, page_size)]
+
+def namedtuple_getattr(pages) -> float:
+    total = 0.0
+    for page in pages:
+        rows = named_tuple_factory(COLUMNS, page)
+        total += sum(float(getattr(s, "duration_hours", 0.0) or 0.0) for s in rows)
+    return total
+
+def tuples_models(pages) -> float:
+    total = 0.0
+    for page in pages:
+        rows = decode(SessionRow, tuple_factory(COLUMNS, page))
+        total += sum(s.duration_hours or 0.0 for s in rows)
+    return total
+
+def tuples_index(pages) -> float:
+    total = 0.0
+    for page in pages:
+        total += sum(r[2] or 0.0 for r in tuple_factory(COLUMNS, page))
+    return total
+
+def measure(fn, pages, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(pages)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(pages)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    pages = make_pages(n, page_size)
+    print(f"{n} rows in {len(pages)} page(s) of {page_size}")
+    print(f"{'variant':<22}{'total ms':>10}{'ns/row':>10}{'peak KiB':>12}")
+    baseline = None
+    for name, fn in (("namedtuple + getattr", namedtuple_getattr),
+                     ("tuples -> SessionRow", tuples_models),
+                     ("tuples by index", tuples_index)):
+        secs, peak = measure(fn, pages)
+        baseline = baseline or secs
+        print(f"{name:<22}{secs * 1000:>10.1f}{secs / n * 1e9:>10.0f}{peak / 1024:>12.0f}"
+              f"   x{baseline / secs:.2f}")
+
+if __name__ == "__main__":
+    main()
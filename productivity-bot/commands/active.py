@@ -0,0 +1,18 @@
+import discord
+
+from discord.ext import commands
+from tasks.presence_status import render_status
+
+class Active(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @commands.command(
+        name="active",
+        help="Show who is working on a task right now, and for how long."
+    )
+    async def active(self, ctx: commands.Context):
+        await ctx.send(render_status(), allowed_mentions=discord.AllowedMentions.none())
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Active(bot))
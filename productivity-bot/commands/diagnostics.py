@@ -0,0 +1,69 @@
+import io
+import discord
+
+from datetime import datetime
+from typing import Optional
+from discord.ext import commands
+from services.diagnostics import monitor, DIAGNOSTICS
+from services.profiler import run_profile, ProfilerBusy, MODES, MAX_SECONDS
+
+class Diagnostics(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @commands.command(
+        name="stalls",
+        help="Event-loop stall report, worst offenders first (needs DIAGNOSTICS=1).\n"
+             "Usage: !stalls [reset | stack <rank>]"
+    )
+    @commands.has_permissions(administrator=True)
+    async def stalls(self, ctx: commands.Context, action: Optional[str] = None, rank: Optional[int] = None):
+        if not DIAGNOSTICS or not monitor.running:
+            await ctx.send("⚠ Stall monitor is off. Start the bot with `DIAGNOSTICS=1` to enable it.")
+            return
+
+        if action == "reset":
+            monitor.reset()
+            await ctx.send("🧹 Stall statistics cleared.")
+            return
+
+        if action == "stack":
+            ranked = monitor.ranked(limit=rank or 1)
+            if not rank or rank > len(ranked):
+                await ctx.send(f"⚠ No stall at rank {rank}. Use `!stalls` to see the ranking.")
+                return
+            s = ranked[rank - 1]
+            stack = "".join(s.stack) or "(no stack captured)\n"
+            await ctx.send(f"**#{rank}** {s.label} @ {s.site} (max {s.max_ms:.0f} ms)\n```\n{stack[-1800:]}```")
+            return
+
+        await ctx.send(f"```\n{monitor.report()[:1900]}\n```")
+
+    @commands.command(
+        name="profile",
+        help="Profile the running bot and upload the report.\n"
+             f"Usage: !profile cpu|sample|mem [seconds] (default 30, max {MAX_SECONDS})\n"
+             "cpu: cProfile of the event loop · sample: collapsed stacks of all threads "
+             "(for flame graphs) · mem: tracemalloc growth by allocation site"
+    )
+    @commands.has_permissions(administrator=True)
+    async def profile(self, ctx: commands.Context, mode: str, seconds: int = 30):
+        mode = mode.lower()
+        if mode not in MODES:
+            await ctx.send(f"⚠ Unknown mode **{mode}**. Use one of: {', '.join(MODES)}.")
+            return
+
+        await ctx.send(f"🔬 Profiling ({mode}) for {min(max(seconds, 1), MAX_SECONDS)}s…")
+        try:
+            summary, report, filename = await run_profile(mode, seconds)
+        except ProfilerBusy:
+            await ctx.send("⚠ A profile is already running; try again when it finishes.")
+            return
+
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        file = discord.File(io.BytesIO(report.encode("utf-8")), filename=f"{stamp}-{filename}")
+        await ctx.send(f"✅ {mode} profile done. Top entries:\n```\n{summary[:1700] or '(nothing recorded)'}\n```",
+                       file=file)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Diagnostics(bot))
@@ -0,0 +1,161 @@
+import asyncio
+import csv
+import gzip
+import json
+import logging
+import os
+import tempfile
+
+from datetime import datetime
+from typing import Iterator, Optional
+import discord
+from discord.ext import commands
+from commands.hours import window_bounds_utc, resolve_task_for_user
+from commands.sessions_list import as_est
+from database.task_queries import get_all_user_tasks
+from database.session_archive_queries import task_history
+
+EXPORT_FORMATS = ("csv", "jsonl")
+RANGE_TOKENS = ("w", "week", "m", "month", "y", "year", "a", "all", "overall")
+CSV_COLUMNS = ["task_id", "task_name", "start_time", "end_time", "duration_hours", "sessions"]
+DEFAULT_FILESIZE_LIMIT = 10 * 1024 * 1024
+
+def parse_export_args(args: Optional[str]) -> tuple[Optional[str], str, Optional[str]]:
+    """
+    Split '[range] [csv|jsonl] [task]' into its parts. Every part is optional,
+    but range and format must come first if given. A task named like a range or
+    format word can be given as task:<name> or in quotes.
+    """
+    rest = (args or "").strip()
+    scope = None
+    fmt = "csv"
+    head, _, tail = rest.partition(" ")
+    if head.lower() in RANGE_TOKENS:
+        scope, rest = head, tail.strip()
+        head, _, tail = rest.partition(" ")
+    if head.lower() in EXPORT_FORMATS:
+        fmt, rest = head.lower(), tail.strip()
+    if rest[:5].lower() == "task:":
+        rest = rest[5:].strip()
+    if len(rest) >= 2 and rest[0] == rest[-1] and rest[0] in "\"'":
+        rest = rest[1:-1].strip()
+    task_ref = " ".join(rest.split()) or None
+    return scope, fmt, task_ref
+
+def iter_export_records(user_id: str, task_rows, start_utc, end_utc) -> Iterator[dict]:
+    """
+    Stream one flat record per session, task by task, straight off the paged reads.
+    Archived months no longer have their sessions, so each comes out as one record
+    spanning the month's first start to last end, with its session count.
+    """
+    for t in task_rows:
+        summaries, sessions = task_history(user_id, t.task_id, start_utc, end_utc)
+        for m in summaries:
+            yield {
+                "task_id": str(t.task_id),
+                "task_name": t.task_name,
+                "start_time": as_est(m.first_start).isoformat() if m.first_start else None,
+                "end_time": as_est(m.last_end).isoformat() if m.last_end else None,
+                "duration_hours": m.total_seconds / 3600.0,
+                "sessions": m.session_count,
+            }
+        for s in sessions:
+            yield {
+                "task_id": str(t.task_id),
+                "task_name": t.task_name,
+                "start_time": as_est(s.start_time).isoformat() if s.start_time else None,
+                "end_time": as_est(s.end_time).isoformat() if s.end_time else None,
+                "duration_hours": float(s.duration_hours or 0.0),
+                "sessions": 1,
+            }
+
+def write_export(records: Iterator[dict], fmt: str, path: str) -> int:
+    """Write records to a gzip file one at a time. Returns the number of rows written."""
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as fh:
+        if fmt == "csv":
+            writer = csv.DictWriter(fh, fieldnames=CSV_COLUMNS)
+            writer.writeheader()
+            for rec in records:
+                writer.writerow(rec)
+                count += 1
+        else:
+            for rec in records:
+                fh.write(json.dumps(rec, ensure_ascii=False))
+                fh.write("\n")
+                count += 1
+    return count
+
+def build_export_file(user_id: str, scope: Optional[str], fmt: str, task_ref: Optional[str]):
+    """
+    Blocking half of !export: resolves tasks, streams sessions into a temp file.
+    Returns (path, row_count, label) or (None, 0, label) if the task wasn't found.
+    """
+    start_utc, end_utc, label = window_bounds_utc(scope)
+
+    if task_ref:
+        task_row = resolve_task_for_user(user_id, task_ref)
+        if not task_row:
+            return None, 0, label
+        task_rows = [task_row]
+    else:
+        task_rows = get_all_user_tasks(user_id)
+
+    fd, path = tempfile.mkstemp(prefix="export-", suffix=f".{fmt}.gz")
+    os.close(fd)
+    try:
+        count = write_export(iter_export_records(user_id, task_rows, start_utc, end_utc), fmt, path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, count, label
+
+class Export(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @commands.command(
+        name="export",
+        help="Download your sessions as a gzip'd CSV or JSON Lines file.\n"
+             "Usage: !export [week|month|year|all] [csv|jsonl] [optional task name or task_id]\n"
+             "A task named like a range or format word: task:<name> or \"<name>\""
+    )
+    async def export(self, ctx: commands.Context, *, args: Optional[str] = None):
+        user_id = str(ctx.author.id)
+        scope, fmt, task_ref = parse_export_args(args)
+        if scope is None:
+            scope = "all"
+
+        async with ctx.typing():
+            path, count, label = await asyncio.to_thread(build_export_file, user_id, scope, fmt, task_ref)
+
+        if path is None:
+            await ctx.send(f"⚠ {ctx.author.mention} I couldn't find a task matching **{task_ref}**.")
+            return
+
+        try:
+            if count == 0:
+                await ctx.send(f"✅ {ctx.author.mention} no sessions to export for **{label}**.")
+                return
+
+            limit = ctx.guild.filesize_limit if ctx.guild else DEFAULT_FILESIZE_LIMIT
+            size = os.path.getsize(path)
+            if size > limit:
+                await ctx.send(
+                    f"⚠ {ctx.author.mention} your export is {size / 1024 / 1024:.1f} MB, over the "
+                    f"{limit / 1024 / 1024:.0f} MB upload limit. Try a shorter range or a single task."
+                )
+                return
+
+            stamp = datetime.now().strftime("%Y%m%d")
+            filename = f"sessions-{label}-{stamp}.{fmt}.gz"
+            await ctx.send(
+                f"📦 {ctx.author.mention} exported **{count}** session(s) ({label}).",
+                file=discord.File(path, filename=filename),
+            )
+            logging.info("Exported %d sessions for %s (%s, %s)", count, user_id, label, fmt)
+        finally:
+            os.remove(path)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Export(bot))
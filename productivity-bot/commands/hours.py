@@ -1,11 +1,13 @@
 import uuid
 
 from typing import Optional, Tuple, List
+from discord import app_commands
 from discord.ext import commands
 from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 from database.task_queries import get_all_user_tasks, get_user_task
-from database.session_queries import get_sessions_for_user_task_range
+from database.session_archive_queries import task_hours as sum_task_hours
+from commands.sessions import resolve_task_ref, task_name_autocomplete, did_you_mean
 
 # Bot-wide timezone (Eastern with DST)
 EST = ZoneInfo("America/Toronto")
@@ -54,30 +56,28 @@ class Hours(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    @commands.command(
+    @commands.hybrid_command(
         name="hours",
         help="Show total hours in an optional timeframe and task.\n"
              "Usage: !hours [week|month|year|all] [optional task name or task_id]\n"
     )
+    @app_commands.rename(task_ref="task")
+    @app_commands.describe(scope="week, month, year or all (default week)", task_ref="Only this task")
+    @app_commands.autocomplete(task_ref=task_name_autocomplete)
     async def hours(self, ctx: commands.Context, scope: Optional[str] = None, *, task_ref: Optional[str] = None):
         user_id = str(ctx.author.id)
+        await ctx.defer()
 
         start_utc, end_utc, label = window_bounds_utc(scope)
 
         if task_ref:
-            task_row = resolve_task_for_user(user_id, task_ref)
+            task_row = await resolve_task_ref(user_id, task_ref)
             if not task_row:
-                await ctx.send(f"⚠ {ctx.author.mention} I couldn't find a task matching **{task_ref}**. "
-                               f'Use `!remindlist` to see your tasks.')
+                await ctx.send(f"⚠ {ctx.author.mention} I couldn't find a task matching **{task_ref}**."
+                               f"{did_you_mean(user_id, task_ref)} Use `!remindlist` to see your tasks.")
                 return
 
-            if start_utc and end_utc:
-                sessions = get_sessions_for_user_task_range(user_id, task_row.task_id,
-                                                            start_from=start_utc, end_before=end_utc)
-            else:
-                sessions = get_sessions_for_user_task_range(user_id, task_row.task_id)
-
-            task_hours = sum(float(getattr(s, "duration_hours", 0.0) or 0.0) for s in sessions)
+            task_hours = sum_task_hours(user_id, task_row.task_id, start_from=start_utc, end_before=end_utc)
             await ctx.send(f"⏱️ {ctx.author.mention} **{task_row.task_name}** — total ({label}): **{task_hours:.2f}h**")
             return
 
@@ -90,12 +90,7 @@ class Hours(commands.Cog):
         total_hours = 0.0
 
         for t in tasks_rows:
-            if start_utc and end_utc:
-                sessions = get_sessions_for_user_task_range(user_id, t.task_id,
-                                                            start_from=start_utc, end_before=end_utc)
-            else:
-                sessions = get_sessions_for_user_task_range(user_id, t.task_id)
-            task_hours = sum(float(getattr(s, "duration_hours", 0.0) or 0.0) for s in sessions)
+            task_hours = sum_task_hours(user_id, t.task_id, start_from=start_utc, end_before=end_utc)
             if task_hours > 0:
                 per_task.append((t.task_name, task_hours))
                 total_hours += task_hours
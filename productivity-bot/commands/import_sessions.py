@@ -0,0 +1,219 @@
+import asyncio
+import csv
+import gzip
+import json
+import logging
+import os
+import tempfile
+import time
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from typing import Iterator
+from zoneinfo import ZoneInfo
+from discord.ext import commands
+from database.task_queries import get_all_user_tasks, add_task
+from database.session_queries import add_sessions_bulk
+from database.session_archive_queries import fold_archived_sessions
+from commands.streak import rebuild_user_streak
+from services import task_index
+
+EST = ZoneInfo("America/Toronto")
+IMPORT_CHUNK_ROWS = 2000
+MAX_REPORTED_ERRORS = 5
+
+# Accepted spellings for each column, so `!export` output can be fed straight back in.
+COLUMN_ALIASES = {
+    "task_name": ("task_name", "task", "name"),
+    "start": ("start", "start_time"),
+    "end": ("end", "end_time"),
+    "duration": ("duration", "duration_hours", "hours"),
+}
+
+@dataclass
+class ImportReport:
+    accepted: int = 0
+    rejected: int = 0
+    duplicates: int = 0
+    created_tasks: int = 0
+    elapsed: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    def reject(self, line_no: int, reason: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {line_no}: {reason}")
+
+def _pick(rec: dict, column: str):
+    for key in COLUMN_ALIASES[column]:
+        val = rec.get(key)
+        if val not in (None, ""):
+            return val
+    return None
+
+def parse_timestamp(value) -> datetime:
+    """ISO 8601 timestamp; naive values are taken as bot-local (Eastern) time."""
+    dt = datetime.fromisoformat(str(value).strip())
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=EST)
+    return dt
+
+def normalize_record(rec: dict) -> tuple[str, datetime, datetime, float]:
+    name = _pick(rec, "task_name")
+    start_raw = _pick(rec, "start")
+    end_raw = _pick(rec, "end")
+    if not name or start_raw is None or end_raw is None:
+        raise ValueError("task name, start and end are required")
+
+    try:
+        start = parse_timestamp(start_raw)
+        end = parse_timestamp(end_raw)
+    except ValueError:
+        raise ValueError("timestamps must be ISO 8601 (e.g. 2024-03-01T09:00)")
+    if end <= start:
+        raise ValueError("end must be after start")
+
+    dur_raw = _pick(rec, "duration")
+    if dur_raw is None:
+        duration_hours = (end - start).total_seconds() / 3600.0
+    else:
+        try:
+            duration_hours = float(dur_raw)
+        except ValueError:
+            raise ValueError(f"invalid duration {dur_raw!r}")
+        if duration_hours < 0:
+            raise ValueError("duration can't be negative")
+
+    return str(name).strip(), start, end, duration_hours
+
+def iter_import_records(path: str, fmt: str, gzipped: bool) -> Iterator[tuple[int, dict | None]]:
+    """Yield (line_no, record) lazily; record is None for lines that aren't valid JSON."""
+    opener = gzip.open if gzipped else open
+    with opener(path, "rt", encoding="utf-8-sig", newline="") as fh:
+        if fmt == "csv":
+            reader = csv.DictReader(fh)
+            if reader.fieldnames:
+                reader.fieldnames = [f.strip().lower() for f in reader.fieldnames]
+            for rec in reader:
+                yield reader.line_num, rec
+        else:
+            for line_no, line in enumerate(fh, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    yield line_no, None
+                    continue
+                yield line_no, rec if isinstance(rec, dict) else None
+
+def detect_format(filename: str) -> tuple[str | None, bool]:
+    name = filename.lower()
+    gzipped = name.endswith(".gz")
+    if gzipped:
+        name = name[:-3]
+    if name.endswith(".csv"):
+        return "csv", gzipped
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl", gzipped
+    return None, gzipped
+
+def import_sessions_file(user_id: str, path: str, fmt: str, gzipped: bool) -> ImportReport:
+    """
+    Blocking half of !import. Reads the file in chunks, resolves (or creates) tasks by
+    name and hands each chunk to add_sessions_bulk, so only one chunk is ever in memory.
+    """
+    report = ImportReport()
+    started = time.perf_counter()
+    task_ids = {t.task_name.lower(): t.task_id for t in get_all_user_tasks(user_id) if t.task_name}
+
+    records = iter_import_records(path, fmt, gzipped)
+    while True:
+        chunk = list(islice(records, IMPORT_CHUNK_ROWS))
+        if not chunk:
+            break
+
+        params = []
+        for line_no, rec in chunk:
+            if rec is None:
+                report.reject(line_no, "not a JSON object")
+                continue
+            try:
+                name, start, end, duration_hours = normalize_record(rec)
+            except ValueError as e:
+                report.reject(line_no, str(e))
+                continue
+
+            tid = task_ids.get(name.lower())
+            if tid is None:
+                tid = add_task(user_id, name)
+                task_ids[name.lower()] = tid
+                report.created_tasks += 1
+            params.append((user_id, tid, start, end, duration_hours))
+
+        written, failed, duplicates = add_sessions_bulk(params)
+        # Rows older than a task's archive boundary only count once they're in its summaries
+        fold_archived_sessions(user_id, written)
+        report.accepted += len(written)
+        report.rejected += failed
+        report.duplicates += duplicates
+
+    report.elapsed = time.perf_counter() - started
+    if report.accepted:
+        # Imported history lands out of order, which incremental tracking can't absorb
+        rebuild_user_streak(user_id)
+    return report
+
+class Import(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @commands.command(
+        name="import",
+        help="Import sessions from an attached CSV or JSONL file (optionally .gz).\n"
+             "Columns: task_name, start, end, [duration_hours]. Times are ISO 8601; "
+             "times without an offset are treated as Eastern."
+    )
+    async def import_cmd(self, ctx: commands.Context):
+        if not ctx.message.attachments:
+            await ctx.send(f"⚠ {ctx.author.mention} attach a .csv or .jsonl file to `!import`.")
+            return
+
+        attachment = ctx.message.attachments[0]
+        fmt, gzipped = detect_format(attachment.filename)
+        if fmt is None:
+            await ctx.send(f"⚠ {ctx.author.mention} unsupported file type. Use .csv, .jsonl (or either with .gz).")
+            return
+
+        user_id = str(ctx.author.id)
+        fd, path = tempfile.mkstemp(prefix="import-")
+        os.close(fd)
+        try:
+            await attachment.save(path)
+            async with ctx.typing():
+                report = await asyncio.to_thread(import_sessions_file, user_id, path, fmt, gzipped)
+        finally:
+            os.remove(path)
+        if report.created_tasks:
+            task_index.invalidate(user_id)
+
+        rate = report.accepted / report.elapsed if report.elapsed > 0 else 0.0
+        lines = [
+            f"📥 {ctx.author.mention} import finished in {report.elapsed:.1f}s ({rate:.0f} rows/s).",
+            f"• Accepted: **{report.accepted}**",
+            f"• Rejected: **{report.rejected}**",
+        ]
+        if report.duplicates:
+            lines.append(f"• Already imported (skipped): **{report.duplicates}**")
+        if report.created_tasks:
+            lines.append(f"• New tasks created: **{report.created_tasks}**")
+        if report.errors:
+            lines.append("First problems:")
+            lines.extend(f"  - {e}" for e in report.errors)
+        await ctx.send("\n".join(lines))
+        logging.info("Imported %d sessions for %s (%d rejected) in %.2fs",
+                     report.accepted, user_id, report.rejected, report.elapsed)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Import(bot))
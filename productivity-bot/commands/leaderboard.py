@@ -0,0 +1,48 @@
+import discord
+
+from typing import Optional
+from discord.ext import commands
+from database.leaderboard_queries import get_leaderboard_aio
+
+PERIOD_MAP = {"w": "week", "week": "week",
+              "m": "month", "month": "month",
+              "a": "all", "all": "all", "overall": "all"}
+LEADERBOARD_SIZE = 10
+MEDALS = ["🥇", "🥈", "🥉"]
+
+class Leaderboard(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @commands.command(
+        name="leaderboard",
+        aliases=["lb"],
+        help="Show the server's top workers by hours tracked.\nUsage: !leaderboard [week|month|all]"
+    )
+    async def leaderboard(self, ctx: commands.Context, period: Optional[str] = None):
+        label = PERIOD_MAP.get((period or "week").lower())
+        if label is None:
+            await ctx.send(f"⚠ {ctx.author.mention} period must be 'week', 'month' or 'all'.")
+            return
+
+        bucket, top, totals = await get_leaderboard_aio(label, LEADERBOARD_SIZE)
+        if not top:
+            await ctx.send(f"🏆 No hours tracked yet for **{bucket if label != 'all' else 'all time'}**.")
+            return
+
+        title = "All time" if label == "all" else f"{label.capitalize()} {bucket}"
+        lines = [f"🏆 **Leaderboard — {title}**"]
+        for i, (user_id, seconds) in enumerate(top):
+            rank = MEDALS[i] if i < len(MEDALS) else f"**{i + 1}.**"
+            lines.append(f"{rank} <@{user_id}> — {seconds / 3600:.2f}h")
+
+        user_id = str(ctx.author.id)
+        if user_id in totals and all(uid != user_id for uid, _ in top):
+            mine = totals[user_id]
+            rank = 1 + sum(1 for secs in totals.values() if secs > mine)
+            lines.append(f"…\n**{rank}.** {ctx.author.mention} — {mine / 3600:.2f}h")
+
+        await ctx.send("\n".join(lines), allowed_mentions=discord.AllowedMentions.none())
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Leaderboard(bot))
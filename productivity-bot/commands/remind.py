@@ -1,10 +1,14 @@
 import re
+import asyncio
 import discord
 import uuid
 
 from discord.ext import commands
-from database.task_queries import get_user_task, delete_task_cascade, add_task_indexed, get_all_user_tasks
+from database.task_queries import (
+    get_user_task, delete_task_cascade, add_task_indexed, get_all_user_tasks, task_days, add_tasks_indexed_bulk,
+)
 from collections import defaultdict
+from services import task_index
 
 DAY_MAP = {
     "sun": 0, "sunday": 0,
@@ -95,6 +99,44 @@ def parse_time_str(time_str: str) -> tuple[int, int]:
 
     raise ValueError("Invalid time. Use HH:MM or h:mmAM/PM (e.g. 09:00, 7:30am).")
 
+MAX_BULK_LINES = 200
+MAX_LISTED_LINES = 15
+
+def parse_bulk_line(line: str) -> tuple[str, str, int, int, list[int]]:
+    """
+    'daily <time> <name>' or 'weekly <days> <time> <name>'
+    -> (task_name, reminder_type, hour, minute, days_of_week)
+    """
+    parts = line.strip().split(maxsplit=1)
+    freq = parts[0].lower() if parts else ""
+    rest = parts[1] if len(parts) > 1 else ""
+
+    if freq == "daily":
+        fields = rest.split(maxsplit=1)
+        if len(fields) < 2:
+            raise ValueError("expected: daily <time> <task name>")
+        hour, minute = parse_time_str(fields[0])
+        return fields[1].strip(), "daily", hour, minute, []
+
+    if freq == "weekly":
+        fields = rest.split(maxsplit=2)
+        if len(fields) < 3:
+            raise ValueError("expected: weekly <days> <time> <task name>")
+        dows = parse_multi_days(fields[0])
+        if not dows:
+            raise ValueError("no valid days")
+        hour, minute = parse_time_str(fields[1])
+        return fields[2].strip(), "weekly", hour, minute, dows
+
+    raise ValueError("frequency must be 'daily' or 'weekly'")
+
+def describe_spec(spec) -> str:
+    name, rtype, hour, minute, dows = spec
+    when = f"{hour:02}:{minute:02}"
+    if rtype == "weekly":
+        when = f"{', '.join(DAY_ABBR[d] for d in dows)} {when}"
+    return f"**{name}** — {when}"
+
 def dow_to_human(dow: int | None) -> str:
     names = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
     return names[dow] if dow is not None and 0 <= dow <= 6 else "Daily"
@@ -133,6 +175,7 @@ class Remind(commands.Cog):
                     reminder_minute=minute,
                     day_of_week=None,
                 )
+                task_index.invalidate(user_id)
                 await ctx.send(f"✅ {ctx.author.mention} daily reminder set for **{task}** at **{arg2}** (task_id `{task_id}`)")
 
             elif freq_norm == "weekly":
@@ -150,29 +193,88 @@ class Remind(commands.Cog):
                 hour, minute = parse_time_str(arg3)
                 task = task_name
 
-                created_ids = []
-                for dow in dows:
-                    tid = add_task_indexed(
-                        user_id=user_id,
-                        task_name=task,
-                        description=None,
-                        reminder_type="weekly",
-                        reminder_hour=hour,
-                        reminder_minute=minute,
-                        day_of_week=dow,
-                    )
-                    created_ids.append(str(tid))
+                task_id = add_task_indexed(
+                    user_id=user_id,
+                    task_name=task,
+                    description=None,
+                    reminder_type="weekly",
+                    reminder_hour=hour,
+                    reminder_minute=minute,
+                    days_of_week=dows,
+                )
+                task_index.invalidate(user_id)
 
                 days_human = ", ".join(DAY_ABBR[d] for d in dows)
                 await ctx.send(
-                    f"✅ {ctx.author.mention} weekly reminders set for **{task}** on **{days_human} {arg3}**\n"
-                    f"🆔 " + ", ".join(f"`{tid}`" for tid in created_ids)
+                    f"✅ {ctx.author.mention} weekly reminder set for **{task}** on **{days_human} {arg3}** "
+                    f"(task_id `{task_id}`)"
                 )
             else:
                 raise ValueError("Frequency must be 'daily' or 'weekly'.")
         except ValueError as e:
             await ctx.send(f"⚠ {ctx.author.mention} {e}")
 
+    @commands.command(
+        name="remindbulk",
+        aliases=["bulkremind"],
+        help="Add many reminders at once, one per line (or from an attached .txt file).\n"
+             "Usage: !remindbulk\n"
+             "daily 09:00 Write journal\n"
+             "weekly mon-fri 7:30am Standup"
+    )
+    async def remind_bulk(self, ctx: commands.Context, *, text: str | None = None):
+        user_id = str(ctx.author.id)
+        source = text or ""
+        if ctx.message.attachments:
+            data = await ctx.message.attachments[0].read()
+            source += "\n" + data.decode("utf-8", errors="replace")
+
+        lines = [
+            (n, line) for n, line in enumerate(source.splitlines(), start=1)
+            if line.strip() and not line.strip().startswith("#")
+        ]
+        if not lines:
+            await ctx.send(f"⚠ {ctx.author.mention} nothing to add. Put one `daily|weekly ...` reminder per line.")
+            return
+        if len(lines) > MAX_BULK_LINES:
+            await ctx.send(f"⚠ {ctx.author.mention} at most {MAX_BULK_LINES} reminders per bulk command.")
+            return
+
+        # Validate everything before writing anything
+        specs, errors = [], []
+        for n, line in lines:
+            try:
+                specs.append(parse_bulk_line(line))
+            except ValueError as e:
+                errors.append(f"line {n}: {e}")
+
+        results = await asyncio.to_thread(add_tasks_indexed_bulk, user_id, specs) if specs else []
+        task_index.invalidate(user_id)
+        created = [spec for spec, (_, ok) in zip(specs, results) if ok]
+        failed = [spec for spec, (_, ok) in zip(specs, results) if not ok]
+
+        embed = discord.Embed(
+            title="Bulk reminders",
+            description=f"✅ {len(created)} created · ⚠ {len(errors)} invalid · ❌ {len(failed)} failed",
+            color=discord.Color.green() if not (errors or failed) else discord.Color.orange(),
+        )
+
+        def _field(name, items):
+            shown = items[:MAX_LISTED_LINES]
+            value = "\n".join(shown)
+            if len(items) > len(shown):
+                value += f"\n… and {len(items) - len(shown)} more"
+            embed.add_field(name=name, value=value[:1024], inline=False)
+
+        if created:
+            _field("Created", [describe_spec(s) for s in created])
+        if errors:
+            _field("Invalid lines", errors)
+        if failed:
+            _field("Failed to save (try again)", [describe_spec(s) for s in failed])
+
+        await ctx.send(content=ctx.author.mention, embed=embed)
+
     @commands.command(name="list", help="List your reminders")
     async def list(self, ctx: commands.Context):
         user_id = str(ctx.author.id)
@@ -192,13 +294,11 @@ class Remind(commands.Cog):
             g["type"] = rtype
             g["task_ids"].append(str(r.task_id))
             if rtype == "weekly":
-                dow = getattr(r, "reminder_day_of_week", None)
-                if isinstance(dow, int) and 0 <= dow <= 6:
-                    g["days"].add(dow)
+                g["days"].update(task_days(r))
 
         embed = discord.Embed(
             title=f"{ctx.author.display_name}'s Reminders",
-            description="(Weekly tasks on multiple days are collapsed)",
+            description="(Older weekly reminders created one per day are collapsed)",
         )
 
         def sort_key(item):
@@ -248,7 +348,7 @@ class Remind(commands.Cog):
 
         reminder_type = getattr(row, "reminder_type", None)
         reminder_time = getattr(row, "reminder_time", None)
-        day_of_week = getattr(row, "reminder_day_of_week", None)
+        days = task_days(row)
         task_name = getattr(row, "task_name", str(task_id))
 
         if reminder_type is None or reminder_time is None:
@@ -265,17 +365,19 @@ class Remind(commands.Cog):
                 reminder_type=reminder_type,
                 reminder_hour=hour,
                 reminder_minute=minute,
-                day_of_week=day_of_week if day_of_week != -1 else None
+                days_of_week=days,
             )
         except Exception as e:
             await ctx.send(f"❌ {ctx.author.mention} failed to delete reminder: {e}")
             return
+        task_index.invalidate(user_id)
 
-        parsed_when = (
-            f"{dow_to_human(day_of_week)} {hour:02}:{minute:02}"
-            if reminder_type == "weekly" and isinstance(day_of_week, int) and 0 <= day_of_week <= 6
-            else f"{hour:02}:{minute:02}"
-        )
+        if reminder_type == "weekly" and len(days) == 1:
+            parsed_when = f"{dow_to_human(days[0])} {hour:02}:{minute:02}"
+        elif reminder_type == "weekly" and days:
+            parsed_when = f"{', '.join(DAY_ABBR[d] for d in days)} {hour:02}:{minute:02}"
+        else:
+            parsed_when = f"{hour:02}:{minute:02}"
         await ctx.send(f"🗑️ {ctx.author.mention} deleted reminder **{task_name}** ({reminder_type}, {parsed_when}).")
 
 async def setup(bot: commands.Bot):
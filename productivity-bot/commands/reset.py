@@ -1,7 +1,42 @@
+import asyncio
 import logging
+import discord
 
 from discord.ext import commands
 from database.cassandra_client import session
+from database.migrations import merge_weekly_duplicates
+from database.table_stats import collect_table_stats
+from database.presence_index import mark_inactive, warm_presence_index
+from database.streak_queries import forget_all as forget_all_streaks
+from database.leaderboard_queries import forget_all as forget_all_leaderboards
+from database.purge import purge_user
+from services import task_index
+from services.journal import journal
+from services.reminder_repair import repair_reminder_index, describe as describe_index_key
+from services.backup import Progress, create_backup, restore_backup, list_backups
+
+def _human_bytes(n: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+async def _with_progress(message, progress: Progress, work):
+    """Run `work` while editing `message` with the progress line every few seconds."""
+    task = asyncio.create_task(work)
+    while not task.done():
+        await asyncio.wait({task}, timeout=5)
+        if not task.done():
+            await message.edit(content=f"⏳ {progress.line()}")
+    return task.result()
+
+def _human_ttl(seconds: int) -> str:
+    if not seconds:
+        return "-"
+    if seconds % 86400 == 0:
+        return f"{seconds // 86400}d"
+    return f"{seconds}s"
 
 class AdminCommands(commands.Cog):
     def __init__(self, bot):
@@ -15,13 +50,18 @@ class AdminCommands(commands.Cog):
             "reminders_by_time",
             "sessions_by_user_task",
             "tasks_by_user",
-            "daily_remaining_by_user"
+            "daily_remaining_by_user",
+            "user_seconds_by_period",
+            "user_streaks",
+            "scheduler_cursors",
+            "session_summaries_by_user_task",
         ]
 
         try:
             self.bot.initialized = False
             for table in tables:
                 session.execute(f"DROP TABLE IF EXISTS {table}")
+            task_index.invalidate_all()
             
             await ctx.send("⚠️ **All data wiped!** The database is now empty.")
             logging.warning("Database wiped by admin command.")
@@ -29,6 +69,156 @@ class AdminCommands(commands.Cog):
             await ctx.send(f"Failed to wipe database: {e}")
             logging.error(f"Database wipe failed: {e}")
 
+    @commands.command(name="purge", help="Delete all of one user's data. Usage: !purge @user")
+    @commands.has_permissions(administrator=True)
+    async def purge(self, ctx, user: discord.User):
+        user_id = str(user.id)
+        # Unreplicated !start/!stop entries would otherwise write the user back afterwards
+        dropped = await asyncio.to_thread(journal.forget_user, user_id)
+        mark_inactive(user_id)
+        task_index.invalidate(user_id)
+        try:
+            stats = await purge_user(user_id)
+        except Exception as e:
+            await ctx.send(f"Purge of {user.mention} failed: {e}")
+            logging.error(f"Purge of {user_id} failed: {e}")
+            return
+        finally:
+            task_index.invalidate(user_id)
+
+        summary = (
+            f"**{stats.tasks}** task(s), **{stats.reminder_keys}** reminder(s), **{stats.sessions}** session(s), "
+            f"**{stats.archived_months}** archived month(s), **{stats.counter_rows}** leaderboard counter(s) zeroed, "
+            f"**{stats.daily_partitions}** daily list(s), **{dropped}** journaled write(s)"
+        )
+        if stats.failed:
+            await ctx.send(
+                f"⚠ Purge of {user.mention} incomplete: {len(stats.failed)} delete(s) failed "
+                f"(e.g. {', '.join(stats.failed[:3])}). Their tasks were kept so `!purge` can be re-run.\n{summary}"
+            )
+            return
+        await ctx.send(f"🗑️ Purged {user.mention}: {summary}.")
+        logging.warning("User %s purged by %s.", user_id, ctx.author.id)
+
+    @commands.command(name="repair", help="Check the reminder index against tasks. Usage: !repair [fix]")
+    @commands.has_permissions(administrator=True)
+    async def repair(self, ctx, mode: str | None = None):
+        fix = mode == "fix"
+        await ctx.send("🔧 Scanning tasks and the reminder index…")
+        try:
+            report = await repair_reminder_index(fix=fix)
+        except Exception as e:
+            await ctx.send(f"Reminder repair failed: {e}")
+            logging.error(f"Reminder repair failed: {e}")
+            return
+
+        lines = [
+            f"Scanned {report.tasks_scanned} task(s), {report.index_rows_scanned} index row(s).",
+            f"orphan {len(report.orphans)}  stale {len(report.stale)}  missing {len(report.missing)}",
+        ]
+        for label, keys in (("orphan", report.orphans), ("stale", report.stale), ("missing", report.missing)):
+            lines += [f"  {label:<8}{describe_index_key(k)}" for k in keys[:5]]
+        if fix:
+            lines.append(f"Fixed {report.fixed}, failed {report.failed}.")
+        elif report.problems:
+            lines.append("Run `!repair fix` to apply.")
+        await ctx.send("```\n" + "\n".join(lines)[:1900] + "\n```")
+
+    @commands.command(name="backup", help="Back up every table to compressed local files. Usage: !backup")
+    @commands.has_permissions(administrator=True)
+    async def backup(self, ctx):
+        progress = Progress("backup")
+        message = await ctx.send("⏳ Starting backup…")
+        try:
+            path = await _with_progress(message, progress, create_backup(progress))
+        except Exception as e:
+            await message.edit(content=f"Backup failed: {e}")
+            logging.error(f"Backup failed: {e}")
+            return
+        await message.edit(content=f"💾 Backup **{path.name}** written. {progress.line()}")
+
+    @commands.command(name="restore", help="Restore a backup (run !reset first). Usage: !restore [name]")
+    @commands.has_permissions(administrator=True)
+    async def restore(self, ctx, name: str | None = None):
+        if name is None:
+            backups = await asyncio.to_thread(list_backups)
+            if not backups:
+                await ctx.send("No backups found. Use `!backup` to make one.")
+                return
+            lines = [f"{m['name']}  {m['rows']:>10,} rows  {m['bytes'] / 2**20:8.1f} MiB" for m in backups[:15]]
+            await ctx.send("💾 **Backups** (newest first)\n```\n" + "\n".join(lines) + "\n```")
+            return
+
+        progress = Progress("restore")
+        message = await ctx.send(f"⏳ Restoring **{name}**…")
+        try:
+            await _with_progress(message, progress, restore_backup(name, progress))
+        except Exception as e:
+            await message.edit(content=f"Restore failed: {e}")
+            logging.error(f"Restore of {name} failed: {e}")
+            return
+        # Everything cached from the old data is stale now
+        task_index.invalidate_all()
+        forget_all_streaks()
+        forget_all_leaderboards()
+        await asyncio.to_thread(warm_presence_index)
+        skipped = f" Skipped: {', '.join(progress.skipped)}." if progress.skipped else ""
+        if progress.tables_done == len(progress.skipped):
+            await message.edit(content=f"⚠ Nothing was restored from **{name}**.{skipped}")
+            return
+        await message.edit(content=f"♻️ Restored **{name}**. {progress.line()}.{skipped}")
+
+    @commands.command(name="mergeweekly", help="Merge legacy one-task-per-day weekly reminders into single tasks.")
+    @commands.has_permissions(administrator=True)
+    async def merge_weekly(self, ctx):
+        try:
+            stats = await asyncio.to_thread(merge_weekly_duplicates)
+            task_index.invalidate_all()
+        except Exception as e:
+            await ctx.send(f"Weekly merge failed: {e}")
+            logging.error(f"Weekly merge failed: {e}")
+            return
+
+        await ctx.send(
+            f"🔀 Merged **{stats['groups']}** weekly reminder group(s): removed "
+            f"**{stats['tasks_removed']}** duplicate task(s), moved **{stats['sessions_moved']}** session(s)."
+        )
+
+    @commands.command(name="synccommands", help="Sync slash commands. Usage: !synccommands [here] (here = this server only, instant)")
+    @commands.has_permissions(administrator=True)
+    async def sync_commands(self, ctx, scope: str | None = None):
+        if scope == "here" and ctx.guild:
+            self.bot.tree.copy_global_to(guild=ctx.guild)
+            synced = await self.bot.tree.sync(guild=ctx.guild)
+        else:
+            synced = await self.bot.tree.sync()
+        await ctx.send(f"🔄 Synced {len(synced)} slash command(s){' to this server' if scope == 'here' else ' globally'}.")
+
+    @commands.command(name="tablestats", help="Per-table size, partition count, TTL and compaction estimates.")
+    @commands.has_permissions(administrator=True)
+    async def table_stats(self, ctx):
+        try:
+            stats = await asyncio.to_thread(collect_table_stats)
+        except Exception as e:
+            await ctx.send(f"Couldn't read table stats: {e}")
+            logging.error(f"Table stats failed: {e}")
+            return
+
+        if not stats:
+            await ctx.send("No tables found in the keyspace.")
+            return
+
+        lines = [f"{'table':<26}{'partitions':>11}{'mean':>11}{'total':>11}{'ttl':>6}  compaction"]
+        for t in stats:
+            lines.append(
+                f"{t.name[:25]:<26}{t.partitions:>11,}{_human_bytes(t.mean_partition_bytes):>11}"
+                f"{_human_bytes(t.est_bytes):>11}{_human_ttl(t.default_ttl):>6}  {t.compaction}"
+            )
+        await ctx.send(
+            "📊 **Table stats** (size_estimates from the coordinator node; refreshed periodically)\n"
+            "```\n" + "\n".join(lines)[:1800] + "\n```"
+        )
+
 async def setup(bot):
     logging.info("Running AdminCommands cog setup()")
     await bot.add_cog(AdminCommands(bot))
\ No newline at end of file
@@ -3,15 +3,12 @@ import uuid
 from datetime import datetime, timezone
 from typing import Optional
 from zoneinfo import ZoneInfo
+from discord import app_commands
 from discord.ext import commands
-from database.task_queries import get_all_user_tasks, get_user_task
-from database.active_task_queries import (
-    get_active_user_task,
-    add_active_user_task,
-    delete_active_user_task,
-)
-from database.session_queries import add_session_for_task
-from database.daily_remaining_queries import remove_from_today
+from database.task_queries import get_user_task_aio
+from services.journal import journal_transition, journal_daily_remove, current_presence
+from services.auto_stop import cap_session
+from services import task_index
 
 EST = ZoneInfo("America/Toronto")
 def now_est():
@@ -28,53 +25,62 @@ def try_parse_uuid(s: str) -> Optional[uuid.UUID]:
     except Exception:
         return None
 
-def find_task_for_user_by_name(user_id_text: str, name: str):
-    for row in get_all_user_tasks(user_id_text):
-        if row.task_name.lower() == name.lower():
-            return row
-    return None
+async def task_name_autocomplete(interaction, current: str) -> list[app_commands.Choice[str]]:
+    """Shared by every slash command that takes a task name; answered from the task index."""
+    matches = await task_index.autocomplete(str(interaction.user.id), current)
+    return [app_commands.Choice(name=name[:100], value=name[:100]) for name, _ in matches]
+
+async def resolve_task_ref(user_id: str, ref: str):
+    """Task row for a task_id or exact (case-insensitive) name, via the task index."""
+    ref = ref.strip()
+    tid = try_parse_uuid(ref) or await task_index.lookup(user_id, ref)
+    return await get_user_task_aio(user_id, tid) if tid else None
+
+def did_you_mean(user_id: str, ref: str) -> str:
+    close = task_index.suggest(user_id, ref)
+    return f" Did you mean {', '.join(f'**{n}**' for n in close)}?" if close else ""
 
 class Sessions(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    @commands.command(
+    @commands.hybrid_command(
         name="start",
         help="Start working on a task. Usage: !start <task_id | exact task name>"
     )
+    @app_commands.rename(task_ref="task")
+    @app_commands.describe(task_ref="Task name (or task_id)")
+    @app_commands.autocomplete(task_ref=task_name_autocomplete)
     async def start(self, ctx: commands.Context, *, task_ref: str):
         user_id_text = str(ctx.author.id)
 
-        # Resolve task: by UUID first, then by exact name
-        task_row = None
-        tid = try_parse_uuid(task_ref.strip())
-        if tid:
-            task_row = get_user_task(user_id_text, tid)
-            if not task_row:
-                await ctx.send(f"⚠ {ctx.author.mention} task_id not found for your account.")
-                return
-        else:
-            task_row = find_task_for_user_by_name(user_id_text, task_ref.strip())
-            if not task_row:
-                await ctx.send(f"⚠ {ctx.author.mention} no task named **{task_ref}** found. Use `!remindlist` to see your tasks.")
-                return
-            tid = task_row.task_id
+        # Names resolve through the in-memory task index; the active task comes from
+        # the presence index when it is complete, else from active_tasks_by_user
+        task_row = await resolve_task_ref(user_id_text, task_ref)
+        if not task_row:
+            await ctx.send(f"⚠ {ctx.author.mention} no task **{task_ref}** found.{did_you_mean(user_id_text, task_ref)} "
+                           f"Use `!remindlist` to see your tasks.")
+            return
+        tid = task_row.task_id
+        current = await current_presence(user_id_text)
 
-        current = get_active_user_task(user_id_text)
         now = now_est()
+        closing = None
 
         if current:
             if current.task_id == tid:
                 await ctx.send(f"✅ {ctx.author.mention} you're already working on **{task_row.task_name}** (started at {current.start_time}).")
                 return
-            else:
-                prev_start = as_est(current.start_time)
-                duration_hours = max((now - prev_start).total_seconds() / 3600.0, 0.0)
-                add_session_for_task(user_id_text, current.task_id, prev_start, now, duration_hours)
-                delete_active_user_task(user_id_text)
-
-        remove_from_today(user_id_text, task_row.task_name)
-        add_active_user_task(user_id_text, tid, now)
+            prev_start = as_est(current.start_time)
+            prev_end, duration_hours = cap_session(prev_start, now)
+            closing = (current.task_id, prev_start, prev_end, duration_hours)
+
+        # Acknowledged once journaled; Cassandra is updated in the background
+        await journal_transition(
+            user_id_text, closing=closing,
+            start_task_id=tid, start_time=now, start_task_name=task_row.task_name,
+        )
+        await journal_daily_remove(user_id_text, task_row.task_name, now.date())
         await ctx.send(f"▶️ {ctx.author.mention} started **{task_row.task_name}** at {now.strftime('%H:%M %p')} EST.")
 
     @commands.command(
@@ -83,7 +89,7 @@ class Sessions(commands.Cog):
     )
     async def stop(self, ctx: commands.Context):
         user_id_text = str(ctx.author.id)
-        current = get_active_user_task(user_id_text)
+        current = await current_presence(user_id_text)
 
         if not current:
             await ctx.send(f"⚠ {ctx.author.mention} you don't have an active task. Use `!start <task_id|name>`.")
@@ -91,16 +97,18 @@ class Sessions(commands.Cog):
 
         now = now_est()
         start_time = as_est(current.start_time)
-        duration_hours = max((now - start_time).total_seconds() / 3600.0, 0.0)
+        end_time, duration_hours = cap_session(start_time, now)
 
-        task_row = get_user_task(user_id_text, current.task_id)
-        task_name = getattr(task_row, "task_name", str(current.task_id))
-        add_session_for_task(user_id_text, current.task_id, start_time, now, duration_hours)
-        delete_active_user_task(user_id_text)
+        await journal_transition(user_id_text, closing=(current.task_id, start_time, end_time, duration_hours))
+        task_name = current.task_name
+        if task_name is None:
+            task_row = await get_user_task_aio(user_id_text, current.task_id)
+            task_name = getattr(task_row, "task_name", str(current.task_id))
 
         await ctx.send(
             f"⏹️ {ctx.author.mention} stopped **{task_name}**. Logged **{duration_hours:.2f}h** "
-            f"(from {start_time.strftime('%H:%M %p')} to {now.strftime('%H:%M %p')} EST)."
+            f"(from {start_time.strftime('%H:%M %p')} to {end_time.strftime('%H:%M %p')} EST)."
+            + (" Capped at the session limit." if end_time != now else "")
         )
 
 async def setup(bot: commands.Bot):
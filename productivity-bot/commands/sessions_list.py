@@ -1,11 +1,11 @@
-import uuid
-
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List
+from discord import app_commands
 from discord.ext import commands
 from zoneinfo import ZoneInfo
-from database.task_queries import get_all_user_tasks, get_user_task
+from database.task_queries import get_all_user_tasks
 from database.session_queries import get_sessions_for_user_task_range
+from commands.sessions import resolve_task_ref, task_name_autocomplete, did_you_mean
 
 EST = ZoneInfo("America/Toronto")
 
@@ -18,29 +18,13 @@ def as_est(dt: datetime) -> datetime:
         dt = dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(EST)
 
-def try_parse_uuid(s: str) -> Optional[uuid.UUID]:
-    try:
-        return uuid.UUID(s)
-    except Exception:
-        return None
-
-def resolve_task_for_user(user_id_text: str, task_ref: str):
-    tid = try_parse_uuid(task_ref.strip())
-    if tid:
-        return get_user_task(user_id_text, tid)
-    ref_lower = task_ref.strip().lower()
-    for row in get_all_user_tasks(user_id_text):
-        if row.task_name and row.task_name.lower() == ref_lower:
-            return row
-    return None
-
 class SessionsList(commands.Cog):
     """List work sessions for the past 24h or week, plus a total."""
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    @commands.command(
+    @commands.hybrid_command(
         name="sessions",
         help="List your sessions in the past 24h or week (with a total).\n"
              "Usage: !sessions [24h|week] [optional task name or task_id]\n"
@@ -49,8 +33,12 @@ class SessionsList(commands.Cog):
              "  !sessions week\n"
              "  !sessions 24h \"Write journal\""
     )
+    @app_commands.rename(task_ref="task")
+    @app_commands.describe(period="24h or week (default 24h)", task_ref="Only this task")
+    @app_commands.autocomplete(task_ref=task_name_autocomplete)
     async def sessions_cmd(self, ctx: commands.Context, period: Optional[str] = None, *, task_ref: Optional[str] = None):
         user_id = str(ctx.author.id)
+        await ctx.defer()
         period_norm = (period or "24h").lower()
 
         if period_norm not in ("24h", "week"):
@@ -67,15 +55,16 @@ class SessionsList(commands.Cog):
 
         if task_ref:
             # Single task
-            task_row = resolve_task_for_user(user_id, task_ref)
+            task_row = await resolve_task_ref(user_id, task_ref)
             if not task_row:
-                await ctx.send(f"⚠ {ctx.author.mention} I couldn't find a task matching **{task_ref}**.")
+                await ctx.send(f"⚠ {ctx.author.mention} I couldn't find a task matching **{task_ref}**."
+                               f"{did_you_mean(user_id, task_ref)}")
                 return
             sessions = get_sessions_for_user_task_range(user_id, task_row.task_id, start_from=start_utc, end_before=end_utc)
             for s in sessions:
                 start = as_est(s.start_time)
                 end   = as_est(s.end_time)
-                dur   = float(getattr(s, "duration_hours", 0.0) or 0.0)
+                dur   = s.duration_hours or 0.0
                 total_hours += dur
                 sessions_data.append((task_row.task_name, start, end, dur))
         else:
@@ -85,7 +74,7 @@ class SessionsList(commands.Cog):
                 for s in sessions:
                     start = as_est(s.start_time)
                     end   = as_est(s.end_time)
-                    dur   = float(getattr(s, "duration_hours", 0.0) or 0.0)
+                    dur   = s.duration_hours or 0.0
                     total_hours += dur
                     sessions_data.append((t.task_name, start, end, dur))
 
@@ -0,0 +1,131 @@
+import asyncio
+import discord
+import numpy as np
+
+from datetime import datetime, timezone
+from typing import Optional
+from discord.ext import commands
+from commands.hours import window_bounds_utc
+from database.task_queries import get_all_user_tasks
+from database.session_archive_queries import task_history
+from analytics.session_stats import (
+    SessionArrays, compute_stats, to_epoch_seconds,
+    render_heatmap, render_sparkline, day_label,
+)
+
+TOP_TASKS = 8
+
+def load_session_arrays(user_id: str, start_utc, end_utc) -> tuple[SessionArrays, np.ndarray, int]:
+    """
+    Pull start/end for every session of every task in the window into flat arrays.
+    The only per-row Python work is two list appends; conversion is done by NumPy.
+    Archived months only keep totals, so they come back separately as
+    (arrays, archived hours per task aligned with arrays.task_names, archived session count).
+    """
+    starts: list[datetime] = []
+    ends: list[datetime] = []
+    counts: list[int] = []
+    names: list[str] = []
+    archived: list[float] = []
+    archived_sessions = 0
+    for t in get_all_user_tasks(user_id):
+        summaries, sessions = task_history(user_id, t.task_id, start_utc, end_utc)
+        n = 0
+        for s in sessions:
+            if s.start_time is None or s.end_time is None:
+                continue
+            starts.append(s.start_time)
+            ends.append(s.end_time)
+            n += 1
+        seconds = sum(m.total_seconds for m in summaries)
+        if n or seconds:
+            counts.append(n)
+            names.append(t.task_name or str(t.task_id))
+            archived.append(seconds / 3600.0)
+            archived_sessions += sum(m.session_count for m in summaries)
+
+    task = np.repeat(np.arange(len(names), dtype=np.int32), counts)
+    arrays = SessionArrays(to_epoch_seconds(starts), to_epoch_seconds(ends), task, names)
+    return arrays, np.asarray(archived, dtype=np.float64), archived_sessions
+
+def _task_share(task_names: list[str], task_hours: np.ndarray) -> str:
+    order = np.argsort(task_hours)[::-1]
+    total = task_hours.sum()
+    lines = []
+    for i in order[:TOP_TASKS]:
+        hours = task_hours[i]
+        if hours <= 0:
+            break
+        share = hours / total
+        bar = "█" * max(1, int(round(share * 10)))
+        lines.append(f"`{bar:<10}` {share:5.1%} **{task_names[i]}** ({hours:.2f}h)")
+    if len(order) > TOP_TASKS:
+        lines.append(f"… and {len(order) - TOP_TASKS} more task(s)")
+    return "\n".join(lines)[:1024]
+
+def _epoch(dt: Optional[datetime]) -> Optional[int]:
+    return int(dt.replace(tzinfo=timezone.utc).timestamp()) if dt else None
+
+def build_stats_embed(user_id: str, scope: Optional[str]):
+    start_utc, end_utc, label = window_bounds_utc(scope)
+    arrays, archived_hours, archived_sessions = load_session_arrays(user_id, start_utc, end_utc)
+    stats = compute_stats(arrays, _epoch(start_utc), _epoch(end_utc))
+    task_hours = stats.task_hours + archived_hours
+    total_hours = float(task_hours.sum())
+    if total_hours <= 0:
+        return None, label
+
+    description = f"**{total_hours:.2f}h** across **{len(arrays.start) + archived_sessions}** session(s)"
+    if archived_sessions:
+        description += (f"\n{archived_hours.sum():.2f}h of that is in archived months, "
+                        f"which count toward the totals but not the heatmap or trend")
+    embed = discord.Embed(
+        title=f"When you work ({label})",
+        description=description,
+        color=discord.Color.blurple(),
+    )
+    if stats.total_hours <= 0:
+        embed.add_field(name="Per-task share", value=_task_share(arrays.task_names, task_hours), inline=False)
+        return embed, label
+
+    embed.add_field(
+        name="Weekday × hour (Eastern)",
+        value=f"```\n{render_heatmap(stats.heatmap)}\n```",
+        inline=False,
+    )
+
+    busiest_day, busiest_hour = np.unravel_index(np.argmax(stats.heatmap), stats.heatmap.shape)
+    active_days = int(np.count_nonzero(stats.daily_hours))
+    trend = render_sparkline(stats.daily_hours)
+    embed.add_field(
+        name=f"Daily trend ({day_label(stats.days[0])} → {day_label(stats.days[-1])})",
+        value=f"`{trend}`\nActive on {active_days}/{len(stats.days)} day(s), "
+              f"avg **{stats.daily_hours.mean():.2f}h**/day · peak slot "
+              f"{['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'][busiest_day]} {busiest_hour:02d}:00",
+        inline=False,
+    )
+
+    embed.add_field(name="Per-task share", value=_task_share(arrays.task_names, task_hours), inline=False)
+    return embed, label
+
+class Stats(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @commands.command(
+        name="stats",
+        help="Show when you work: weekday × hour heatmap, daily trend and per-task share.\n"
+             "Usage: !stats [week|month|year|all]"
+    )
+    async def stats(self, ctx: commands.Context, scope: Optional[str] = None):
+        user_id = str(ctx.author.id)
+        async with ctx.typing():
+            embed, label = await asyncio.to_thread(build_stats_embed, user_id, scope)
+
+        if embed is None:
+            await ctx.send(f"✅ {ctx.author.mention} no sessions in **{label}** yet.")
+            return
+        await ctx.send(content=ctx.author.mention, embed=embed)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Stats(bot))
@@ -0,0 +1,58 @@
+import asyncio
+
+from typing import Optional
+from discord.ext import commands
+from database.task_queries import get_all_user_tasks
+from database.session_archive_queries import task_history
+from database.streak_queries import get_streak, rebuild_streak, local_date, StreakState
+
+def rebuild_user_streak(user_id: str) -> StreakState:
+    """
+    Recompute a user's streak from their session history (one paged pass over each
+    task partition, plus the active days kept in archived month summaries).
+    Completed daily-list items aren't kept historically, so a rebuild only sees
+    days with logged time.
+    """
+    days = set()
+    for t in get_all_user_tasks(user_id):
+        summaries, sessions = task_history(user_id, t.task_id)
+        for m in summaries:
+            days.update(m.days())
+        for s in sessions:
+            if s.end_time is not None:
+                days.add(local_date(s.end_time))
+    return rebuild_streak(user_id, sorted(days))
+
+class Streak(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @commands.command(
+        name="streak",
+        help="Show your current and best streak of active days.\n"
+             "Usage: !streak [rebuild]  (rebuild recomputes it from your session history)"
+    )
+    async def streak(self, ctx: commands.Context, action: Optional[str] = None):
+        user_id = str(ctx.author.id)
+
+        if action and action.lower() == "rebuild":
+            async with ctx.typing():
+                state = await asyncio.to_thread(rebuild_user_streak, user_id)
+        elif action:
+            await ctx.send(f"⚠ {ctx.author.mention} usage: `!streak [rebuild]`.")
+            return
+        else:
+            state = await asyncio.to_thread(get_streak, user_id)
+
+        current = state.shown_current(local_date())
+        if state.best == 0:
+            await ctx.send(f"🔥 {ctx.author.mention} no streak yet — log some time or finish a daily task to start one.")
+            return
+
+        since = f" (since {state.start:%b %d})" if current and state.start else ""
+        await ctx.send(
+            f"🔥 {ctx.author.mention} current streak: **{current}** day(s){since} · best: **{state.best}** day(s)"
+        )
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Streak(bot))
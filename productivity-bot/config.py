@@ -0,0 +1,35 @@
+# config.py
+"""
+Single place the .env file is loaded. Import this before anything that reads
+the environment; loading happens once, at first import.
+"""
+import os
+
+from pathlib import Path
+from dotenv import load_dotenv, find_dotenv
+
+BASE_DIR = Path(__file__).resolve().parent
+ENV_FILE = ".env"
+
+def _load_env() -> Path | None:
+    # Load .env from: local dir, parent dir, or search upwards from CWD
+    for p in (BASE_DIR / ENV_FILE, BASE_DIR.parent / ENV_FILE):
+        if p.is_file():
+            load_dotenv(p)
+            return p
+    dp = find_dotenv(usecwd=True)
+    if dp:
+        load_dotenv(dp)
+        return Path(dp)
+    return None
+
+ENV_PATH = _load_env()
+
+DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
+CHANNEL_ID = int(os.getenv("CHANNEL_ID", 0))
+
+CASSANDRA_KEYSPACE = os.getenv("CASSANDRA_KEYSPACE")
+CASSANDRA_PASSWORD = os.getenv("CASSANDRA_PASSWORD")
+CASSANDRA_USER = os.getenv("CASSANDRA_USER")
+CASSANDRA_PORT = int(os.getenv("CASSANDRA_PORT", 9042))
+CASSANDRA_HOST = os.getenv("CASSANDRA_HOST")
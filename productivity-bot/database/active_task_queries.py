@@ -1,34 +1,77 @@
-from .cassandra_client import session
+from datetime import datetime
+from cassandra.query import BatchStatement, BatchType, SimpleStatement
+from .cassandra_client import session, execute_aio, TUPLES
+from .models import ActiveTaskRow, columns, decode_one
+from .presence_index import mark_active, mark_inactive
+from .leaderboard_queries import record_session_seconds_aio
+from .streak_queries import schedule_activity, local_date
+
+ACTIVE_TASKS_TABLE_CQL = """
+    CREATE TABLE IF NOT EXISTS active_tasks_by_user (
+        user_id TEXT,
+        task_id UUID,
+        start_time TIMESTAMP,
+        idle_asked_at TIMESTAMP,
+        still_working_at TIMESTAMP,
+        PRIMARY KEY (user_id)
+    )
+"""
+
+# Idle-check state for auto-stop, shared by every process: when the user was last
+# asked "still working?" and when they last said yes. Both outlive the session they
+# were set for, so readers compare them with its start_time.
+ADD_ACTIVE_IDLE_ASKED_CQL = "ALTER TABLE active_tasks_by_user ADD idle_asked_at TIMESTAMP"
+ADD_ACTIVE_STILL_WORKING_CQL = "ALTER TABLE active_tasks_by_user ADD still_working_at TIMESTAMP"
 
 def create_active_tasks_table():
-    query = """
-                CREATE TABLE IF NOT EXISTS active_tasks_by_user (
-                    user_id TEXT,
-                    task_id UUID,
-                    start_time TIMESTAMP,
-                    PRIMARY KEY (user_id)
-                )
-            """
-        
-    session.execute(query)
+    session.execute(ACTIVE_TASKS_TABLE_CQL)
 
-def get_active_user_task(user_id):
-    query = """
-                SELECT * FROM active_tasks_by_user WHERE user_id = %s
+def get_active_user_task(user_id) -> ActiveTaskRow | None:
+    query = f"""
+                SELECT {columns(ActiveTaskRow)} FROM active_tasks_by_user WHERE user_id = %s
             """
     
-    result = session.execute(query, (user_id,))
-    row = result.one()
-    return row
+    result = session.execute(query, (user_id,), execution_profile=TUPLES)
+    return decode_one(ActiveTaskRow, result)
+
+
+async def get_active_user_task_aio(user_id) -> ActiveTaskRow | None:
+    rows = await execute_aio(f"""
+        SELECT {columns(ActiveTaskRow)} FROM active_tasks_by_user WHERE user_id = %s
+    """, (user_id,), execution_profile=TUPLES)
+    return decode_one(ActiveTaskRow, rows)
 
+async def get_idle_state_aio(user_id) -> tuple[datetime | None, datetime | None, datetime | None]:
+    """(start_time, idle_asked_at, still_working_at) of the user's active row, naive UTC."""
+    rows = await execute_aio("""
+        SELECT start_time, idle_asked_at, still_working_at FROM active_tasks_by_user WHERE user_id = %s
+    """, (user_id,), execution_profile=TUPLES)
+    return tuple(rows[0]) if rows else (None, None, None)
 
-def add_active_user_task(user_id, task_id, start_time):
+async def claim_idle_check_aio(user_id, start_time, asked_at, previous) -> bool:
+    """Record that we asked, unless another process got there first (LWT on the last value seen)."""
+    rows = await execute_aio("""
+        UPDATE active_tasks_by_user SET idle_asked_at = %s
+        WHERE user_id = %s IF start_time = %s AND idle_asked_at = %s
+    """, (asked_at, user_id, start_time, previous), execution_profile=TUPLES)
+    return bool(rows and rows[0][0])
+
+async def mark_still_working_aio(user_id, start_time, at) -> bool:
+    """The user answered "still working"; False if that session is no longer the active one."""
+    rows = await execute_aio("""
+        UPDATE active_tasks_by_user SET still_working_at = %s
+        WHERE user_id = %s IF start_time = %s
+    """, (at, user_id, start_time), execution_profile=TUPLES)
+    return bool(rows and rows[0][0])
+
+def add_active_user_task(user_id, task_id, start_time, task_name=None):
     query = """
                 INSERT INTO active_tasks_by_user (user_id, task_id, start_time)
                 VALUES (%s, %s, %s);
             """
     
     session.execute(query, (user_id, task_id, start_time))
+    mark_active(user_id, task_id, start_time, task_name)
 
 def delete_active_user_task(user_id):
     query = """
@@ -36,3 +79,70 @@ def delete_active_user_task(user_id):
             """
     
     session.execute(query, (user_id,))
+    mark_inactive(user_id)
+
+
+def build_transition_batch(user_id, closing=None, start_task_id=None, start_time=None, timestamp=None):
+    """
+    One logged batch for a !start/!stop state change, so a crash can't leave the
+    active row and the session log disagreeing.
+      closing: (task_id, start_time, end_time, duration_hours) of the session being
+               closed, or None if nothing was active.
+      start_task_id/start_time: the new active task, or None to just stop.
+    Switching tasks overwrites the active row instead of delete + insert: statements in
+    a batch share a write timestamp, and on a tie the delete's tombstone would win.
+      timestamp: explicit write time (microseconds). Replaying the same batch with the
+               same timestamp is a no-op, and older replays lose to newer writes.
+    """
+    batch = BatchStatement(batch_type=BatchType.LOGGED)
+    # USING TIMESTAMP on each statement overrides the batch's client-side default
+    using = "" if timestamp is None else f" USING TIMESTAMP {int(timestamp)}"
+    if closing is not None:
+        task_id, started, ended, duration_hours = closing
+        batch.add(SimpleStatement(f"""
+            INSERT INTO sessions_by_user_task (user_id, task_id, start_time, end_time, duration_hours)
+            VALUES (%s, %s, %s, %s, %s){using}
+        """), (user_id, task_id, started, ended, duration_hours))
+
+    if start_task_id is not None:
+        batch.add(SimpleStatement(f"""
+            INSERT INTO active_tasks_by_user (user_id, task_id, start_time)
+            VALUES (%s, %s, %s){using}
+        """), (user_id, start_task_id, start_time))
+    else:
+        batch.add(SimpleStatement(f"""
+            DELETE FROM active_tasks_by_user{using} WHERE user_id = %s
+        """), (user_id,))
+    return batch
+
+async def _session_counted(user_id, task_id, start_time) -> bool:
+    rows = await execute_aio("""
+        SELECT counted FROM sessions_by_user_task WHERE user_id = %s AND task_id = %s AND start_time = %s
+    """, (user_id, task_id, start_time), execution_profile=TUPLES)
+    return bool(rows and rows[0][0])
+
+async def transition_active_task_aio(user_id, closing=None, start_task_id=None, start_time=None, start_task_name=None,
+                                     timestamp=None, update_presence=True):
+    """
+    Apply a state change. The closed session's leaderboard seconds are part of the
+    unit: they are awaited (a failure raises, so the journal keeps the entry) and
+    then the session row is flagged counted, so replaying the entry adds them once.
+    Only a crash between the increment and the flag can still count twice.
+    """
+    counted = closing is not None and await _session_counted(user_id, closing[0], closing[1])
+    await execute_aio(build_transition_batch(user_id, closing, start_task_id, start_time, timestamp))
+    if closing is not None:
+        task_id, started, ended, duration_hours = closing
+        if not counted:
+            await record_session_seconds_aio(user_id, started, duration_hours)
+            await execute_aio("""
+                UPDATE sessions_by_user_task SET counted = true
+                WHERE user_id = %s AND task_id = %s AND start_time = %s
+            """, (user_id, task_id, started))
+        schedule_activity(user_id, local_date(ended))
+    if not update_presence:
+        return
+    if start_task_id is not None:
+        mark_active(user_id, start_task_id, start_time, start_task_name)
+    else:
+        mark_inactive(user_id)
@@ -1,24 +1,124 @@
-import os
+import asyncio
+import logging
+import threading
 
-from dotenv import load_dotenv
-from pathlib import Path
-from cassandra.cluster import Cluster
+from cassandra.cluster import Cluster, ExecutionProfile, EXEC_PROFILE_DEFAULT
+from cassandra.query import tuple_factory
 from cassandra.auth import PlainTextAuthProvider
+from config import (
+    CASSANDRA_KEYSPACE, CASSANDRA_PASSWORD, CASSANDRA_USER, CASSANDRA_PORT, CASSANDRA_HOST,
+)
 
-BASE_DIR = Path(__file__).resolve().parents[2]
-ENV_FILE = ".env"
+# Execution profile whose rows are plain tuples; used with database.models
+TUPLES = "tuples"
 
-load_dotenv(BASE_DIR / ENV_FILE)
+cluster: Cluster | None = None
+_session = None
+_connect_lock = threading.Lock()
 
-CASSANDRA_KEYSPACE = os.getenv('CASSANDRA_KEYSPACE')
-CASSANDRA_PASSWORD = os.getenv('CASSANDRA_PASSWORD')
-CASSANDRA_USER = os.getenv('CASSANDRA_USER')
-CASSANDRA_PORT = int(os.getenv("CASSANDRA_PORT", 9042))
-CASSANDRA_HOST = os.getenv('CASSANDRA_HOST')
+def connect():
+    """
+    Open the cluster connection. Idempotent and thread-safe; main.py calls it in a
+    worker thread at startup so cogs load while the driver handshakes.
+    """
+    global cluster, _session
+    with _connect_lock:
+        if _session is not None:
+            return _session
+        auth_provider = PlainTextAuthProvider(username=CASSANDRA_USER, password=CASSANDRA_PASSWORD)
+        profiles = {
+            EXEC_PROFILE_DEFAULT: ExecutionProfile(),
+            TUPLES: ExecutionProfile(row_factory=tuple_factory),
+        }
+        cluster = Cluster([CASSANDRA_HOST], port=CASSANDRA_PORT, auth_provider=auth_provider,
+                          execution_profiles=profiles)
+        _session = cluster.connect(CASSANDRA_KEYSPACE)
+        logging.info("[Cassandra] Connected to keyspace: %s", CASSANDRA_KEYSPACE)
+        return _session
 
-auth_provider = PlainTextAuthProvider(username=CASSANDRA_USER, password=CASSANDRA_PASSWORD)
-cluster = Cluster([CASSANDRA_HOST], port=CASSANDRA_PORT, auth_provider=auth_provider)
-session = cluster.connect(CASSANDRA_KEYSPACE)
-session.set_keyspace(CASSANDRA_KEYSPACE)
+def get_session():
+    return _session if _session is not None else connect()
 
-print(f"[Cassandra] Connected to keyspace: {CASSANDRA_KEYSPACE}")
\ No newline at end of file
+def get_cluster() -> Cluster:
+    get_session()
+    return cluster
+
+def is_connected() -> bool:
+    return _session is not None
+
+class _LazySession:
+    """
+    Stands in for the driver Session so modules can keep `from .cassandra_client
+    import session` without connecting at import time. The first attribute access
+    connects if startup hasn't already.
+    """
+    def __getattr__(self, name):
+        return getattr(get_session(), name)
+
+session = _LazySession()
+
+async def execute_aio(query, params=None, execution_profile=EXEC_PROFILE_DEFAULT):
+    """
+    Run a statement with execute_async and await it from the event loop without
+    blocking. Resolves to a list of every row (all pages are fetched).
+    """
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    rows = []
+    response = session.execute_async(query, params, execution_profile=execution_profile)
+
+    def _on_page(page):
+        # Writes resolve with None rather than an empty page
+        if page:
+            rows.extend(page)
+        if response.has_more_pages:
+            response.start_fetching_next_page()
+        else:
+            loop.call_soon_threadsafe(_resolve, rows)
+
+    def _on_error(exc):
+        loop.call_soon_threadsafe(_reject, exc)
+
+    def _resolve(result):
+        if not done.done():
+            done.set_result(result)
+
+    def _reject(exc):
+        if not done.done():
+            done.set_exception(exc)
+
+    response.add_callbacks(_on_page, _on_error)
+    return await done
+
+async def iter_pages_aio(query, params=None, execution_profile=EXEC_PROFILE_DEFAULT):
+    """
+    Async generator over the pages of a paged read. The next page is only requested
+    once the caller comes back for it, so at most one page is held at a time.
+    """
+    loop = asyncio.get_running_loop()
+    waiting = {"page": loop.create_future()}
+    response = session.execute_async(query, params, execution_profile=execution_profile)
+
+    def _settle(fut, result=None, exc=None):
+        if fut.done():
+            return
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(result)
+
+    def _on_page(page):
+        loop.call_soon_threadsafe(_settle, waiting["page"], list(page or ()))
+
+    def _on_error(exc):
+        loop.call_soon_threadsafe(_settle, waiting["page"], None, exc)
+
+    response.add_callbacks(_on_page, _on_error)
+    while True:
+        page = await waiting["page"]
+        if page:
+            yield page
+        if not response.has_more_pages:
+            return
+        waiting["page"] = loop.create_future()
+        response.start_fetching_next_page()
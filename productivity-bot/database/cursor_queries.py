@@ -0,0 +1,29 @@
+# database/cursor_queries.py
+"""Persistent "processed up to" cursors for background jobs that must not skip or repeat work."""
+from datetime import datetime, timezone
+from .cassandra_client import session
+
+CURSORS_TABLE_CQL = """
+    CREATE TABLE IF NOT EXISTS scheduler_cursors (
+        name TEXT PRIMARY KEY,
+        processed_up_to TIMESTAMP
+    )
+"""
+
+def create_cursors_table():
+    session.execute(CURSORS_TABLE_CQL)
+
+def get_cursor(name: str) -> datetime | None:
+    """Last processed instant (aware UTC), or None if the job has never run."""
+    row = session.execute(
+        "SELECT processed_up_to FROM scheduler_cursors WHERE name = %s", (name,)
+    ).one()
+    if row is None or row.processed_up_to is None:
+        return None
+    return row.processed_up_to.replace(tzinfo=timezone.utc)
+
+def set_cursor(name: str, processed_up_to: datetime):
+    session.execute(
+        "INSERT INTO scheduler_cursors (name, processed_up_to) VALUES (%s, %s)",
+        (name, processed_up_to),
+    )
@@ -1,26 +1,97 @@
 # database/daily_remaining_queries.py
-from datetime import datetime
+import os
+import asyncio
+import logging
+
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 from cassandra.query import SimpleStatement
-from .cassandra_client import session
+from .cassandra_client import session, execute_aio
+from .cursor_queries import get_cursor, set_cursor
+from .token_ranges import token_slices, scan_slice
 from .task_queries import get_user_task
 from .reminder_queries import DAILY_SENTINEL_DOW
+from .streak_queries import record_activity, schedule_activity
 
 TZ = ZoneInfo("America/Toronto")
 
+# Each day's list is its own partition and is only read on that day, so rows expire
+# on their own and whole SSTables are dropped once their TWCS window is past the TTL.
+DAILY_REMAINING_TTL_DAYS = int(os.getenv("DAILY_REMAINING_TTL_DAYS", 7))
+DAILY_REMAINING_TTL_SECONDS = DAILY_REMAINING_TTL_DAYS * 86400
+
 def _today_est_date():
     return datetime.now(TZ).date()
 
+DAILY_REMAINING_TABLE_CQL = """
+    CREATE TABLE IF NOT EXISTS daily_remaining_by_user (
+        user_id TEXT,
+        date DATE,
+        task_name TEXT,
+        added_at TIMESTAMP,
+        PRIMARY KEY ((user_id, date), task_name)
+    ) WITH CLUSTERING ORDER BY (task_name ASC)
+      AND default_time_to_live = {ttl}
+      AND compaction = {{
+          'class': 'TimeWindowCompactionStrategy',
+          'compaction_window_unit': 'DAYS',
+          'compaction_window_size': 1
+      }}
+""".format(ttl=DAILY_REMAINING_TTL_SECONDS)
+
+# Applies the TTL/compaction settings to tables created before they existed (or after
+# DAILY_REMAINING_TTL_DAYS changes). Rows already written keep the TTL they had.
+DAILY_REMAINING_OPTIONS_CQL = """
+    ALTER TABLE daily_remaining_by_user
+    WITH default_time_to_live = {ttl}
+     AND compaction = {{
+         'class': 'TimeWindowCompactionStrategy',
+         'compaction_window_unit': 'DAYS',
+         'compaction_window_size': 1
+     }}
+""".format(ttl=DAILY_REMAINING_TTL_SECONDS)
+
+TTL_BACKFILL_CURSOR = "daily_remaining_ttl_backfill"
+_backfill_lock = asyncio.Lock()
+
 def create_daily_remaining_table():
-    session.execute("""
-        CREATE TABLE IF NOT EXISTS daily_remaining_by_user (
-            user_id TEXT,
-            date DATE,
-            task_name TEXT,
-            added_at TIMESTAMP,
-            PRIMARY KEY ((user_id, date), task_name)
-        ) WITH CLUSTERING ORDER BY (task_name ASC)
-    """)
+    session.execute(DAILY_REMAINING_TABLE_CQL)
+
+async def backfill_daily_remaining_ttl() -> int:
+    """
+    One-time pass over rows written before the table had a default TTL (they never
+    expire): dates past the window are deleted, recent ones re-written with the TTL
+    they have left. Completion is recorded as a cursor, so later calls return at
+    once. Returns the number of rows fixed.
+    """
+    async with _backfill_lock:
+        if await asyncio.to_thread(get_cursor, TTL_BACKFILL_CURSOR) is not None:
+            return 0
+        today = _today_est_date()
+        fixed = 0
+        for lo, hi in token_slices(1):
+            async for page in scan_slice("daily_remaining_by_user", ("user_id", "date"),
+                                         "user_id, date, task_name, added_at, TTL(added_at)", lo, hi):
+                for user_id, day, task_name, added_at, ttl in page:
+                    if ttl is not None:
+                        continue
+                    day = day.date() if hasattr(day, "date") else day
+                    expires = day + timedelta(days=DAILY_REMAINING_TTL_DAYS)
+                    if expires <= today:
+                        await execute_aio("""
+                            DELETE FROM daily_remaining_by_user
+                            WHERE user_id = %s AND date = %s AND task_name = %s
+                        """, (user_id, day, task_name))
+                    else:
+                        await execute_aio("""
+                            INSERT INTO daily_remaining_by_user (user_id, date, task_name, added_at)
+                            VALUES (%s, %s, %s, %s) USING TTL %s
+                        """, (user_id, day, task_name, added_at, (expires - today).days * 86400))
+                    fixed += 1
+        await asyncio.to_thread(set_cursor, TTL_BACKFILL_CURSOR, datetime.now(timezone.utc))
+        if fixed:
+            logging.info("Daily list TTL backfill: fixed %d row(s) written without a TTL.", fixed)
+        return fixed
 
 def list_remaining_today(user_id: str):
     today = _today_est_date()
@@ -37,6 +108,24 @@ def remove_from_today(user_id: str, task_name: str):
         WHERE user_id = %s AND date = %s AND task_name = %s
     """)
     session.execute(stmt, (user_id, today, task_name))
+    record_activity(user_id, today)
+
+async def remove_from_today_aio(user_id: str, task_name: str, day=None, timestamp=None):
+    """day defaults to today; timestamp (microseconds) makes a replayed delete idempotent."""
+    day = day or _today_est_date()
+    stmt = SimpleStatement("""
+        DELETE FROM daily_remaining_by_user
+        WHERE user_id = %s AND date = %s AND task_name = %s
+    """)
+    if timestamp is not None:
+        stmt = SimpleStatement("""
+            DELETE FROM daily_remaining_by_user USING TIMESTAMP %s
+            WHERE user_id = %s AND date = %s AND task_name = %s
+        """)
+        await execute_aio(stmt, (timestamp, user_id, day, task_name))
+    else:
+        await execute_aio(stmt, (user_id, day, task_name))
+    schedule_activity(user_id, day)
 
 def add_to_today(user_id: str, task_name: str):
     """Idempotent add for today's list."""
@@ -52,11 +141,13 @@ def today_dow_sunday0(now_local: datetime) -> int:
     # Python Mon=0..Sun=6 -> Sun=0..Sat=6
     return (now_local.weekday() + 1) % 7
 
-def seed_today_from_reminders():
+def seed_today_from_reminders(user_filter=None):
     """
     Fill daily_remaining_by_user for all users/tasks due today:
       - daily (dow = -1) across 24 hours
       - weekly for today's DOW across 24 hours
+    user_filter: optional predicate on user_id; users it rejects are skipped
+    (used to seed only this process's slice of users).
     """
     now_local = datetime.now(TZ)
     today = now_local.date()
@@ -75,11 +166,15 @@ def seed_today_from_reminders():
 
     for hr in range(24):
         for row in session.execute(q_daily, (hr, DAILY_SENTINEL_DOW)):
+            if user_filter and not user_filter(row.user_id):
+                continue
             trow = get_user_task(row.user_id, row.task_id)
             name = getattr(trow, "task_name", None)
             if name:
                 per_user_names.setdefault(row.user_id, set()).add(name)
         for row in session.execute(q_weekly, (hr, today_dow)):
+            if user_filter and not user_filter(row.user_id):
+                continue
             trow = get_user_task(row.user_id, row.task_id)
             name = getattr(trow, "task_name", None)
             if name:
@@ -0,0 +1,173 @@
+# database/leaderboard_queries.py
+"""
+Counter table of seconds worked per user per period bucket, plus an in-memory
+copy of the buckets people actually look at. A leaderboard is one partition read
+the first time, then served from memory and bumped as sessions are recorded.
+
+The in-memory copy is only touched on the event loop: partition reads run in a
+worker thread and hand their result back, and bumps from blocking writers (bulk
+imports run in threads) are posted to the loop.
+"""
+import asyncio
+import heapq
+import logging
+import time
+
+from collections import defaultdict
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from cassandra.query import BatchStatement, BatchType, SimpleStatement
+from cassandra.concurrent import execute_concurrent_with_args
+from .cassandra_client import session, execute_aio
+
+TZ = ZoneInfo("America/Toronto")
+PERIODS = ("week", "month", "all")
+LEADERBOARD_REFRESH_SECONDS = 300
+
+_totals: dict[tuple[str, str], dict[str, int]] = {}
+_loaded_at: dict[tuple[str, str], float] = {}
+_loop: asyncio.AbstractEventLoop | None = None  # owns the caches; set by the first leaderboard read
+
+LEADERBOARD_TABLE_CQL = """
+    CREATE TABLE IF NOT EXISTS user_seconds_by_period (
+        period TEXT,
+        bucket TEXT,
+        user_id TEXT,
+        seconds COUNTER,
+        PRIMARY KEY ((period, bucket), user_id)
+    )
+"""
+
+def create_leaderboard_table():
+    session.execute(LEADERBOARD_TABLE_CQL)
+
+def period_buckets(ts: datetime) -> dict[str, str]:
+    """Bucket keys for a moment in time, in bot-local time: ISO week, month, all-time."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    local = ts.astimezone(TZ)
+    iso_year, iso_week, _ = local.isocalendar()
+    return {
+        "week": f"{iso_year}-W{iso_week:02d}",
+        "month": local.strftime("%Y-%m"),
+        "all": "all",
+    }
+
+def current_bucket(period: str) -> str:
+    return period_buckets(datetime.now(TZ))[period]
+
+_INCREMENT = """
+    UPDATE user_seconds_by_period SET seconds = seconds + %s
+    WHERE period = %s AND bucket = %s AND user_id = %s
+"""
+
+def _on_loop() -> bool:
+    try:
+        return asyncio.get_running_loop() is _loop
+    except RuntimeError:
+        return False
+
+def _bump(user_id: str, buckets: dict[str, str], seconds: int):
+    # Only buckets already in memory are bumped; the rest load fresh from Cassandra.
+    if _loop is None:
+        return  # nothing loaded yet
+    if not _on_loop():
+        _loop.call_soon_threadsafe(_bump, user_id, buckets, seconds)
+        return
+    for period, bucket in buckets.items():
+        totals = _totals.get((period, bucket))
+        if totals is not None:
+            totals[user_id] = totals.get(user_id, 0) + seconds
+
+def build_counter_batch(user_id: str, start_time: datetime, seconds: int):
+    buckets = period_buckets(start_time)
+    batch = BatchStatement(batch_type=BatchType.COUNTER)
+    for period, bucket in buckets.items():
+        batch.add(SimpleStatement(_INCREMENT), (seconds, period, bucket, user_id))
+    return batch, buckets
+
+def record_session_seconds(user_id: str, start_time: datetime, duration_hours: float):
+    seconds = int(round((duration_hours or 0.0) * 3600))
+    if seconds <= 0:
+        return
+    batch, buckets = build_counter_batch(user_id, start_time, seconds)
+    session.execute(batch)
+    _bump(user_id, buckets, seconds)
+
+async def record_session_seconds_aio(user_id: str, start_time: datetime, duration_hours: float):
+    seconds = int(round((duration_hours or 0.0) * 3600))
+    if seconds <= 0:
+        return
+    batch, buckets = build_counter_batch(user_id, start_time, seconds)
+    await execute_aio(batch)
+    _bump(user_id, buckets, seconds)
+
+def record_sessions_seconds_bulk(sessions, concurrency=64):
+    """
+    Counter side of a bulk load. sessions: iterable of (user_id, start_time, duration_hours).
+    Seconds are summed per (period, bucket, user) first, so a year of history costs
+    one increment per user per week/month rather than one per session.
+    """
+    sums: dict[tuple[str, str, str], int] = defaultdict(int)
+    for user_id, start_time, duration_hours in sessions:
+        seconds = int(round((duration_hours or 0.0) * 3600))
+        if seconds <= 0:
+            continue
+        for period, bucket in period_buckets(start_time).items():
+            sums[(period, bucket, user_id)] += seconds
+    if not sums:
+        return
+
+    stmt = SimpleStatement(_INCREMENT)
+    params = [(secs, period, bucket, user_id) for (period, bucket, user_id), secs in sums.items()]
+    results = execute_concurrent_with_args(session, stmt, params, concurrency=concurrency, raise_on_first_error=False)
+    for (success, result), (secs, period, bucket, user_id) in zip(results, params):
+        if success:
+            _bump(user_id, {period: bucket}, secs)
+        else:
+            logging.error("Leaderboard increment failed for %s %s/%s: %s", user_id, period, bucket, result)
+
+def forget_user(user_id: str):
+    """Drop a user from the in-memory buckets (after their counter rows are zeroed)."""
+    for totals in _totals.values():
+        totals.pop(user_id, None)
+
+def forget_all():
+    """Drop every loaded bucket so the next read reloads it (e.g. after a restore)."""
+    _totals.clear()
+    _loaded_at.clear()
+
+def _read_bucket(period: str, bucket: str) -> dict[str, int]:
+    """One partition read. Blocking; only returns the totals, the caller caches them."""
+    stmt = SimpleStatement("""
+        SELECT user_id, seconds FROM user_seconds_by_period
+        WHERE period = %s AND bucket = %s
+    """, fetch_size=5000)
+    # Purged users keep a zeroed counter cell (counters can't be safely deleted)
+    return {row.user_id: int(row.seconds) for row in session.execute(stmt, (period, bucket)) if row.seconds}
+
+async def get_leaderboard_aio(period: str, limit: int = 10) -> tuple[str, list[tuple[str, int]], dict[str, int]]:
+    """
+    Top `limit` (user_id, seconds) for the current bucket of `period`.
+    One partition read (in a worker thread) on a cache miss; memory-only otherwise.
+    Returns (bucket, top, all_totals).
+    """
+    global _loop
+    _loop = asyncio.get_running_loop()
+    bucket = current_bucket(period)
+    key = (period, bucket)
+    loaded = _loaded_at.get(key)
+    if loaded is None or time.monotonic() - loaded > LEADERBOARD_REFRESH_SECONDS:
+        read_at = time.monotonic()
+        totals = await asyncio.to_thread(_read_bucket, period, bucket)
+        # Back on the loop: drop stale buckets for this period (last week, last month), then cache
+        for old in [k for k in _totals if k[0] == period and k != key]:
+            _totals.pop(old, None)
+            _loaded_at.pop(old, None)
+        _totals[key] = totals
+        _loaded_at[key] = read_at
+    else:
+        totals = _totals[key]
+
+    top = heapq.nlargest(limit, totals.items(), key=lambda kv: kv[1])
+    return bucket, top, totals
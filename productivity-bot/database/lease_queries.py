@@ -0,0 +1,46 @@
+# database/lease_queries.py
+"""Lightweight-transaction leases used to elect one replica per background job."""
+from .cassandra_client import session, execute_aio
+
+LEASES_TABLE_CQL = """
+    CREATE TABLE IF NOT EXISTS job_leases (
+        job_name TEXT PRIMARY KEY,
+        owner TEXT,
+        acquired_at TIMESTAMP
+    )
+"""
+
+def create_leases_table():
+    session.execute(LEASES_TABLE_CQL)
+
+def _applied(rows) -> bool:
+    # LWT results carry an [applied] column as the first field
+    return bool(rows) and bool(rows[0][0])
+
+async def acquire_or_renew_lease_aio(job_name: str, owner: str, ttl_seconds: int) -> bool:
+    """
+    Take the lease if it is free, or extend it if we already hold it.
+    The TTL makes an abandoned lease expire on its own.
+    """
+    renewed = await execute_aio("""
+        UPDATE job_leases USING TTL %s SET owner = %s, acquired_at = toTimestamp(now())
+        WHERE job_name = %s IF owner = %s
+    """, (ttl_seconds, owner, job_name, owner))
+    if _applied(renewed):
+        return True
+
+    acquired = await execute_aio("""
+        INSERT INTO job_leases (job_name, owner, acquired_at)
+        VALUES (%s, %s, toTimestamp(now())) IF NOT EXISTS USING TTL %s
+    """, (job_name, owner, ttl_seconds))
+    return _applied(acquired)
+
+async def release_lease_aio(job_name: str, owner: str) -> bool:
+    rows = await execute_aio("""
+        DELETE FROM job_leases WHERE job_name = %s IF owner = %s
+    """, (job_name, owner))
+    return _applied(rows)
+
+def get_lease_owner(job_name: str):
+    row = session.execute("SELECT owner FROM job_leases WHERE job_name = %s", (job_name,)).one()
+    return row.owner if row else None
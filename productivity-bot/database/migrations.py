@@ -0,0 +1,84 @@
+# database/migrations.py
+"""One-off data migrations, run by an admin command rather than at startup."""
+import logging
+
+from collections import defaultdict
+from cassandra.query import BatchStatement, SimpleStatement
+from .cassandra_client import session
+from .active_task_queries import get_active_user_task, add_active_user_task
+from .session_archive_queries import move_task_history
+from .task_queries import days_to_mask, task_days
+from .reminder_queries import DAILY_SENTINEL_DOW
+
+def merge_weekly_duplicates(fetch_size: int = 1000) -> dict[str, int]:
+    """
+    Collapse legacy weekly reminders that were created as one task per day (same user,
+    name and time) into a single task carrying a reminder_days bitmask.
+    For each group the oldest task survives; the others' sessions (raw and archived
+    summaries), index rows and any active session are moved onto it before they are
+    deleted. Safe to re-run.
+    """
+    stmt = SimpleStatement("""
+        SELECT user_id, task_id, task_name, reminder_type, reminder_time,
+               reminder_day_of_week, reminder_days, created_at
+        FROM tasks_by_user
+    """, fetch_size=fetch_size)
+
+    groups = defaultdict(list)
+    for row in session.execute(stmt):
+        if (row.reminder_type or "").lower() != "weekly" or row.reminder_time is None:
+            continue
+        groups[(row.user_id, row.task_name, str(row.reminder_time))].append(row)
+
+    stats = {"groups": 0, "tasks_removed": 0, "sessions_moved": 0}
+
+    upd_task = SimpleStatement("""
+        UPDATE tasks_by_user SET reminder_days = %s, reminder_day_of_week = %s
+        WHERE user_id = %s AND task_id = %s
+    """)
+    ins_index = SimpleStatement("""
+        INSERT INTO reminders_by_time (
+            reminder_type, reminder_hour, reminder_day_of_week, reminder_minute, task_id, user_id
+        ) VALUES ('weekly', %s, %s, %s, %s, %s)
+    """)
+    del_index = SimpleStatement("""
+        DELETE FROM reminders_by_time
+        WHERE reminder_type = 'weekly' AND reminder_hour = %s
+          AND reminder_day_of_week = %s AND reminder_minute = %s AND task_id = %s
+    """)
+    del_task = SimpleStatement("""
+        DELETE FROM tasks_by_user WHERE user_id = %s AND task_id = %s
+    """)
+
+    for (user_id, name, _), rows in groups.items():
+        if len(rows) == 1 and rows[0].reminder_days:
+            continue  # already in the new shape
+
+        rows.sort(key=lambda r: (r.created_at is None, r.created_at))
+        keep, dupes = rows[0], rows[1:]
+        days = sorted({d for r in rows for d in task_days(r)})
+        if not days:
+            continue
+        hour, minute = keep.reminder_time.hour, keep.reminder_time.minute
+
+        active = get_active_user_task(user_id)
+        for dupe in dupes:
+            stats["sessions_moved"] += move_task_history(user_id, dupe.task_id, keep.task_id)
+            if active and active.task_id == dupe.task_id:
+                add_active_user_task(user_id, keep.task_id, active.start_time, name)
+
+        batch = BatchStatement()
+        batch.add(upd_task, (days_to_mask(days), days[0], user_id, keep.task_id))
+        for d in days:
+            batch.add(ins_index, (hour, d, minute, keep.task_id, user_id))
+        for dupe in dupes:
+            for d in task_days(dupe) or [DAILY_SENTINEL_DOW]:
+                batch.add(del_index, (hour, d, minute, dupe.task_id))
+            batch.add(del_task, (user_id, dupe.task_id))
+        session.execute(batch)
+
+        stats["groups"] += 1
+        stats["tasks_removed"] += len(dupes)
+        logging.info("Merged %d weekly task(s) into %s for user %s", len(dupes), keep.task_id, user_id)
+
+    return stats
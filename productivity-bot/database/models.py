@@ -0,0 +1,64 @@
+# database/models.py
+"""
+Typed row models for the hot read paths.
+
+Queries that use these select an explicit column list (`columns(Model)`) and run
+under the "tuples" execution profile, so the driver hands back plain tuples that
+are decoded positionally. This skips the namedtuple class the default row factory
+builds (and the column-name cleaning it does) for every page, and aggregations
+that only need one column can read it by index without building a row object.
+"""
+from dataclasses import dataclass, fields
+from datetime import datetime, time
+from uuid import UUID
+
+@dataclass(slots=True)
+class TaskRow:
+    user_id: str
+    task_id: UUID
+    task_name: str | None
+    description: str | None
+    reminder_type: str | None
+    reminder_time: time | None
+    reminder_day_of_week: int | None
+    reminder_days: int | None
+    created_at: datetime | None
+
+@dataclass(slots=True)
+class SessionRow:
+    start_time: datetime
+    end_time: datetime | None
+    duration_hours: float | None
+
+@dataclass(slots=True)
+class ReminderRow:
+    reminder_type: str
+    reminder_hour: int
+    reminder_day_of_week: int
+    reminder_minute: int
+    task_id: UUID
+    user_id: str
+
+@dataclass(slots=True)
+class ActiveTaskRow:
+    user_id: str
+    task_id: UUID
+    start_time: datetime
+
+_COLUMNS: dict[type, str] = {}
+
+def columns(model: type) -> str:
+    """Comma-separated select list in the model's field order."""
+    cols = _COLUMNS.get(model)
+    if cols is None:
+        cols = _COLUMNS[model] = ", ".join(f.name for f in fields(model))
+    return cols
+
+def decode(model: type, rows) -> list:
+    """Tuples from the "tuples" profile -> model instances."""
+    return [model(*r) for r in rows]
+
+def decode_one(model: type, rows):
+    for r in rows:
+        return model(*r)
+    return None
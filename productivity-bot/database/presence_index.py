@@ -0,0 +1,121 @@
+# database/presence_index.py
+"""
+In-memory mirror of active_tasks_by_user. Warmed once at startup from a paged scan,
+then kept current by the active-task write helpers, so "who is working right now"
+never needs a Cassandra read. Writes that aren't in Cassandra yet (the journal's)
+are re-applied by the warm overlays at the end of every warm-up, so a re-warm
+never rolls them back.
+"""
+import logging
+import uuid
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from cassandra.query import SimpleStatement
+from .cassandra_client import session
+from .task_queries import get_task_names
+
+@dataclass(frozen=True)
+class Presence:
+    user_id: str
+    task_id: uuid.UUID
+    start_time: datetime  # aware, UTC
+    task_name: str | None = None
+
+_active: dict[str, Presence] = {}
+_listeners: list = []
+_overlays: list = []
+_warmed = False
+_warming = False
+_touched_while_warming: set[str] = set()
+
+def _as_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+def to_millis(dt: datetime) -> datetime:
+    """Truncate to the millisecond precision Cassandra stores timestamps with."""
+    return dt.replace(microsecond=dt.microsecond // 1000 * 1000)
+
+def add_listener(fn):
+    """fn(user_id, Presence | None) is called after every change, including warm-ups."""
+    _listeners.append(fn)
+
+def add_warm_overlay(fn):
+    """fn() is called at the end of every warm-up to re-apply writes the scan can't see yet."""
+    _overlays.append(fn)
+
+def is_warmed() -> bool:
+    """True once the index has been built from a full scan at least once."""
+    return _warmed
+
+def _notify(user_id: str, presence: Presence | None):
+    for fn in _listeners:
+        try:
+            fn(user_id, presence)
+        except Exception:
+            logging.exception("Presence listener failed")
+
+def mark_active(user_id: str, task_id, start_time: datetime, task_name: str | None = None):
+    _active[user_id] = presence = Presence(user_id, task_id, _as_utc(start_time), task_name)
+    if _warming:
+        _touched_while_warming.add(user_id)
+    _notify(user_id, presence)
+
+def mark_inactive(user_id: str):
+    _active.pop(user_id, None)
+    if _warming:
+        _touched_while_warming.add(user_id)
+    _notify(user_id, None)
+
+def get_presence(user_id: str) -> Presence | None:
+    return _active.get(user_id)
+
+def list_presence() -> list[Presence]:
+    """Everyone currently working, longest-running first."""
+    return sorted(_active.values(), key=lambda p: p.start_time)
+
+def warm_presence_index(fetch_size: int = 1000) -> int:
+    """
+    Rebuild the index from one paged scan of active_tasks_by_user. Blocking; run it
+    off the event loop. Entries written by commands during the scan are kept.
+    Task names are resolved after the scan with concurrent reads, not one per row,
+    and only for sessions the index doesn't already know.
+    """
+    global _warming, _warmed
+    _warming = True
+    _touched_while_warming.clear()
+    try:
+        stmt = SimpleStatement(
+            "SELECT user_id, task_id, start_time FROM active_tasks_by_user",
+            fetch_size=fetch_size,
+        )
+        rows = [(row.user_id, row.task_id, row.start_time) for row in session.execute(stmt)]
+        known = {(p.user_id, p.task_id): p.task_name for p in list(_active.values()) if p.task_name}
+        names = get_task_names((u, t) for u, t, _ in rows if (u, t) not in known)
+        names.update(known)
+        snapshot: dict[str, Presence] = {
+            user_id: Presence(user_id, task_id, _as_utc(start_time), names.get((user_id, task_id)))
+            for user_id, task_id, start_time in rows
+        }
+    finally:
+        _warming = False
+
+    for user_id, presence in snapshot.items():
+        if user_id not in _touched_while_warming:
+            _active[user_id] = presence
+            _notify(user_id, presence)
+    for user_id in list(_active):
+        if user_id not in snapshot and user_id not in _touched_while_warming:
+            del _active[user_id]
+            _notify(user_id, None)
+    for fn in _overlays:
+        try:
+            fn()
+        except Exception:
+            logging.exception("Presence warm overlay failed")
+    _warmed = True
+
+    logging.info("Presence index warmed with %d active user(s)", len(_active))
+    return len(_active)
@@ -0,0 +1,153 @@
+# database/purge.py
+"""
+Remove every row belonging to one user, addressed by key so the cost is
+proportional to that user's data rather than to the cluster.
+
+tasks_by_user is the root: each task yields its reminders_by_time keys (type,
+hour, day(s), minute) and its sessions/summaries partitions. Leaderboard
+counters outlive the tasks they were earned on, so every week and month bucket
+from the user's earliest task, session or archived month up to today is read,
+not just the buckets of surviving sessions. Counter cells are zeroed by
+decrementing them rather than deleted: Cassandra can't reliably increment a
+counter again once it has been deleted, and the user may come back.
+daily_remaining_by_user is keyed (user_id, date), but its rows expire after
+DAILY_REMAINING_TTL_DAYS, so only that many recent dates can still hold data
+(rows from before the table had a TTL are fixed by the startup backfill).
+Everything is deleted concurrently, PURGE_CONCURRENCY statements in flight at a
+time.
+"""
+import asyncio
+import logging
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from .cassandra_client import execute_aio, TUPLES
+from .task_queries import get_all_user_tasks_aio, reminder_index_keys
+from .daily_remaining_queries import DAILY_REMAINING_TTL_DAYS
+from .leaderboard_queries import period_buckets, forget_user as forget_leaderboard_user
+from .streak_queries import forget_user as forget_streak_user
+
+TZ = ZoneInfo("America/Toronto")
+PURGE_CONCURRENCY = 32
+
+@dataclass
+class PurgeStats:
+    tasks: int = 0
+    reminder_keys: int = 0
+    sessions: int = 0
+    archived_months: int = 0
+    counter_rows: int = 0
+    daily_partitions: int = 0
+    failed: list[str] = field(default_factory=list)
+
+def _buckets_since(first: date, today: date) -> set[tuple[str, str]]:
+    """Every week and month bucket from first through today, plus all-time."""
+    buckets = {("all", "all")}
+    day = first - timedelta(days=1)  # bot-local midnight can still be the previous UTC day
+    while day <= today:
+        buckets.update(period_buckets(datetime(day.year, day.month, day.day, 12, tzinfo=TZ)).items())
+        day += timedelta(days=1)
+    return buckets
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).astimezone(TZ).date()
+    return value.date() if hasattr(value, "date") else value
+
+async def _counter_buckets(user_id: str, tasks, task_ids, today: date) -> tuple[set[tuple[str, str]], int, int]:
+    starts = await asyncio.gather(*(execute_aio(
+        "SELECT start_time FROM sessions_by_user_task WHERE user_id = %s AND task_id = %s",
+        (user_id, tid), execution_profile=TUPLES) for tid in task_ids))
+    months = await asyncio.gather(*(execute_aio(
+        "SELECT month FROM session_summaries_by_user_task WHERE user_id = %s AND task_id = %s",
+        (user_id, tid), execution_profile=TUPLES) for tid in task_ids))
+
+    first = today
+    sessions = archived = 0
+    for t in tasks:
+        if t.created_at is not None:
+            first = min(first, _as_date(t.created_at))
+    for rows in starts:
+        for (start_time,) in rows:
+            sessions += 1
+            first = min(first, _as_date(start_time))
+    for rows in months:
+        for (month,) in rows:
+            if month is None:
+                continue  # partition holding only the static archived_before
+            archived += 1
+            first = min(first, _as_date(month).replace(day=1))
+    return _buckets_since(first, today), sessions, archived
+
+async def purge_user(user_id: str, today: date | None = None) -> PurgeStats:
+    """Delete the user's rows from every table. Failures are collected, not raised."""
+    stats = PurgeStats()
+    today = today or datetime.now(TZ).date()
+
+    tasks = await get_all_user_tasks_aio(user_id)
+    task_ids = {t.task_id for t in tasks}
+    active = await execute_aio("SELECT task_id FROM active_tasks_by_user WHERE user_id = %s",
+                               (user_id,), execution_profile=TUPLES)
+    task_ids.update(r[0] for r in active if r[0] is not None)
+    stats.tasks = len(tasks)
+
+    buckets, stats.sessions, stats.archived_months = await _counter_buckets(user_id, tasks, task_ids, today)
+    buckets = sorted(buckets)
+    slots = asyncio.Semaphore(PURGE_CONCURRENCY)
+
+    async def read_counter(period, bucket):
+        async with slots:
+            return await execute_aio(
+                "SELECT seconds FROM user_seconds_by_period WHERE period = %s AND bucket = %s AND user_id = %s",
+                (period, bucket, user_id), execution_profile=TUPLES)
+
+    counters = await asyncio.gather(*(read_counter(*b) for b in buckets))
+
+    deletes: list[tuple[str, str, tuple]] = []  # (label, cql, params)
+    for t in tasks:
+        for key in reminder_index_keys(t):
+            deletes.append((f"reminder {key}", """
+                DELETE FROM reminders_by_time
+                WHERE reminder_type = %s AND reminder_hour = %s
+                  AND reminder_day_of_week = %s AND reminder_minute = %s AND task_id = %s
+            """, (*key, t.task_id)))
+            stats.reminder_keys += 1
+    for tid in task_ids:
+        deletes.append((f"sessions {tid}",
+                        "DELETE FROM sessions_by_user_task WHERE user_id = %s AND task_id = %s", (user_id, tid)))
+        deletes.append((f"summaries {tid}",
+                        "DELETE FROM session_summaries_by_user_task WHERE user_id = %s AND task_id = %s", (user_id, tid)))
+    for (period, bucket), rows in zip(buckets, counters):
+        seconds = rows[0][0] if rows else None
+        if seconds:
+            deletes.append((f"counter {period}/{bucket}", """
+                UPDATE user_seconds_by_period SET seconds = seconds - %s
+                WHERE period = %s AND bucket = %s AND user_id = %s
+            """, (seconds, period, bucket, user_id)))
+            stats.counter_rows += 1
+    for back in range(DAILY_REMAINING_TTL_DAYS + 1):
+        day = today - timedelta(days=back)
+        deletes.append((f"daily {day}",
+                        "DELETE FROM daily_remaining_by_user WHERE user_id = %s AND date = %s", (user_id, day)))
+        stats.daily_partitions += 1
+    deletes.append(("active", "DELETE FROM active_tasks_by_user WHERE user_id = %s", (user_id,)))
+    deletes.append(("streak", "DELETE FROM user_streaks WHERE user_id = %s", (user_id,)))
+
+    async def run(label, cql, params):
+        async with slots:
+            try:
+                await execute_aio(cql, params)
+            except Exception as exc:
+                logging.error("Purge of %s: %s failed: %s", user_id, label, exc)
+                stats.failed.append(label)
+
+    await asyncio.gather(*(run(*d) for d in deletes))
+    # The task partition goes last: it is the index to everything else, so a
+    # partially failed purge can simply be run again.
+    if not stats.failed:
+        await run("tasks", "DELETE FROM tasks_by_user WHERE user_id = %s", (user_id,))
+
+    forget_leaderboard_user(user_id)
+    forget_streak_user(user_id)
+    return stats
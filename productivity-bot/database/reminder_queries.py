@@ -1,27 +1,30 @@
 # database/reminder_queries.py
 from cassandra.query import SimpleStatement
-from .cassandra_client import session
+from .cassandra_client import session, execute_aio, TUPLES
+from .models import ReminderRow, columns, decode
+import asyncio
 from datetime import datetime
 from collections import defaultdict
 
 DAILY_SENTINEL_DOW = -1  # -1 for default where DOW not necessary, 0-6 otherwise
 
+REMINDERS_TABLE_CQL = """
+    CREATE TABLE IF NOT EXISTS reminders_by_time (
+        reminder_type TEXT,
+        reminder_hour TINYINT,
+        reminder_day_of_week TINYINT,
+        reminder_minute TINYINT,
+        task_id UUID,
+        user_id TEXT,
+        PRIMARY KEY (
+            (reminder_type, reminder_hour),
+            reminder_day_of_week, reminder_minute, task_id
+        )
+    ) WITH CLUSTERING ORDER BY (reminder_day_of_week ASC, reminder_minute ASC)
+"""
+
 def create_reminders_table():
-    query = """
-        CREATE TABLE IF NOT EXISTS reminders_by_time (
-            reminder_type TEXT,
-            reminder_hour TINYINT,
-            reminder_day_of_week TINYINT,
-            reminder_minute TINYINT,
-            task_id UUID,
-            user_id TEXT,
-            PRIMARY KEY (
-                (reminder_type, reminder_hour),
-                reminder_day_of_week, reminder_minute, task_id
-            )
-        ) WITH CLUSTERING ORDER BY (reminder_day_of_week ASC, reminder_minute ASC);
-    """
-    session.execute(query)
+    session.execute(REMINDERS_TABLE_CQL)
 
 def add_reminder(reminder_type, hour, minute, user_id, task_id, day_of_week):
     dow = DAILY_SENTINEL_DOW if (day_of_week is None) else int(day_of_week)
@@ -30,7 +33,7 @@ def add_reminder(reminder_type, hour, minute, user_id, task_id, day_of_week):
             reminder_type, reminder_hour, reminder_day_of_week, reminder_minute, task_id, user_id
         ) VALUES (%s, %s, %s, %s, %s, %s)
     """)
-    session.execute(query, (reminder_type, hour, minute, dow, task_id, user_id))
+    session.execute(query, (reminder_type, hour, dow, minute, task_id, user_id))
 
 def delete_reminder(reminder_type, hour, minute, task_id, day_of_week):
     dow = DAILY_SENTINEL_DOW if (day_of_week is None) else int(day_of_week)
@@ -43,13 +46,14 @@ def delete_reminder(reminder_type, hour, minute, task_id, day_of_week):
 
 def get_window(reminder_type, hour, minute_bottom, minute_top, day_of_week):
     dow = DAILY_SENTINEL_DOW if (day_of_week is None) else int(day_of_week)
-    query = SimpleStatement("""
-        SELECT * FROM reminders_by_time
+    query = SimpleStatement(f"""
+        SELECT {columns(ReminderRow)} FROM reminders_by_time
         WHERE reminder_type = %s AND reminder_hour = %s
           AND reminder_day_of_week = %s
           AND reminder_minute >= %s AND reminder_minute < %s
     """)
-    return list(session.execute(query, (reminder_type, hour, dow, minute_bottom, minute_top)))
+    rows = session.execute(query, (reminder_type, hour, dow, minute_bottom, minute_top), execution_profile=TUPLES)
+    return decode(ReminderRow, rows)
 
 def get_daily_window(hour, minute_bottom, minute_top):
     return get_window('daily', hour, minute_bottom, minute_top, None)
@@ -89,5 +93,23 @@ def fetch_due_today_user_task_ids(now_local: datetime) -> dict[str, set]:
 
     return by_user
 
+async def fetch_due_today_user_task_ids_aio(now_local: datetime) -> dict[str, set]:
+    """Same as fetch_due_today_user_task_ids, with the 48 partition reads in flight at once."""
+    today_dow = today_dow_sunday0(now_local)
+    query = """
+        SELECT user_id, task_id
+        FROM reminders_by_time
+        WHERE reminder_type = %s AND reminder_hour = %s AND reminder_day_of_week = %s
+    """
+    partitions = [('daily', hr, DAILY_SENTINEL_DOW) for hr in range(24)]
+    partitions += [('weekly', hr, today_dow) for hr in range(24)]
+    results = await asyncio.gather(*(execute_aio(query, p) for p in partitions))
+
+    by_user: dict[str, set] = defaultdict(set)
+    for rows in results:
+        for row in rows:
+            by_user[row.user_id].add(row.task_id)
+    return by_user
+
 def today_dow_sunday0(now_local: datetime) -> int:
     return (now_local.weekday() + 1) % 7
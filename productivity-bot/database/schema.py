@@ -0,0 +1,60 @@
+# database/schema.py
+"""Idempotent schema bootstrap: every table's DDL, run concurrently at startup."""
+import asyncio
+import logging
+
+from cassandra import InvalidRequest
+from .cassandra_client import execute_aio, get_cluster
+from .task_queries import TASKS_TABLE_CQL, ADD_REMINDER_DAYS_CQL
+from .active_task_queries import ACTIVE_TASKS_TABLE_CQL, ADD_ACTIVE_IDLE_ASKED_CQL, ADD_ACTIVE_STILL_WORKING_CQL
+from .reminder_queries import REMINDERS_TABLE_CQL
+from .session_queries import SESSIONS_TABLE_CQL, SESSIONS_OPTIONS_CQL, ADD_SESSIONS_COUNTED_CQL
+from .daily_remaining_queries import DAILY_REMAINING_TABLE_CQL, DAILY_REMAINING_OPTIONS_CQL
+from .leaderboard_queries import LEADERBOARD_TABLE_CQL
+from .streak_queries import STREAKS_TABLE_CQL
+from .lease_queries import LEASES_TABLE_CQL
+from .cursor_queries import CURSORS_TABLE_CQL
+from .session_archive_queries import SESSION_SUMMARIES_TABLE_CQL, ADD_SUMMARY_ACTIVE_DAYS_CQL
+
+TABLES = [
+    TASKS_TABLE_CQL,
+    ACTIVE_TASKS_TABLE_CQL,
+    REMINDERS_TABLE_CQL,
+    SESSIONS_TABLE_CQL,
+    DAILY_REMAINING_TABLE_CQL,
+    LEADERBOARD_TABLE_CQL,
+    STREAKS_TABLE_CQL,
+    LEASES_TABLE_CQL,
+    CURSORS_TABLE_CQL,
+    SESSION_SUMMARIES_TABLE_CQL,
+]
+
+# ALTERs for tables created by older versions; "already exists" errors are expected.
+# Table option ALTERs are idempotent and re-apply env-configured TTL/compaction.
+MIGRATIONS = [
+    ADD_REMINDER_DAYS_CQL,
+    SESSIONS_OPTIONS_CQL,
+    DAILY_REMAINING_OPTIONS_CQL,
+    ADD_SUMMARY_ACTIVE_DAYS_CQL,
+    ADD_SESSIONS_COUNTED_CQL,
+    ADD_ACTIVE_IDLE_ASKED_CQL,
+    ADD_ACTIVE_STILL_WORKING_CQL,
+]
+
+async def _apply_migration(cql: str):
+    try:
+        await execute_aio(cql)
+    except InvalidRequest:
+        pass
+
+async def bootstrap_schema() -> bool:
+    """
+    Create every table (IF NOT EXISTS) concurrently, then apply column migrations,
+    then wait for the cluster to agree on the schema. Returns whether it agreed.
+    """
+    await asyncio.gather(*(execute_aio(cql) for cql in TABLES))
+    await asyncio.gather(*(_apply_migration(cql) for cql in MIGRATIONS))
+    agreed = await asyncio.to_thread(get_cluster().control_connection.wait_for_schema_agreement)
+    if not agreed:
+        logging.warning("Schema agreement not reached after bootstrap; continuing anyway.")
+    return agreed
@@ -0,0 +1,320 @@
+# database/session_archive_queries.py
+"""
+Monthly roll-ups of old sessions.
+
+Raw sessions that start before a partition's static `archived_before` are
+represented by one summary row per (task, UTC month) instead. `archived_before`
+is always the first instant of a month, so a summary month is either fully
+archived or not at all. Readers take months before it from summaries and
+anything after it from sessions_by_user_task, so all-time totals cost one read
+per month rather than one row per session. Each summary also keeps the local
+days it had activity on, so streaks can still be rebuilt from archived history.
+
+Summaries have month granularity: a range whose edge falls inside an archived
+month can't be split exactly (and with SESSION_ARCHIVE_DELETE_RAW the raw rows
+are gone), so archiving stays clear of every rolling window the commands use.
+"""
+import os
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from cassandra.query import BatchStatement, BatchType, SimpleStatement
+from .cassandra_client import session
+from typing import Iterator
+from .models import SessionRow
+from .session_queries import iter_sessions_for_user_task_range, sum_session_hours, copy_task_sessions
+from .streak_queries import local_date
+
+# The longest rolling window (!hours/!stats/!export year, 365 days) plus a month, so
+# the month-aligned archive boundary can never fall inside a bounded window
+SESSION_ARCHIVE_MIN_DAYS = 365 + 32
+SESSION_ARCHIVE_AFTER_DAYS = max(int(os.getenv("SESSION_ARCHIVE_AFTER_DAYS", 400)), SESSION_ARCHIVE_MIN_DAYS)
+SESSION_ARCHIVE_DELETE_RAW = os.getenv("SESSION_ARCHIVE_DELETE_RAW", "0") in ("1", "true", "yes")
+
+SESSION_SUMMARIES_TABLE_CQL = """
+    CREATE TABLE IF NOT EXISTS session_summaries_by_user_task (
+        user_id TEXT,
+        task_id UUID,
+        month DATE,
+        total_seconds BIGINT,
+        session_count INT,
+        first_start TIMESTAMP,
+        last_end TIMESTAMP,
+        active_days SET<DATE>,
+        archived_before TIMESTAMP STATIC,
+        PRIMARY KEY ((user_id, task_id), month)
+    ) WITH CLUSTERING ORDER BY (month ASC)
+"""
+
+# Summaries written before active_days existed keep only first_start/last_end days
+ADD_SUMMARY_ACTIVE_DAYS_CQL = "ALTER TABLE session_summaries_by_user_task ADD active_days SET<DATE>"
+
+def create_session_summaries_table():
+    session.execute(SESSION_SUMMARIES_TABLE_CQL)
+
+@dataclass
+class MonthSummary:
+    month: date
+    total_seconds: int = 0
+    session_count: int = 0
+    first_start: datetime | None = None
+    last_end: datetime | None = None
+    active_days: set[date] = field(default_factory=set)
+
+    def days(self) -> set[date]:
+        """Local days with activity; older summaries only know their first and last."""
+        if self.active_days:
+            return self.active_days
+        return {local_date(ts) for ts in (self.first_start, self.last_end) if ts is not None}
+
+    def add(self, start_time: datetime, end_time: datetime | None, duration_hours: float | None):
+        self.active_days = self.days()  # keep an older summary's first/last days once it gains real ones
+        self.total_seconds += round((duration_hours or 0.0) * 3600)
+        self.session_count += 1
+        if self.first_start is None or start_time < self.first_start:
+            self.first_start = start_time
+        if end_time is not None and (self.last_end is None or end_time > self.last_end):
+            self.last_end = end_time
+        if end_time is not None:
+            self.active_days.add(local_date(end_time))
+
+    def merge(self, other: "MonthSummary"):
+        self.active_days = self.days() | other.days()
+        self.total_seconds += other.total_seconds
+        self.session_count += other.session_count
+        if other.first_start is not None and (self.first_start is None or other.first_start < self.first_start):
+            self.first_start = other.first_start
+        if other.last_end is not None and (self.last_end is None or other.last_end > self.last_end):
+            self.last_end = other.last_end
+
+def _naive_utc(ts: datetime | None) -> datetime | None:
+    if ts is None or ts.tzinfo is None:
+        return ts
+    return ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+def month_floor(ts: datetime) -> datetime:
+    return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def next_month(ts: datetime) -> datetime:
+    return month_floor(month_floor(ts) + timedelta(days=32))
+
+def archive_cutoff(now: datetime | None = None) -> datetime:
+    """Naive-UTC month boundary; sessions starting before it are eligible."""
+    now = now or datetime.utcnow()
+    return month_floor(now - timedelta(days=SESSION_ARCHIVE_AFTER_DAYS))
+
+def get_summaries(user_id, task_id) -> tuple[datetime | None, list[MonthSummary]]:
+    """(archived_before, summaries oldest first) for one task."""
+    rows = session.execute(SimpleStatement("""
+        SELECT month, total_seconds, session_count, first_start, last_end, active_days, archived_before
+        FROM session_summaries_by_user_task
+        WHERE user_id = %s AND task_id = %s
+    """), (user_id, task_id))
+    archived_before = None
+    out = []
+    for r in rows:
+        archived_before = r.archived_before
+        if r.month is None:
+            continue  # partition holds only the static column
+        out.append(MonthSummary(r.month.date(), r.total_seconds or 0, r.session_count or 0,
+                                r.first_start, r.last_end, set(r.active_days or ())))
+    return archived_before, out
+
+def _add_summaries(batch: BatchStatement, user_id, task_id, months, archived_before: datetime | None = None):
+    insert = SimpleStatement("""
+        INSERT INTO session_summaries_by_user_task
+            (user_id, task_id, month, total_seconds, session_count, first_start, last_end, active_days)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """)
+    for m in months:
+        batch.add(insert, (user_id, task_id, m.month, m.total_seconds, m.session_count, m.first_start,
+                           m.last_end, m.active_days or None))
+    if archived_before is not None:
+        batch.add(SimpleStatement("""
+            UPDATE session_summaries_by_user_task SET archived_before = %s
+            WHERE user_id = %s AND task_id = %s
+        """), (archived_before, user_id, task_id))
+
+def _write_summaries(user_id, task_id, months: list[MonthSummary], archived_before: datetime | None = None):
+    """Summary rows (and optionally the new boundary) in one single-partition batch, applied atomically."""
+    batch = BatchStatement(batch_type=BatchType.UNLOGGED)
+    _add_summaries(batch, user_id, task_id, months, archived_before)
+    session.execute(batch)
+
+def archive_task_sessions(user_id, task_id, cutoff: datetime) -> tuple[int, int]:
+    """
+    Roll this task's sessions in [archived_before, cutoff) into monthly summaries and
+    advance archived_before to `cutoff`. Re-running is safe: the months written are
+    exactly those not yet summarized. Returns (months written, sessions rolled up).
+    """
+    archived_before, _ = get_summaries(user_id, task_id)
+    if archived_before is not None and archived_before >= cutoff:
+        return 0, 0
+
+    months: dict[datetime, MonthSummary] = {}
+    for s in iter_sessions_for_user_task_range(user_id, task_id, start_from=archived_before, end_before=cutoff):
+        key = month_floor(s.start_time)
+        if key not in months:
+            months[key] = MonthSummary(key.date())
+        months[key].add(s.start_time, s.end_time, s.duration_hours)
+
+    _write_summaries(user_id, task_id, list(months.values()), archived_before=cutoff)
+
+    if SESSION_ARCHIVE_DELETE_RAW:
+        # One range tombstone per partition; readers already ignore these rows
+        session.execute(SimpleStatement("""
+            DELETE FROM sessions_by_user_task
+            WHERE user_id = %s AND task_id = %s AND start_time < %s
+        """), (user_id, task_id, cutoff))
+    return len(months), sum(m.session_count for m in months.values())
+
+def iter_task_partitions(fetch_size=1000):
+    stmt = SimpleStatement("SELECT user_id, task_id FROM tasks_by_user", fetch_size=fetch_size)
+    for row in session.execute(stmt):
+        yield row.user_id, row.task_id
+
+def archive_old_sessions(user_filter=None, now: datetime | None = None) -> dict:
+    """Archive every task partition (optionally only users passing `user_filter`)."""
+    cutoff = archive_cutoff(now)
+    stats = {"tasks": 0, "months": 0, "sessions": 0}
+    for user_id, task_id in iter_task_partitions():
+        if user_filter and not user_filter(user_id):
+            continue
+        months, sessions = archive_task_sessions(user_id, task_id, cutoff)
+        if months:
+            stats["tasks"] += 1
+            stats["months"] += months
+            stats["sessions"] += sessions
+    return stats
+
+def fold_archived_sessions(user_id, rows) -> int:
+    """
+    Add sessions that start before their task's archived_before (e.g. from !import)
+    to the matching summaries, since readers no longer look at raw rows there.
+    rows: (user_id, task_id, start_time, end_time, duration_hours) that were just
+    written and weren't already stored (add_sessions_bulk returns exactly these),
+    so folding never counts a session twice. Returns rows folded.
+    """
+    by_task = defaultdict(list)
+    for _, task_id, start_time, end_time, duration_hours in rows:
+        by_task[task_id].append((_naive_utc(start_time), _naive_utc(end_time), duration_hours))
+
+    folded = 0
+    for task_id, task_rows in by_task.items():
+        archived_before, summaries = get_summaries(user_id, task_id)
+        if archived_before is None:
+            continue
+        existing = {m.month: m for m in summaries}
+        touched = {}
+        for start_time, end_time, duration_hours in task_rows:
+            if start_time >= archived_before:
+                continue
+            key = month_floor(start_time).date()
+            m = touched.get(key) or existing.get(key) or MonthSummary(key)
+            m.add(start_time, end_time, duration_hours)
+            touched[key] = m
+            folded += 1
+        if touched:
+            _write_summaries(user_id, task_id, list(touched.values()))
+    return folded
+
+def move_task_history(user_id, from_task_id, to_task_id) -> int:
+    """
+    Merge one task's whole history into another (used when merging tasks).
+
+    Both tasks end up archived up to the later of their two boundaries: the target's
+    own raw rows below it are archived first, then the source's month summaries
+    and its raw sessions below that boundary are added to the target's summaries.
+    Raw rows are copied as-is. The target's new summaries, the deletion of the
+    source's summaries and the deletion of its raw partition go in one logged
+    batch, so a failed merge can be re-run without counting anything twice.
+    Returns raw sessions moved.
+    """
+    src_before, src_months = get_summaries(user_id, from_task_id)
+    dst_before, _ = get_summaries(user_id, to_task_id)
+    boundary = max((b for b in (src_before, dst_before) if b is not None), default=None)
+    if boundary is not None and (dst_before is None or dst_before < boundary):
+        archive_task_sessions(user_id, to_task_id, boundary)
+
+    to_fold = []
+    if boundary is not None:
+        to_fold = list(iter_sessions_for_user_task_range(user_id, from_task_id, start_from=src_before,
+                                                         end_before=boundary))
+    moved = copy_task_sessions(user_id, from_task_id, to_task_id)
+
+    batch = BatchStatement(batch_type=BatchType.LOGGED)
+    if boundary is not None:
+        _, dst_months = get_summaries(user_id, to_task_id)
+        months = {m.month: m for m in dst_months}
+        for m in src_months:
+            months.setdefault(m.month, MonthSummary(m.month)).merge(m)
+        for s in to_fold:
+            key = month_floor(_naive_utc(s.start_time)).date()
+            months.setdefault(key, MonthSummary(key)).add(_naive_utc(s.start_time), _naive_utc(s.end_time),
+                                                          s.duration_hours)
+        _add_summaries(batch, user_id, to_task_id, list(months.values()), boundary)
+    batch.add(SimpleStatement("""
+        DELETE FROM session_summaries_by_user_task WHERE user_id = %s AND task_id = %s
+    """), (user_id, from_task_id))
+    batch.add(SimpleStatement("""
+        DELETE FROM sessions_by_user_task WHERE user_id = %s AND task_id = %s
+    """), (user_id, from_task_id))
+    session.execute(batch)
+    return moved
+
+def task_history(user_id, task_id, start_from: datetime | None = None,
+                 end_before: datetime | None = None) -> tuple[list[MonthSummary], Iterator[SessionRow]]:
+    """
+    A task's history in [start_from, end_before) (naive UTC, None = unbounded) as
+    (archived month summaries, raw SessionRows from the archive boundary on). An
+    archived month is included when it starts in the range's first month or later.
+    """
+    archived_before, summaries = get_summaries(user_id, task_id)
+    if archived_before is None or (start_from is not None and start_from >= archived_before):
+        return [], iter_sessions_for_user_task_range(user_id, task_id, start_from=start_from, end_before=end_before)
+
+    lo = month_floor(start_from) if start_from is not None else None
+    months = [
+        m for m in summaries
+        if (lo is None or datetime(m.month.year, m.month.month, 1) >= lo)
+        and (end_before is None or datetime(m.month.year, m.month.month, 1) < end_before)
+    ]
+    if end_before is not None and end_before <= archived_before:
+        return months, iter(())
+    raw_from = archived_before if start_from is None else max(start_from, archived_before)
+    return months, iter_sessions_for_user_task_range(user_id, task_id, start_from=raw_from, end_before=end_before)
+
+def task_hours(user_id, task_id, start_from: datetime | None = None, end_before: datetime | None = None) -> float:
+    """
+    Hours logged on a task with start_time in [start_from, end_before) (naive UTC,
+    None = unbounded), combining monthly summaries with raw sessions.
+    """
+    archived_before, summaries = get_summaries(user_id, task_id)
+    if archived_before is None or (start_from is not None and start_from >= archived_before):
+        return sum_session_hours(user_id, task_id, start_from=start_from, end_before=end_before)
+
+    # Archived part [start_from, arch_end): whole months from summaries, partial
+    # months at either edge from whatever raw rows remain
+    arch_end = archived_before if end_before is None else min(end_before, archived_before)
+    full_lo = start_from if start_from is None or start_from == month_floor(start_from) else next_month(start_from)
+    full_hi = month_floor(arch_end)
+
+    seconds = 0
+    hours = 0.0
+    if full_lo is None or full_lo < full_hi:
+        for m in summaries:
+            month_start = datetime(m.month.year, m.month.month, 1)
+            if (full_lo is None or month_start >= full_lo) and month_start < full_hi:
+                seconds += m.total_seconds
+        if start_from is not None and start_from < full_lo:
+            hours += sum_session_hours(user_id, task_id, start_from=start_from, end_before=full_lo)
+        if full_hi < arch_end:
+            hours += sum_session_hours(user_id, task_id, start_from=full_hi, end_before=arch_end)
+    else:
+        hours += sum_session_hours(user_id, task_id, start_from=start_from, end_before=arch_end)
+
+    # Live part
+    if end_before is None or end_before > archived_before:
+        hours += sum_session_hours(user_id, task_id, start_from=archived_before, end_before=end_before)
+    return hours + seconds / 3600.0
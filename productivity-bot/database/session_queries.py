@@ -1,19 +1,60 @@
-from .cassandra_client import session
+import os
+
+from .cassandra_client import session, TUPLES
+from .models import SessionRow, columns, decode
 from cassandra.query import SimpleStatement
+from cassandra.concurrent import execute_concurrent_with_args
+from .leaderboard_queries import record_session_seconds, record_sessions_seconds_bulk
+from .streak_queries import record_activity, local_date
+
+BULK_WRITE_CONCURRENCY = 64
+# Sessions are append-mostly and read by recent time range, so time-window compaction
+# keeps each window's rows in few SSTables and stops re-compacting old history.
+SESSIONS_TWCS_WINDOW_DAYS = int(os.getenv("SESSIONS_TWCS_WINDOW_DAYS", 30))
+
+_insert_session_prepared = None
+
+def _insert_session_stmt():
+    # Prepared lazily: the table may not exist yet when this module is imported.
+    global _insert_session_prepared
+    if _insert_session_prepared is None:
+        _insert_session_prepared = session.prepare("""
+            INSERT INTO sessions_by_user_task (user_id, task_id, start_time, end_time, duration_hours)
+            VALUES (?, ?, ?, ?, ?)
+        """)
+    return _insert_session_prepared
+
+SESSIONS_TABLE_CQL = """
+    CREATE TABLE IF NOT EXISTS sessions_by_user_task (
+        user_id TEXT,
+        task_id UUID,
+        start_time TIMESTAMP,
+        end_time TIMESTAMP,
+        duration_hours DOUBLE,
+        counted BOOLEAN,
+        PRIMARY KEY ((user_id, task_id), start_time)
+    ) WITH CLUSTERING ORDER BY (start_time DESC)
+      AND compaction = {{
+          'class': 'TimeWindowCompactionStrategy',
+          'compaction_window_unit': 'DAYS',
+          'compaction_window_size': {window}
+      }}
+""".format(window=SESSIONS_TWCS_WINDOW_DAYS)
+
+SESSIONS_OPTIONS_CQL = """
+    ALTER TABLE sessions_by_user_task
+    WITH compaction = {{
+        'class': 'TimeWindowCompactionStrategy',
+        'compaction_window_unit': 'DAYS',
+        'compaction_window_size': {window}
+    }}
+""".format(window=SESSIONS_TWCS_WINDOW_DAYS)
+
+# Set once a journaled session's leaderboard seconds are in, so a replay doesn't add them twice
+ADD_SESSIONS_COUNTED_CQL = "ALTER TABLE sessions_by_user_task ADD counted BOOLEAN"
 
 def create_sessions_table():
-    query = """
-                CREATE TABLE sessions_by_user_task (
-                    user_id TEXT,
-                    task_id UUID,
-                    start_time TIMESTAMP,
-                    end_time TIMESTAMP,
-                    duration_hours DOUBLE,
-                    PRIMARY KEY ((user_id, task_id), start_time)
-                ) WITH CLUSTERING ORDER BY (start_time DESC)
-            """
-        
-    session.execute(query)
+    session.execute(SESSIONS_TABLE_CQL)
 
 def get_all_sessions_for_task(task_id):
     query = """
@@ -30,42 +71,138 @@ def add_session_for_task(user_id, task_id, start_time, end_time, duration_hours)
             """
     
     session.execute(query, (user_id, task_id, start_time, end_time, duration_hours))
+    record_session_seconds(user_id, start_time, duration_hours)
+    record_activity(user_id, local_date(end_time))
+
+def session_key(user_id, task_id, start_time) -> tuple:
+    """Primary key as Cassandra stores it (timestamps keep whole milliseconds)."""
+    return (user_id, task_id, int(start_time.timestamp() * 1000))
+
+def _existing_sessions(rows, concurrency) -> tuple[set, set]:
+    """(keys already in the table, keys whose check failed) for (user_id, task_id, start_time, ...) rows."""
+    stmt = SimpleStatement("""
+        SELECT start_time FROM sessions_by_user_task
+        WHERE user_id = %s AND task_id = %s AND start_time = %s
+    """)
+    params = [row[:3] for row in rows]
+    results = execute_concurrent_with_args(
+        session, stmt, params, concurrency=concurrency, raise_on_first_error=False,
+        results_generator=True, execution_profile=TUPLES,
+    )
+    existing, unknown = set(), set()
+    for p, (success, result) in zip(params, results):
+        if not success:
+            unknown.add(session_key(*p))
+        elif list(result):
+            existing.add(session_key(*p))
+    return existing, unknown
+
+def add_sessions_bulk(rows, concurrency=BULK_WRITE_CONCURRENCY):
+    """
+    Insert many sessions with at most `concurrency` writes in flight.
+    rows: iterable of (user_id, task_id, start_time, end_time, duration_hours).
+    Rows whose primary key already exists (or repeats within `rows`) are skipped:
+    the insert would be a harmless upsert, but the leaderboard increment that
+    follows is not idempotent, so re-importing a file must not count it twice.
+    Returns (written_rows, failed, duplicates); failures don't stop the rest of the
+    load. Derived tables (leaderboard counters) are updated for written rows only.
+    """
+    rows = list(rows)
+    unique = {}
+    for row in rows:
+        unique.setdefault(session_key(*row[:3]), row)
+    duplicates = len(rows) - len(unique)
+    failed = 0
+    existing, unknown = _existing_sessions(list(unique.values()), concurrency)
+    fresh = []
+    for key, row in unique.items():
+        if key in unknown:
+            failed += 1     # can't tell if it's new; leave it for a retry rather than risk a double count
+        elif key in existing:
+            duplicates += 1
+        else:
+            fresh.append(row)
+
+    results = execute_concurrent_with_args(
+        session, _insert_session_stmt(), fresh,
+        concurrency=concurrency, raise_on_first_error=False, results_generator=True,
+    )
+    written_rows = []
+    for row, (success, _) in zip(fresh, results):
+        if success:
+            written_rows.append(row)
+        else:
+            failed += 1
 
-def get_sessions_for_user_task_range(user_id, task_id, start_from=None, end_before=None):
+    record_sessions_seconds_bulk(
+        ((user_id, start_time, duration_hours) for user_id, _, start_time, _, duration_hours in written_rows),
+        concurrency=concurrency,
+    )
+    return written_rows, failed, duplicates
+
+def _range_statement(select, user_id, task_id, start_from, end_before, fetch_size=None):
+    where = ["user_id = %s", "task_id = %s"]
+    params = [user_id, task_id]
+    if start_from:
+        where.append("start_time >= %s")
+        params.append(start_from)
+    if end_before:
+        where.append("start_time < %s")
+        params.append(end_before)
+
+    stmt = SimpleStatement(
+        f"SELECT {select} FROM sessions_by_user_task WHERE " + " AND ".join(where),
+        fetch_size=fetch_size,
+    )
+    return stmt, tuple(params)
+
+def get_sessions_for_user_task_range(user_id, task_id, start_from=None, end_before=None) -> list[SessionRow]:
     """
     Returns rows for (user_id, task_id) where start_time is in [start_from, end_before).
     Pass None to skip that bound.
     """
-    if start_from and end_before:
-        stmt = SimpleStatement("""
-            SELECT start_time, end_time, duration_hours
-            FROM sessions_by_user_task
-            WHERE user_id = %s AND task_id = %s
-              AND start_time >= %s AND start_time < %s
-        """)
-        params = (user_id, task_id, start_from, end_before)
-    elif start_from:
-        stmt = SimpleStatement("""
-            SELECT start_time, end_time, duration_hours
-            FROM sessions_by_user_task
-            WHERE user_id = %s AND task_id = %s
-              AND start_time >= %s
-        """)
-        params = (user_id, task_id, start_from)
-    elif end_before:
-        stmt = SimpleStatement("""
-            SELECT start_time, end_time, duration_hours
-            FROM sessions_by_user_task
-            WHERE user_id = %s AND task_id = %s
-              AND start_time < %s
-        """)
-        params = (user_id, task_id, end_before)
-    else:
-        stmt = SimpleStatement("""
-            SELECT start_time, end_time, duration_hours
-            FROM sessions_by_user_task
-            WHERE user_id = %s AND task_id = %s
-        """)
-        params = (user_id, task_id)
+    stmt, params = _range_statement(columns(SessionRow), user_id, task_id, start_from, end_before)
+    return decode(SessionRow, session.execute(stmt, params, execution_profile=TUPLES))
+
+def iter_sessions_for_user_task_range(user_id, task_id, start_from=None, end_before=None, fetch_size=500):
+    """
+    Lazily yields SessionRows for (user_id, task_id) in [start_from, end_before), newest first.
+    The driver pages through the partition `fetch_size` rows at a time, so only one
+    page is held in memory no matter how many sessions the task has.
+    """
+    stmt, params = _range_statement(columns(SessionRow), user_id, task_id, start_from, end_before, fetch_size)
+    for r in session.execute(stmt, params, execution_profile=TUPLES):
+        yield SessionRow(*r)
+
+def sum_session_hours(user_id, task_id, start_from=None, end_before=None, fetch_size=5000) -> float:
+    """Total duration_hours in the range, read straight off the tuples with no row objects."""
+    stmt, params = _range_statement("duration_hours", user_id, task_id, start_from, end_before, fetch_size)
+    return sum(r[0] or 0.0 for r in session.execute(stmt, params, execution_profile=TUPLES))
+
+def copy_task_sessions(user_id, from_task_id, to_task_id, concurrency=BULK_WRITE_CONCURRENCY) -> int:
+    """
+    Copy every session of one task under another, as-is (derived counters are left
+    alone). Idempotent; raises if any copy fails. Returns rows copied.
+    """
+    rows = [
+        (user_id, to_task_id, s.start_time, s.end_time, s.duration_hours)
+        for s in iter_sessions_for_user_task_range(user_id, from_task_id)
+    ]
+    if rows:
+        # raise_on_first_error: a failed copy must keep the source partition intact
+        execute_concurrent_with_args(
+            session, _insert_session_stmt(), rows, concurrency=concurrency, raise_on_first_error=True
+        )
+    return len(rows)
 
-    return list(session.execute(stmt, params))
+def move_task_sessions(user_id, from_task_id, to_task_id, concurrency=BULK_WRITE_CONCURRENCY) -> int:
+    """
+    Re-home every raw session of one task under another. The source partition is
+    dropped only once every copy has succeeded. Returns rows moved. Archived
+    summaries are not touched; merging tasks goes through move_task_history.
+    """
+    moved = copy_task_sessions(user_id, from_task_id, to_task_id, concurrency)
+    session.execute(SimpleStatement("""
+        DELETE FROM sessions_by_user_task WHERE user_id = %s AND task_id = %s
+    """), (user_id, from_task_id))
+    return moved
@@ -0,0 +1,167 @@
+# database/streak_queries.py
+"""
+Per-user streak state (days in a row with logged time or a completed daily task),
+maintained incrementally as activity is recorded so !streak is a single-row read.
+The state is cached in memory, so steady-state cost is one write per user per day.
+"""
+import asyncio
+import logging
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from cassandra.query import SimpleStatement
+from .cassandra_client import session, execute_aio
+
+TZ = ZoneInfo("America/Toronto")
+
+@dataclass
+class StreakState:
+    current: int = 0
+    best: int = 0
+    start: date | None = None
+    last_active: date | None = None
+
+    def shown_current(self, today: date) -> int:
+        """A streak only counts as current if it reached today or yesterday."""
+        if self.last_active is None or self.last_active < today - timedelta(days=1):
+            return 0
+        return self.current
+
+_cache: dict[str, StreakState] = {}
+
+STREAKS_TABLE_CQL = """
+    CREATE TABLE IF NOT EXISTS user_streaks (
+        user_id TEXT PRIMARY KEY,
+        current_streak INT,
+        best_streak INT,
+        streak_start DATE,
+        last_active DATE
+    )
+"""
+
+def create_streaks_table():
+    session.execute(STREAKS_TABLE_CQL)
+
+def local_date(ts: datetime | None = None) -> date:
+    if ts is None:
+        return datetime.now(TZ).date()
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(TZ).date()
+
+_SELECT = """
+    SELECT current_streak, best_streak, streak_start, last_active
+    FROM user_streaks WHERE user_id = %s
+"""
+_UPSERT = """
+    INSERT INTO user_streaks (user_id, current_streak, best_streak, streak_start, last_active)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+def _from_row(row) -> StreakState:
+    if row is None:
+        return StreakState()
+    # DATE columns come back as cassandra.util.Date
+    start = row.streak_start.date() if row.streak_start is not None else None
+    last = row.last_active.date() if row.last_active is not None else None
+    return StreakState(row.current_streak or 0, row.best_streak or 0, start, last)
+
+def _advance(state: StreakState, day: date) -> StreakState | None:
+    """New state after activity on `day`, or None if nothing changes."""
+    if state.last_active is not None and day <= state.last_active:
+        return None  # already counted (or out of order: leave it to rebuild_streak)
+    if state.last_active == day - timedelta(days=1) and state.current > 0:
+        current, start = state.current + 1, state.start
+    else:
+        current, start = 1, day
+    return StreakState(current, max(state.best, current), start, day)
+
+def _params(user_id: str, s: StreakState):
+    return (user_id, s.current, s.best, s.start, s.last_active)
+
+def forget_user(user_id: str):
+    _cache.pop(user_id, None)
+
+def forget_all():
+    """Drop every cached streak (the table was rewritten underneath us, e.g. by a restore)."""
+    _cache.clear()
+
+def get_streak(user_id: str) -> StreakState:
+    state = _cache.get(user_id)
+    if state is None:
+        state = _from_row(session.execute(_SELECT, (user_id,)).one())
+        _cache[user_id] = state
+    return state
+
+def record_activity(user_id: str, day: date | None = None):
+    day = day or local_date()
+    new = _advance(get_streak(user_id), day)
+    if new is None:
+        return
+    session.execute(_UPSERT, _params(user_id, new))
+    _cache[user_id] = new
+
+async def record_activity_aio(user_id: str, day: date | None = None):
+    day = day or local_date()
+    state = _cache.get(user_id)
+    if state is None:
+        rows = await execute_aio(_SELECT, (user_id,))
+        state = _from_row(rows[0] if rows else None)
+        _cache[user_id] = state
+    new = _advance(state, day)
+    if new is None:
+        return
+    await execute_aio(_UPSERT, _params(user_id, new))
+    _cache[user_id] = new
+
+def schedule_activity(user_id: str, day: date | None = None):
+    """Fire-and-forget streak update from the event loop."""
+    task = asyncio.create_task(record_activity_aio(user_id, day))
+    task.add_done_callback(_log_failure)
+
+def _log_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logging.error("Streak update failed: %s", task.exception())
+
+def streak_from_days(days: list[date], today: date) -> StreakState:
+    """Compute streak state from a set of active days (any order, duplicates ok)."""
+    state = StreakState()
+    for day in sorted(set(days)):
+        if day > today:
+            break
+        state = _advance(state, day) or state
+    return state
+
+def rebuild_streak(user_id: str, active_days: list[date]) -> StreakState:
+    """Replace the stored state with one recomputed from history."""
+    state = streak_from_days(active_days, local_date())
+    session.execute(_UPSERT, _params(user_id, state))
+    _cache[user_id] = state
+    return state
+
+def finalize_streaks(today: date | None = None, fetch_size: int = 1000, user_filter=None) -> int:
+    """
+    Daily job: zero current_streak for anyone whose last active day is before
+    yesterday. One paged pass over user_streaks. Returns streaks closed.
+    user_filter: optional predicate on user_id to finalize only some users.
+    """
+    today = today or local_date()
+    cutoff = today - timedelta(days=1)
+    stmt = SimpleStatement(
+        "SELECT user_id, current_streak, best_streak, streak_start, last_active FROM user_streaks",
+        fetch_size=fetch_size,
+    )
+    reset = SimpleStatement("""
+        UPDATE user_streaks SET current_streak = 0, streak_start = NULL WHERE user_id = %s
+    """)
+    closed = 0
+    for row in session.execute(stmt):
+        if user_filter and not user_filter(row.user_id):
+            continue
+        state = _from_row(row)
+        if state.current > 0 and (state.last_active is None or state.last_active < cutoff):
+            session.execute(reset, (row.user_id,))
+            _cache[row.user_id] = StreakState(0, state.best, None, state.last_active)
+            closed += 1
+    return closed
@@ -0,0 +1,47 @@
+# database/table_stats.py
+"""Per-table size and partition estimates for the admin !tablestats report."""
+from dataclasses import dataclass
+from .cassandra_client import session
+from config import CASSANDRA_KEYSPACE
+
+@dataclass
+class TableStats:
+    name: str
+    partitions: int = 0
+    est_bytes: int = 0
+    ranges: int = 0
+    default_ttl: int = 0
+    compaction: str = ""
+
+    @property
+    def mean_partition_bytes(self) -> float:
+        return self.est_bytes / self.partitions if self.partitions else 0.0
+
+def collect_table_stats(keyspace: str = CASSANDRA_KEYSPACE) -> list[TableStats]:
+    """
+    Sum system.size_estimates over token ranges, joined with each table's TTL and
+    compaction class from system_schema. size_estimates is node-local and refreshed
+    periodically, so these are the coordinator's estimates for its own ranges.
+    """
+    stats: dict[str, TableStats] = {}
+    for row in session.execute("""
+        SELECT table_name, default_time_to_live, compaction
+        FROM system_schema.tables WHERE keyspace_name = %s
+    """, (keyspace,)):
+        compaction = (row.compaction or {}).get("class", "")
+        stats[row.table_name] = TableStats(
+            name=row.table_name,
+            default_ttl=row.default_time_to_live or 0,
+            compaction=compaction.rsplit(".", 1)[-1],
+        )
+
+    for row in session.execute("""
+        SELECT table_name, partitions_count, mean_partition_size
+        FROM system.size_estimates WHERE keyspace_name = %s
+    """, (keyspace,)):
+        t = stats.setdefault(row.table_name, TableStats(name=row.table_name))
+        t.partitions += row.partitions_count or 0
+        t.est_bytes += (row.partitions_count or 0) * (row.mean_partition_size or 0)
+        t.ranges += 1
+
+    return sorted(stats.values(), key=lambda t: t.est_bytes, reverse=True)
@@ -1,42 +1,99 @@
 # database/task_queries.py
 import uuid
 import pytz
-from datetime import time, datetime
-from cassandra.query import BatchStatement, SimpleStatement
-from .cassandra_client import session
+from datetime import time
+from cassandra import InvalidRequest
+from cassandra.query import BatchStatement, BatchType, SimpleStatement
+from cassandra.concurrent import execute_concurrent, execute_concurrent_with_args
+from .cassandra_client import session, execute_aio, TUPLES
+from .models import TaskRow, columns, decode, decode_one
 from .reminder_queries import add_reminder, DAILY_SENTINEL_DOW
 
 LOCAL_TZ = pytz.timezone("America/Toronto")
+BULK_WRITE_CONCURRENCY = 32
+
+TASKS_TABLE_CQL = """
+    CREATE TABLE IF NOT EXISTS tasks_by_user (
+        user_id TEXT,
+        task_id UUID,
+        task_name TEXT,
+        description TEXT,
+        reminder_type TEXT,
+        reminder_time TIME,
+        reminder_day_of_week TINYINT,
+        reminder_days INT,
+        created_at TIMESTAMP,
+        PRIMARY KEY (user_id, task_id)
+    )
+"""
 
 def create_tasks_table():
-    query = """
-        CREATE TABLE IF NOT EXISTS tasks_by_user (
-            user_id TEXT,
-            task_id UUID,
-            task_name TEXT,
-            description TEXT,
-            reminder_type TEXT,
-            reminder_time TIME,
-            reminder_day_of_week TINYINT,
-            created_at TIMESTAMP,
-            PRIMARY KEY (user_id, task_id)
-        )
+    session.execute(TASKS_TABLE_CQL)
+
+# Tables created before reminder_days existed need the column added once
+ADD_REMINDER_DAYS_CQL = "ALTER TABLE tasks_by_user ADD reminder_days INT"
+
+def add_reminder_days_column():
+    try:
+        session.execute(ADD_REMINDER_DAYS_CQL)
+    except InvalidRequest:
+        pass  # already there
+
+def days_to_mask(dows) -> int:
+    """Sun=0..Sat=6 -> bitmask with bit d set for each day."""
+    mask = 0
+    for d in dows:
+        mask |= 1 << int(d)
+    return mask
+
+def mask_to_days(mask: int | None) -> list[int]:
+    if not mask:
+        return []
+    return [d for d in range(7) if mask & (1 << d)]
+
+def task_days(row) -> list[int]:
+    """
+    Days a weekly task fires on. New tasks carry a reminder_days bitmask; rows written
+    before it existed have a single reminder_day_of_week instead. Daily tasks -> [].
     """
-    session.execute(query)
+    if (getattr(row, "reminder_type", None) or "").lower() != "weekly":
+        return []
+    days = mask_to_days(getattr(row, "reminder_days", None))
+    if days:
+        return days
+    dow = getattr(row, "reminder_day_of_week", None)
+    return [dow] if isinstance(dow, int) and 0 <= dow <= 6 else []
 
-def add_task_indexed(user_id, task_name, description, reminder_type, reminder_hour, reminder_minute, day_of_week):
+def reminder_index_keys(row) -> list[tuple[str, int, int, int]]:
+    """(type, hour, day_of_week, minute) of every reminders_by_time row a task should have."""
+    rtype = (getattr(row, "reminder_type", None) or "").lower()
+    rtime = getattr(row, "reminder_time", None)
+    if rtype not in ("daily", "weekly") or rtime is None:
+        return []
+    dows = task_days(row) if rtype == "weekly" else []
+    return [(rtype, rtime.hour, dow, rtime.minute) for dow in (dows or [DAILY_SENTINEL_DOW])]
+
+def add_task_indexed(user_id, task_name, description, reminder_type, reminder_hour, reminder_minute,
+                     day_of_week=None, days_of_week=None):
+    """
+    Create a task and its reminders_by_time entries in one batch. A weekly task on
+    several days is still one task row; only the index gets a row per day.
+    """
     task_id = uuid.uuid4()
 
-    # Normalize to local timezone (if user gave local time, store as that local time)
-    now_local = datetime.now(LOCAL_TZ)
     rtime = time(hour=reminder_hour, minute=reminder_minute)
-    dow = DAILY_SENTINEL_DOW if (day_of_week is None) else int(day_of_week)
+    if days_of_week is None:
+        days_of_week = [] if day_of_week is None else [int(day_of_week)]
+    dows = sorted(set(int(d) for d in days_of_week))
+    mask = days_to_mask(dows) if dows else None
+    # Keep the legacy single-day column populated for older readers
+    dow = dows[0] if dows else DAILY_SENTINEL_DOW
 
     insert_task = SimpleStatement("""
         INSERT INTO tasks_by_user (
             user_id, task_id, task_name, description, reminder_type,
-            reminder_time, reminder_day_of_week, created_at
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, toTimestamp(now()))
+            reminder_time, reminder_day_of_week, reminder_days, created_at
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, toTimestamp(now()))
     """)
 
     insert_index = SimpleStatement("""
@@ -46,26 +103,108 @@ def add_task_indexed(user_id, task_name, description, reminder_type, reminder_ho
     """)
 
     batch = BatchStatement()
-    batch.add(insert_task, (user_id, task_id, task_name, description, reminder_type, rtime, dow))
-    batch.add(insert_index, (reminder_type, reminder_hour, dow, reminder_minute, task_id, user_id))
+    batch.add(insert_task, (user_id, task_id, task_name, description, reminder_type, rtime, dow, mask))
+    for index_dow in (dows or [DAILY_SENTINEL_DOW]):
+        batch.add(insert_index, (reminder_type, reminder_hour, index_dow, reminder_minute, task_id, user_id))
 
     session.execute(batch)
     return task_id
 
-def get_user_task(user_id, task_id):
+def add_tasks_indexed_bulk(user_id, specs, concurrency=BULK_WRITE_CONCURRENCY):
+    """
+    Create many reminder tasks at once.
+    specs: list of (task_name, reminder_type, hour, minute, days_of_week) with
+           days_of_week empty for daily tasks.
+    Each task's row and its index rows go in one small logged batch (as in
+    add_task_indexed), so a failure can't leave a task without its reminder or an
+    index row without its task; the batches go out concurrently.
+    Returns a list of (task_id, ok) aligned with specs.
+    """
+    insert_task = SimpleStatement("""
+        INSERT INTO tasks_by_user (
+            user_id, task_id, task_name, description, reminder_type,
+            reminder_time, reminder_day_of_week, reminder_days, created_at
+        ) VALUES (%s, %s, %s, NULL, %s, %s, %s, %s, toTimestamp(now()))
+    """)
+    insert_index = SimpleStatement("""
+        INSERT INTO reminders_by_time (
+            reminder_type, reminder_hour, reminder_day_of_week, reminder_minute, task_id, user_id
+        ) VALUES (%s, %s, %s, %s, %s, %s)
+    """)
+
+    task_ids = [uuid.uuid4() for _ in specs]
+    batches = []
+    for i, (name, rtype, hour, minute, days) in enumerate(specs):
+        dows = sorted(set(int(d) for d in days))
+        mask = days_to_mask(dows) if dows else None
+        first = dows[0] if dows else DAILY_SENTINEL_DOW
+        batch = BatchStatement(batch_type=BatchType.LOGGED)
+        batch.add(insert_task, (user_id, task_ids[i], name, rtype, time(hour=hour, minute=minute), first, mask))
+        for d in (dows or [DAILY_SENTINEL_DOW]):
+            batch.add(insert_index, (rtype, hour, d, minute, task_ids[i], user_id))
+        batches.append((batch, None))
+
+    results = execute_concurrent(session, batches, concurrency=concurrency, raise_on_first_error=False)
+    return [(task_ids[i], success) for i, (success, _) in enumerate(results)]
+
+def add_task(user_id, task_name, description=None):
+    """Create a task with no reminder attached (e.g. one that only exists for imported sessions)."""
+    task_id = uuid.uuid4()
     query = SimpleStatement("""
-        SELECT * FROM tasks_by_user WHERE user_id = %s AND task_id = %s
+        INSERT INTO tasks_by_user (user_id, task_id, task_name, description, created_at)
+        VALUES (%s, %s, %s, %s, toTimestamp(now()))
+    """)
+    session.execute(query, (user_id, task_id, task_name, description))
+    return task_id
+
+def get_user_task(user_id, task_id) -> TaskRow | None:
+    query = SimpleStatement(f"""
+        SELECT {columns(TaskRow)} FROM tasks_by_user WHERE user_id = %s AND task_id = %s
     """)
-    return session.execute(query, (user_id, task_id)).one()
+    return decode_one(TaskRow, session.execute(query, (user_id, task_id), execution_profile=TUPLES))
 
-def get_all_user_tasks(user_id):
-    stmt = SimpleStatement("""
-        SELECT * FROM tasks_by_user WHERE user_id = %s
+def get_task_names(pairs, concurrency=BULK_WRITE_CONCURRENCY) -> dict:
+    """
+    {(user_id, task_id): task_name} for many tasks at once: single-row reads kept
+    `concurrency` in flight, so N lookups cost about N / concurrency round trips.
+    Missing tasks and failed reads are simply absent from the result.
+    """
+    pairs = list(set(pairs))
+    if not pairs:
+        return {}
+    stmt = SimpleStatement("SELECT task_name FROM tasks_by_user WHERE user_id = %s AND task_id = %s")
+    results = execute_concurrent_with_args(session, stmt, pairs, concurrency=concurrency,
+                                           raise_on_first_error=False, execution_profile=TUPLES)
+    names = {}
+    for pair, (success, rows) in zip(pairs, results):
+        if success:
+            for (name,) in rows:
+                names[pair] = name
+    return names
+
+def get_all_user_tasks(user_id) -> list[TaskRow]:
+    stmt = SimpleStatement(f"""
+        SELECT {columns(TaskRow)} FROM tasks_by_user WHERE user_id = %s
     """)
-    return list(session.execute(stmt, (user_id,)))
+    return decode(TaskRow, session.execute(stmt, (user_id,), execution_profile=TUPLES))
+
+async def get_user_task_aio(user_id, task_id) -> TaskRow | None:
+    rows = await execute_aio(f"""
+        SELECT {columns(TaskRow)} FROM tasks_by_user WHERE user_id = %s AND task_id = %s
+    """, (user_id, task_id), execution_profile=TUPLES)
+    return decode_one(TaskRow, rows)
 
-def delete_task_cascade(user_id, task_id, reminder_type, reminder_hour, reminder_minute, day_of_week):
-    dow = DAILY_SENTINEL_DOW if (day_of_week is None) else int(day_of_week)
+async def get_all_user_tasks_aio(user_id) -> list[TaskRow]:
+    rows = await execute_aio(f"""
+        SELECT {columns(TaskRow)} FROM tasks_by_user WHERE user_id = %s
+    """, (user_id,), execution_profile=TUPLES)
+    return decode(TaskRow, rows)
+
+def delete_task_cascade(user_id, task_id, reminder_type, reminder_hour, reminder_minute,
+                        day_of_week=None, days_of_week=None):
+    if days_of_week is None:
+        days_of_week = [] if day_of_week is None else [int(day_of_week)]
+    dows = sorted(set(int(d) for d in days_of_week)) or [DAILY_SENTINEL_DOW]
 
     del_task = SimpleStatement("""
         DELETE FROM tasks_by_user WHERE user_id = %s AND task_id = %s
@@ -77,7 +216,18 @@ def delete_task_cascade(user_id, task_id, reminder_type, reminder_hour, reminder
         AND reminder_day_of_week = %s AND reminder_minute = %s AND task_id = %s
     """)
 
+    # The task's history goes with it: nothing else points at these partitions
+    del_sessions = SimpleStatement("""
+        DELETE FROM sessions_by_user_task WHERE user_id = %s AND task_id = %s
+    """)
+    del_summaries = SimpleStatement("""
+        DELETE FROM session_summaries_by_user_task WHERE user_id = %s AND task_id = %s
+    """)
+
     batch = BatchStatement()
     batch.add(del_task, (user_id, task_id))
-    batch.add(del_index, (reminder_type, reminder_hour, dow, reminder_minute, task_id))
+    for dow in dows:
+        batch.add(del_index, (reminder_type, reminder_hour, dow, reminder_minute, task_id))
+    batch.add(del_sessions, (user_id, task_id))
+    batch.add(del_summaries, (user_id, task_id))
     session.execute(batch)
@@ -0,0 +1,45 @@
+# database/token_ranges.py
+"""
+Full-table scans split into contiguous Murmur3 token slices.
+
+Each slice is an independent paged range read (`token(pk) > lo AND token(pk) <=
+hi`), so slices can be read in parallel and each one touches only the replicas
+that own it, instead of one coordinator walking the whole ring in a single
+query. Pages are streamed to the caller, so memory is bounded by
+fetch_size * concurrent slices.
+"""
+from typing import AsyncIterator
+from cassandra.query import SimpleStatement
+from .cassandra_client import iter_pages_aio, TUPLES
+
+MIN_TOKEN = -(2 ** 63)
+MAX_TOKEN = 2 ** 63 - 1
+
+def token_slices(n: int) -> list[tuple[int, int]]:
+    """n (lo, hi] ranges covering the whole ring."""
+    n = max(1, n)
+    step = (MAX_TOKEN - MIN_TOKEN) // n
+    bounds = [MIN_TOKEN + i * step for i in range(n)] + [MAX_TOKEN]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def slice_statement(table: str, partition_key: tuple[str, ...], select: str, fetch_size: int) -> SimpleStatement:
+    pk = ", ".join(partition_key)
+    return SimpleStatement(
+        f"SELECT {select} FROM {table} WHERE token({pk}) > %s AND token({pk}) <= %s",
+        fetch_size=fetch_size,
+    )
+
+async def scan_slice(table: str, partition_key: tuple[str, ...], select: str, lo: int, hi: int,
+                     fetch_size: int = 1000, limiter=None) -> AsyncIterator[list[tuple]]:
+    """
+    Yield pages of tuples for one token slice. limiter (a RateLimiter) is acquired
+    before each page is requested, which paces the scan in pages per second.
+    """
+    stmt = slice_statement(table, partition_key, select, fetch_size)
+    if limiter is not None:
+        await limiter.acquire()
+    pages = iter_pages_aio(stmt, (lo, hi), execution_profile=TUPLES)
+    async for page in pages:
+        yield page
+        if limiter is not None:
+            await limiter.acquire()
@@ -1,19 +1,26 @@
-import logging
+from services.startup import startup_timer
+
+import config
 import os
+import logging
 import discord
 import asyncio
 
-from pathlib import Path
 from discord.ext import commands
-from dotenv import load_dotenv, find_dotenv
-from database.table_queries import table_exists
-from database.reminder_queries import create_reminders_table
-from database.active_task_queries import create_active_tasks_table
-from database.session_queries import create_sessions_table
-from database.task_queries import create_tasks_table
-from database.daily_remaining_queries import create_daily_remaining_table
+from database.cassandra_client import connect
+from database.schema import bootstrap_schema
+from database.daily_remaining_queries import backfill_daily_remaining_ttl
+from database.presence_index import warm_presence_index
 from tasks.remind_scheduler import start_monitor
 from tasks.daily_digest import start_daily_digest
+from tasks.presence_status import start_presence_status
+from tasks.session_archive import start_session_archive
+from tasks.reminder_repair import start_reminder_repair
+from services.sharding import make_bot, is_sharded, shard_ids, slice_label, PROCESS_INDEX
+from services.leader import start_leader_election, release_leases
+from services.diagnostics import install as install_diagnostics
+from services.journal import replay_journal, start_replicator, stop_replicator
+from services.auto_stop import start_auto_stop
 
 '''
 TODO:
@@ -23,28 +30,11 @@ db table for hours tracked on which task, how many hours in each month
 
 '''
 
-BASE_DIR = Path(__file__).resolve().parent
-ENV_FILE = ".env"
+BASE_DIR = config.BASE_DIR
 COGS_PACKAGE = "commands"
 COGS_PATH = BASE_DIR / COGS_PACKAGE
 
-# Load .env from: local dir, parent dir, or search upwards from CWD
-candidates = [BASE_DIR / ENV_FILE, BASE_DIR.parent / ENV_FILE]
-loaded = False
-for p in candidates:
-    if p.is_file():
-        load_dotenv(p)
-        loaded = True
-        break
-
-if not loaded:
-    # fallback: search from current working directory upward
-    dp = find_dotenv(usecwd=True)
-    if dp:
-        load_dotenv(dp)
-        loaded = True
-
-TOKEN = os.getenv("DISCORD_TOKEN")
+TOKEN = config.DISCORD_TOKEN
 if TOKEN is None:
     raise RuntimeError("DISCORD_TOKEN not found in env file.")
 
@@ -60,7 +50,7 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.guilds = True
 
-bot = commands.Bot(
+bot = make_bot(
     command_prefix = "!",
     intents = intents,
     help_command = commands.MinimalHelpCommand(),
@@ -69,40 +59,113 @@ bot = commands.Bot(
 )
 
 # Cog loader
+async def load_cog(ext: str):
+    try:
+        await bot.load_extension(ext)
+        logging.info("Loaded extension: %s", ext)
+    except commands.ExtensionAlreadyLoaded:
+        logging.warning("Extension %s already loaded", ext)
+    except Exception as exc:
+        logging.exception("Failed to load %s: %s", ext, exc)
+
 async def load_cogs():
-    for file in COGS_PATH.iterdir():
-        if not file.name.startswith("_") and file.name.endswith(".py"):
-            ext = f"{COGS_PACKAGE}.{file.stem}"  # e.g. "commands.buy"
-            try:
-                await bot.load_extension(ext)
-                logging.info("Loaded extension: %s", ext)
-            except commands.ExtensionAlreadyLoaded:
-                logging.warning("Extension %s already loaded", ext)
-            except Exception as exc:
-                logging.exception("Failed to load %s: %s", ext, exc)
+    exts = [
+        f"{COGS_PACKAGE}.{file.stem}"  # e.g. "commands.buy"
+        for file in sorted(COGS_PATH.iterdir())
+        if not file.name.startswith("_") and file.name.endswith(".py")
+    ]
+    await asyncio.gather(*(load_cog(ext) for ext in exts))
+
+# Global slash-command sync is rate limited, so only one process does it, once per start
+SYNC_APP_COMMANDS = os.getenv("SYNC_APP_COMMANDS", "1") not in ("0", "false", "no")
+
+_db_ready: asyncio.Task | None = None
+_startup: asyncio.Task | None = None
+_started = False
+STARTUP_RETRY_SECONDS = (5, 15, 60, 300)
+
+async def connect_database():
+    with startup_timer.phase("cassandra connect"):
+        await asyncio.to_thread(connect)
 
 # Global events
 @bot.event
 async def on_ready():
-    CASSANDRA_KEYSPACE = os.getenv("CASSANDRA_KEYSPACE")
-    REMIND_TABLE = "reminders_by_time"
-
-    if not table_exists(CASSANDRA_KEYSPACE, REMIND_TABLE):
-        create_tasks_table()
-        create_active_tasks_table()
-        create_reminders_table()
-        create_sessions_table()
-        create_daily_remaining_table()
-
-    start_daily_digest(bot)
-    start_monitor(bot)
-    print("All commands:", sorted(bot.all_commands.keys()))
+    global _startup
+    if _started or _startup is not None:
+        # on_ready fires again after gateway reconnects; startup work runs once
+        logging.info("Reconnected as %s.", bot.user)
+        return
+    startup_timer.end("gateway login")
+    _startup = asyncio.create_task(start_with_retry())
+
+async def start_with_retry():
+    """
+    Run startup until it succeeds. Until then nothing replicates the journal, so a
+    failed start (Cassandra down, schema bootstrap error) is retried with backoff
+    rather than left half done.
+    """
+    global _db_ready, _started
+    attempt = 0
+    while True:
+        try:
+            await start_services()
+            _started = True
+            return
+        except Exception:
+            delay = STARTUP_RETRY_SECONDS[min(attempt, len(STARTUP_RETRY_SECONDS) - 1)]
+            logging.exception("Startup failed; retrying in %ds.", delay)
+            attempt += 1
+            await asyncio.sleep(delay)
+            if _db_ready.done() and _db_ready.exception() is not None:
+                _db_ready = asyncio.create_task(connect_database())
+
+async def run_ttl_backfill():
+    try:
+        await backfill_daily_remaining_ttl()
+    except Exception:
+        logging.exception("Daily list TTL backfill failed; it will run again on the next start.")
+
+async def start_services():
+    await _db_ready
+    with startup_timer.phase("schema bootstrap"):
+        await bootstrap_schema()
+    with startup_timer.phase("journal replay"):
+        await replay_journal()
+    # Subscribed before the warm-up, so the one presence scan also fills the deadline heap
+    start_auto_stop(bot)
+    with startup_timer.phase("presence warm-up"):
+        await asyncio.to_thread(warm_presence_index)  # also overlays unreplicated journal entries
+    start_replicator()
+
+    with startup_timer.phase("background jobs"):
+        start_leader_election()
+        start_daily_digest(bot)
+        start_monitor(bot)
+        start_presence_status(bot)
+        start_session_archive(bot)
+        start_reminder_repair(bot)
+    if PROCESS_INDEX == 0:
+        # One-time fix-up of pre-TTL daily rows; returns at once after it has completed
+        asyncio.create_task(run_ttl_backfill(), name="daily_ttl_backfill")
+
+    logging.info("All commands: %s", sorted(bot.all_commands.keys()))
     logging.info(
         "Logged in as %s (ID: %s). Connected to %d guild(s).",
         bot.user,
         bot.user.id,
         len(bot.guilds),
     )
+    if is_sharded():
+        logging.info("Process %s running shard(s) %s of %s.", slice_label(), shard_ids() or "all", bot.shard_count)
+    startup_timer.log()
+
+    if SYNC_APP_COMMANDS and PROCESS_INDEX == 0:
+        try:
+            synced = await bot.tree.sync()
+            logging.info("Synced %d slash command(s).", len(synced))
+        except discord.HTTPException as exc:
+            logging.warning("Slash command sync failed: %s", exc)
 
 # Error handling
 @bot.event
@@ -115,8 +178,19 @@ async def on_command_error(ctx: commands.Context, error: commands.CommandError):
     
 
 async def main() -> None:
-    await load_cogs()
-    await bot.start(TOKEN)
+    global _db_ready
+    startup_timer.phases.append(("imports", 0.0, startup_timer.elapsed()))
+    install_diagnostics(bot)
+    # Connect to Cassandra in the background while cogs load and the gateway logs in
+    _db_ready = asyncio.create_task(connect_database())
+    with startup_timer.phase("load cogs"):
+        await load_cogs()
+    startup_timer.begin("gateway login")
+    try:
+        await bot.start(TOKEN)
+    finally:
+        await stop_replicator()
+        await release_leases()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
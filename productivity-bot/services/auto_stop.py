@@ -0,0 +1,274 @@
+# services/auto_stop.py
+"""
+Automatic stop for forgotten sessions.
+
+Deadlines live in an in-memory min-heap keyed on each active session's start
+time. The heap is filled from the presence index, which is built from one paged
+scan at startup and then kept current by every start/stop, so a single process
+never polls active_tasks_by_user. A single task sleeps until the earliest
+deadline. Stale entries (the user stopped or switched) are skipped when popped,
+and each deadline is checked against the user's current session before acting.
+
+With several processes a user can start on any of them, so every process
+schedules every session it observes (its own starts, plus the startup scan).
+A deadline fires on the user's owner first and on other observers
+AUTO_STOP_GRACE_SECONDS later; each re-reads the session from Cassandra before
+acting, so whoever comes second finds it already stopped. The idle check's
+state (when we asked, when the user said "still working") lives on the
+active_tasks_by_user row, and its buttons are dynamic items registered on every
+process: DM interactions arrive on shard 0, which may not be the owner's process.
+
+  MAX_SESSION_HOURS:   sessions are stopped at start + this, with the duration
+                       capped to it (0 disables).
+  IDLE_CHECK_HOURS:    if set, the user is DMed this long after starting (and
+                       again after each "still working") to confirm. No answer
+                       within IDLE_CONFIRM_MINUTES stops the session as of when
+                       we asked.
+"""
+import os
+import heapq
+import asyncio
+import logging
+import itertools
+import threading
+import discord
+
+from datetime import datetime, timedelta, timezone
+from database.presence_index import Presence, add_listener, to_millis
+from database.active_task_queries import get_idle_state_aio, claim_idle_check_aio, mark_still_working_aio
+from services.journal import journal_transition, current_presence
+from services.sharding import owns_user
+from services.leader import is_leader, LEASE_RENEW_SECONDS
+
+MAX_SESSION_HOURS = float(os.getenv("MAX_SESSION_HOURS", 12))
+IDLE_CHECK_HOURS = float(os.getenv("IDLE_CHECK_HOURS", 0))
+IDLE_CONFIRM_MINUTES = float(os.getenv("IDLE_CONFIRM_MINUTES", 30))
+AUTO_STOP_GRACE_SECONDS = float(os.getenv("AUTO_STOP_GRACE_SECONDS", 120))
+
+CAP = "cap"
+CHECK = "check"
+CONFIRM_TIMEOUT = "confirm_timeout"
+
+def cap_session(start: datetime, end: datetime) -> tuple[datetime, float]:
+    """(end, duration_hours) with the duration limited to MAX_SESSION_HOURS."""
+    hours = max((end - start).total_seconds() / 3600.0, 0.0)
+    if MAX_SESSION_HOURS > 0 and hours > MAX_SESSION_HOURS:
+        return start + timedelta(hours=MAX_SESSION_HOURS), MAX_SESSION_HOURS
+    return end, hours
+
+class DeadlineHeap:
+    def __init__(self):
+        self._heap: list[tuple[datetime, int, str, datetime, str]] = []
+        self._seq = itertools.count()
+        self._scheduled: dict[str, datetime] = {}  # user -> start_time (ms) already queued
+        self._lock = threading.Lock()               # presence warm-ups notify from a worker thread
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    def push(self, when: datetime, user_id: str, start_time: datetime, kind: str):
+        with self._lock:
+            earliest = self._heap[0][0] if self._heap else None
+            heapq.heappush(self._heap, (when, next(self._seq), user_id, start_time, kind))
+        if earliest is None or when < earliest:
+            self._wake()
+
+    def schedule_session(self, p: Presence):
+        with self._lock:
+            if self._scheduled.get(p.user_id) == to_millis(p.start_time):
+                return
+            self._scheduled[p.user_id] = to_millis(p.start_time)
+        # Non-owners only act if the owner didn't (it may never have seen the session)
+        base = p.start_time if owns_user(p.user_id) else p.start_time + timedelta(seconds=AUTO_STOP_GRACE_SECONDS)
+        if MAX_SESSION_HOURS > 0:
+            self.push(base + timedelta(hours=MAX_SESSION_HOURS), p.user_id, p.start_time, CAP)
+        if IDLE_CHECK_HOURS > 0:
+            self.push(base + timedelta(hours=IDLE_CHECK_HOURS), p.user_id, p.start_time, CHECK)
+
+    def forget(self, user_id: str):
+        # Heap entries for the user go stale and are dropped when they surface
+        with self._lock:
+            self._scheduled.pop(user_id, None)
+
+    def is_scheduled(self, user_id: str, start_time: datetime) -> bool:
+        with self._lock:
+            return self._scheduled.get(user_id) == to_millis(start_time)
+
+    def peek(self):
+        with self._lock:
+            return self._heap[0] if self._heap else None
+
+    def pop(self):
+        with self._lock:
+            return heapq.heappop(self._heap)
+
+    def _wake(self):
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+deadlines = DeadlineHeap()
+_pending_confirm: dict[str, datetime] = {}  # user -> when we asked
+_runner: asyncio.Task | None = None
+
+def _on_presence(user_id: str, presence: Presence | None):
+    if presence is None:
+        deadlines.forget(user_id)
+        _pending_confirm.pop(user_id, None)
+    else:
+        deadlines.schedule_session(presence)
+
+def _utc(ts: datetime | None) -> datetime | None:
+    return ts.replace(tzinfo=timezone.utc) if ts is not None and ts.tzinfo is None else ts
+
+async def _current(user_id: str, start_time: datetime) -> Presence | None:
+    """The user's session if it is still the one that started at start_time."""
+    p = await current_presence(user_id)
+    return p if p is not None and to_millis(p.start_time) == to_millis(start_time) else None
+
+async def stop_session(bot, p: Presence, end: datetime, reason: str):
+    end, hours = cap_session(p.start_time, end)
+    await journal_transition(p.user_id, closing=(p.task_id, p.start_time, end, hours))
+    logging.info("Auto-stopped %s for %s after %.2fh (%s).", p.task_name or p.task_id, p.user_id, hours, reason)
+    try:
+        user = await bot.fetch_user(int(p.user_id))
+        await user.send(f"⏹️ I stopped **{p.task_name or p.task_id}** ({reason}) and logged **{hours:.2f}h**.")
+    except discord.HTTPException:
+        pass
+
+class IdleCheckButton(discord.ui.DynamicItem[discord.ui.Button],
+                      template=r"autostop:(?P<action>keep|stop):(?P<user_id>[0-9]+):(?P<start_ms>[0-9]+)"):
+    """
+    "Still working" / "Stop now" on the idle-check DM. The custom_id carries the user
+    and session, so whichever process receives the click can handle it.
+    """
+
+    def __init__(self, action: str, user_id: str, start_ms: int):
+        self.action = action
+        self.user_id = user_id
+        self.start_time = datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc)
+        keep = action == "keep"
+        super().__init__(discord.ui.Button(
+            label="Still working" if keep else "Stop now",
+            style=discord.ButtonStyle.success if keep else discord.ButtonStyle.danger,
+            custom_id=f"autostop:{action}:{user_id}:{start_ms}",
+        ))
+
+    @classmethod
+    def for_session(cls, action: str, p: Presence) -> "IdleCheckButton":
+        return cls(action, p.user_id, int(to_millis(p.start_time).timestamp() * 1000))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["action"], match["user_id"], int(match["start_ms"]))
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return str(interaction.user.id) == self.user_id
+
+    async def callback(self, interaction: discord.Interaction):
+        p = await _current(self.user_id, self.start_time)
+        if p is None:
+            await interaction.response.edit_message(content="That session has already ended.", view=None)
+            return
+        now = datetime.now(timezone.utc)
+        if self.action == "stop":
+            await interaction.response.edit_message(content="Stopping…", view=None)
+            await stop_session(interaction.client, p, now, "stopped from the idle check")
+            return
+        if not await mark_still_working_aio(self.user_id, to_millis(p.start_time), now):
+            await interaction.response.edit_message(content="That session has already ended.", view=None)
+            return
+        if _pending_confirm.pop(self.user_id, None) is not None:
+            # We asked from this process: its timeout would otherwise re-read the row
+            deadlines.push(now + timedelta(hours=IDLE_CHECK_HOURS), self.user_id, p.start_time, CHECK)
+        await interaction.response.edit_message(content=f"👍 Keeping **{p.task_name or p.task_id}** running.", view=None)
+
+async def _ask_still_working(bot, p: Presence, now: datetime, deadline: datetime):
+    started, asked_at, _ = await get_idle_state_aio(p.user_id)
+    if started is None or to_millis(_utc(started)) != to_millis(p.start_time):
+        return
+    asked_at = _utc(asked_at)
+    if asked_at is not None and asked_at >= max(p.start_time, deadline - timedelta(seconds=AUTO_STOP_GRACE_SECONDS)):
+        return  # another process already asked for this check
+    if not await claim_idle_check_aio(p.user_id, started, now, asked_at):
+        return
+    _pending_confirm[p.user_id] = now
+    deadlines.push(now + timedelta(minutes=IDLE_CONFIRM_MINUTES), p.user_id, p.start_time, CONFIRM_TIMEOUT)
+    view = discord.ui.View(timeout=None)
+    view.add_item(IdleCheckButton.for_session("keep", p))
+    view.add_item(IdleCheckButton.for_session("stop", p))
+    try:
+        user = await bot.fetch_user(int(p.user_id))
+        elapsed = (now - p.start_time).total_seconds() / 3600.0
+        await user.send(
+            f"⏱️ You've been on **{p.task_name or p.task_id}** for {elapsed:.1f}h. Still working? "
+            f"I'll stop it in {IDLE_CONFIRM_MINUTES:.0f} min if I don't hear back.",
+            view=view,
+        )
+    except discord.HTTPException:
+        # DMs closed: fall through to the timeout, which stops as of now
+        pass
+
+async def _fire(bot, when: datetime, user_id: str, start_time: datetime, kind: str):
+    p = await current_presence(user_id)
+    if p is None or to_millis(p.start_time) != to_millis(start_time):
+        # Stopped or switched, possibly on another process; track whatever runs now
+        deadlines.forget(user_id)
+        _pending_confirm.pop(user_id, None)
+        if p is not None:
+            deadlines.schedule_session(p)
+        return
+    now = datetime.now(timezone.utc)
+    if kind == CAP:
+        await stop_session(bot, p, now, f"{MAX_SESSION_HOURS:g}h limit")
+    elif kind == CHECK:
+        if user_id not in _pending_confirm:
+            await _ask_still_working(bot, p, now, when)
+    elif kind == CONFIRM_TIMEOUT:
+        asked = _pending_confirm.pop(user_id, None)
+        if asked is None:
+            return
+        # The answer may have been clicked on another process
+        _, _, still_working_at = await get_idle_state_aio(user_id)
+        still_working_at = _utc(still_working_at)
+        if still_working_at is not None and still_working_at >= to_millis(asked):
+            deadlines.push(still_working_at + timedelta(hours=IDLE_CHECK_HOURS), user_id, p.start_time, CHECK)
+            return
+        await stop_session(bot, p, asked, "no reply to the idle check")
+
+async def _run(bot):
+    while True:
+        deadlines._wakeup.clear()
+        head = deadlines.peek()
+        delay = None if head is None else (head[0] - datetime.now(timezone.utc)).total_seconds()
+        if delay is None or delay > 0:
+            try:
+                await asyncio.wait_for(deadlines._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        if not deadlines.is_scheduled(head[2], head[3]):
+            deadlines.pop()  # session already ended or replaced; drop it on every replica
+            continue
+        if not is_leader("auto_stop"):
+            # Keep the entry; the lease holder acts on it. Re-check after the next renewal.
+            await asyncio.sleep(LEASE_RENEW_SECONDS)
+            continue
+        when, _, user_id, start_time, kind = deadlines.pop()
+        try:
+            await _fire(bot, when, user_id, start_time, kind)
+        except Exception:
+            logging.exception("Auto-stop for %s failed", user_id)
+
+def start_auto_stop(bot):
+    """Call before the presence index is warmed so the warm-up fills the heap."""
+    global _runner
+    if MAX_SESSION_HOURS <= 0 and IDLE_CHECK_HOURS <= 0:
+        logging.info("Session auto-stop disabled.")
+        return
+    if _runner is not None:
+        return
+    bot.add_dynamic_items(IdleCheckButton)  # clicks on idle checks asked from any process
+    deadlines._loop = asyncio.get_running_loop()
+    deadlines._wakeup = asyncio.Event()
+    add_listener(_on_presence)
+    _runner = asyncio.create_task(_run(bot), name="auto_stop")
+    print("Session auto-stop running.")
@@ -0,0 +1,345 @@
+# services/backup.py
+"""
+Keyspace backup to local gzip JSONL files, and the matching restore.
+
+Backup reads every table (except job_leases and scheduler_cursors, which are
+only live runtime state)
+with SELECT JSON in BACKUP_SLICES token slices per table, at most
+BACKUP_CONCURRENCY slices at a time, and streams each page straight into that
+slice's chunk file. Chunks roll over every BACKUP_CHUNK_ROWS rows, so memory
+stays at one page per running slice however large the tables are. A backup is
+written to "<name>.partial" and renamed once manifest.json (tables, columns,
+chunk files with row counts) is in place, so an interrupted backup is never
+mistaken for a complete one.
+
+Restore creates any missing tables first (bootstrap_schema, so it works straight
+after !reset), then replays each chunk with INSERT JSON, RESTORE_CONCURRENCY
+writes in flight. Rows holding only static columns (no clustering key) can't be
+inserted and are written with an UPDATE of the statics. Counter tables can't be
+inserted into; their rows are re-applied as increments, so they are only
+restored into an empty table (as after !reset). If a counter table has picked up
+rows since (a session ended in between), the restore is refused before anything
+is written rather than double-counting.
+
+Also runnable as a tool:  python -m services.backup backup | restore <name> | list
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import asyncio
+import logging
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from config import BASE_DIR, CASSANDRA_KEYSPACE
+from database.cassandra_client import session, execute_aio, TUPLES
+from database.token_ranges import token_slices, scan_slice
+from database.schema import bootstrap_schema
+
+BACKUP_DIR = Path(os.getenv("BACKUP_DIR", str(BASE_DIR / "backups")))
+BACKUP_SLICES = int(os.getenv("BACKUP_SLICES", 16))
+BACKUP_CONCURRENCY = int(os.getenv("BACKUP_CONCURRENCY", 8))
+BACKUP_FETCH_SIZE = int(os.getenv("BACKUP_FETCH_SIZE", 1000))
+BACKUP_CHUNK_ROWS = int(os.getenv("BACKUP_CHUNK_ROWS", 100_000))
+RESTORE_CONCURRENCY = int(os.getenv("RESTORE_CONCURRENCY", 64))
+RESTORE_READ_ROWS = 1000
+
+MANIFEST = "manifest.json"
+SKIP_TABLES = {"job_leases", "scheduler_cursors"}
+
+@dataclass
+class TableSchema:
+    name: str
+    partition_key: list[str]
+    columns: list[str]
+    counters: list[str] = field(default_factory=list)
+    clustering: list[str] = field(default_factory=list)
+    statics: list[str] = field(default_factory=list)
+
+@dataclass
+class Progress:
+    action: str
+    rows: int = 0
+    bytes: int = 0
+    chunks: int = 0
+    tables_done: int = 0
+    tables_total: int = 0
+    skipped: list[str] = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic)
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return (f"{self.action}: {self.tables_done}/{self.tables_total} table(s), {self.rows:,} row(s), "
+                f"{self.bytes / 2**20:.1f} MiB in {elapsed:.0f}s ({self.rows / elapsed:,.0f} rows/s)")
+
+def read_schema(keyspace: str = CASSANDRA_KEYSPACE) -> list[TableSchema]:
+    tables: dict[str, TableSchema] = {}
+    pk_pos: dict[str, dict[str, int]] = {}
+    for row in session.execute("""
+        SELECT table_name, column_name, kind, position, type
+        FROM system_schema.columns WHERE keyspace_name = %s
+    """, (keyspace,)):
+        if row.table_name in SKIP_TABLES:
+            continue
+        t = tables.setdefault(row.table_name, TableSchema(row.table_name, [], []))
+        t.columns.append(row.column_name)
+        if row.kind == "partition_key":
+            pk_pos.setdefault(row.table_name, {})[row.column_name] = row.position
+        elif row.kind == "clustering":
+            t.clustering.append(row.column_name)
+        elif row.kind == "static":
+            t.statics.append(row.column_name)
+        if row.type == "counter":
+            t.counters.append(row.column_name)
+    for name, t in tables.items():
+        t.partition_key = sorted(pk_pos.get(name, {}), key=pk_pos[name].get)
+    return sorted(tables.values(), key=lambda t: t.name)
+
+class _ChunkWriter:
+    """One slice's output: gzip JSONL files of up to BACKUP_CHUNK_ROWS rows each."""
+
+    def __init__(self, directory: Path, prefix: str):
+        self.directory = directory
+        self.prefix = prefix
+        self.chunks: list[dict] = []
+        self._file = None
+        self._rows = 0
+
+    def write_page(self, page) -> int:
+        """Blocking (compression + disk); returns the bytes written."""
+        written = 0
+        for (doc,) in page:
+            if self._file is None or self._rows >= BACKUP_CHUNK_ROWS:
+                self._roll()
+            data = (doc + "\n").encode()
+            self._file.write(data)
+            self._rows += 1
+            self.chunks[-1]["rows"] += 1
+            written += len(data)
+        return written
+
+    def _roll(self):
+        self.close()
+        name = f"{self.prefix}-{len(self.chunks):04d}.jsonl.gz"
+        self._file = gzip.open(self.directory / name, "wb", compresslevel=6)
+        self._rows = 0
+        self.chunks.append({"file": name, "rows": 0})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+async def _backup_slice(directory: Path, table: TableSchema, index: int, lo: int, hi: int,
+                        slots: asyncio.Semaphore, progress: Progress) -> list[dict]:
+    async with slots:
+        writer = _ChunkWriter(directory, f"{table.name}/{index:03d}")
+        try:
+            async for page in scan_slice(table.name, tuple(table.partition_key), "JSON *", lo, hi,
+                                         BACKUP_FETCH_SIZE):
+                progress.bytes += await asyncio.to_thread(writer.write_page, page)
+                progress.rows += len(page)
+        finally:
+            await asyncio.to_thread(writer.close)
+        progress.chunks += len(writer.chunks)
+        return writer.chunks
+
+async def create_backup(progress: Progress | None = None, name: str | None = None) -> Path:
+    """Back up every table; returns the finished backup directory."""
+    progress = progress or Progress("backup")
+    name = name or datetime.now(timezone.utc).strftime("backup-%Y%m%d-%H%M%S")
+    final = BACKUP_DIR / name
+    partial = BACKUP_DIR / f"{name}.partial"
+    if final.exists():
+        raise FileExistsError(f"backup {name} already exists")
+
+    tables = await asyncio.to_thread(read_schema)
+    progress.tables_total = len(tables)
+    slots = asyncio.Semaphore(BACKUP_CONCURRENCY)
+    manifest = {
+        "name": name,
+        "keyspace": CASSANDRA_KEYSPACE,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "format": "jsonl.gz (one SELECT JSON row per line)",
+        "tables": {},
+    }
+
+    async def one_table(t: TableSchema):
+        (partial / t.name).mkdir(parents=True, exist_ok=True)
+        per_slice = await asyncio.gather(*(
+            _backup_slice(partial, t, i, lo, hi, slots, progress)
+            for i, (lo, hi) in enumerate(token_slices(BACKUP_SLICES))
+        ))
+        chunks = [c for cs in per_slice for c in cs]
+        manifest["tables"][t.name] = {
+            "partition_key": t.partition_key,
+            "columns": t.columns,
+            "counters": t.counters,
+            "rows": sum(c["rows"] for c in chunks),
+            "chunks": chunks,
+        }
+        progress.tables_done += 1
+
+    await asyncio.gather(*(one_table(t) for t in tables))
+    manifest["rows"] = progress.rows
+    manifest["bytes"] = progress.bytes
+    manifest["seconds"] = round(time.monotonic() - progress.started, 1)
+    (partial / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    partial.rename(final)
+    logging.info("Backup %s written: %s", name, progress.line())
+    return final
+
+def list_backups() -> list[dict]:
+    """Finished backups, newest first."""
+    if not BACKUP_DIR.is_dir():
+        return []
+    found = []
+    for p in BACKUP_DIR.iterdir():
+        manifest = p / MANIFEST
+        if p.is_dir() and manifest.is_file():
+            found.append(json.loads(manifest.read_text()))
+    return sorted(found, key=lambda m: m["created_at"], reverse=True)
+
+def _read_rows(reader, limit: int) -> list[str]:
+    rows = []
+    for line in reader:
+        rows.append(line.decode().rstrip("\n"))
+        if len(rows) >= limit:
+            break
+    return rows
+
+class CounterTableNotEmpty(RuntimeError):
+    def __init__(self, table: str):
+        super().__init__(
+            f"{table} already has rows, and restoring counters would add to them. "
+            f"Run !reset, then !restore before any sessions are recorded."
+        )
+
+async def _require_empty(name: str, live: TableSchema):
+    if await execute_aio(f"SELECT {live.partition_key[0]} FROM {name} LIMIT 1", execution_profile=TUPLES):
+        raise CounterTableNotEmpty(name)
+
+async def _restore_table(directory: Path, name: str, spec: dict, live: TableSchema, progress: Progress):
+    counters = spec["counters"]
+    if counters:
+        await _require_empty(name, live)
+        keys = [c for c in spec["columns"] if c not in counters]
+        cql = (f"UPDATE {name} SET " + ", ".join(f"{c} = {c} + ?" for c in counters)
+               + " WHERE " + " AND ".join(f"{k} = fromJson(?)" for k in keys))
+        stmt = await asyncio.to_thread(session.prepare, cql)
+
+        def params(doc: str):
+            row = json.loads(doc)
+            return stmt, [int(row[c] or 0) for c in counters] + [json.dumps(row[k]) for k in keys]
+    else:
+        # DEFAULT UNSET: null columns in the dump are skipped rather than written as tombstones
+        insert = await asyncio.to_thread(session.prepare, f"INSERT INTO {name} JSON ? DEFAULT UNSET")
+        statics_only = None
+        if live.clustering and live.statics:
+            statics_only = await asyncio.to_thread(session.prepare, (
+                f"UPDATE {name} SET " + ", ".join(f"{c} = fromJson(?)" for c in live.statics)
+                + " WHERE " + " AND ".join(f"{k} = fromJson(?)" for k in live.partition_key)))
+
+        def params(doc: str):
+            if statics_only is not None:
+                row = json.loads(doc)
+                if all(row.get(c) is None for c in live.clustering):
+                    return statics_only, [json.dumps(row.get(c)) for c in live.statics + live.partition_key]
+            return insert, [doc]
+
+    slots = asyncio.Semaphore(RESTORE_CONCURRENCY)
+
+    async def write(doc: str):
+        async with slots:
+            await execute_aio(*params(doc))
+
+    for chunk in spec["chunks"]:
+        path = directory / chunk["file"]
+        reader = await asyncio.to_thread(gzip.open, path, "rb")
+        try:
+            while True:
+                docs = await asyncio.to_thread(_read_rows, reader, RESTORE_READ_ROWS)
+                if not docs:
+                    break
+                await asyncio.gather(*(write(d) for d in docs))
+                progress.rows += len(docs)
+                progress.bytes += sum(len(d) + 1 for d in docs)
+        finally:
+            await asyncio.to_thread(reader.close)
+        progress.chunks += 1
+
+async def restore_backup(name: str, progress: Progress | None = None) -> Progress:
+    """
+    Reload a backup into the current keyspace. Missing tables are created first;
+    tables the current schema doesn't define are skipped. Raises
+    CounterTableNotEmpty if a counter table already has rows.
+    """
+    progress = progress or Progress("restore")
+    if Path(name).name != name:
+        raise ValueError(f"bad backup name {name!r}")
+    directory = BACKUP_DIR / name
+    manifest_path = directory / MANIFEST
+    if not manifest_path.is_file():
+        raise FileNotFoundError(f"no finished backup named {name}")
+    manifest = json.loads(manifest_path.read_text())
+    await bootstrap_schema()
+    live = {t.name: t for t in await asyncio.to_thread(read_schema)}
+    progress.tables_total = len(manifest["tables"])
+    # Checked up front too, so a refused restore leaves the keyspace untouched
+    for table_name, spec in manifest["tables"].items():
+        if spec["counters"] and table_name in live:
+            await _require_empty(table_name, live[table_name])
+
+    for table_name, spec in manifest["tables"].items():
+        if table_name not in live:
+            logging.warning("Restore: table %s isn't in the schema, skipping.", table_name)
+            progress.skipped.append(table_name)
+        else:
+            await _restore_table(directory, table_name, spec, live[table_name], progress)
+        progress.tables_done += 1
+
+    logging.info("Restore of %s finished: %s", name, progress.line())
+    return progress
+
+async def _cli(argv: list[str]) -> int:
+    from database.cassandra_client import connect
+    await asyncio.to_thread(connect)
+    progress = Progress(argv[0])
+
+    async def report():
+        while True:
+            await asyncio.sleep(5)
+            print(progress.line(), flush=True)
+
+    reporter = asyncio.create_task(report())
+    status = 0
+    try:
+        if argv[0] == "backup":
+            path = await create_backup(progress, argv[1] if len(argv) > 1 else None)
+            print(f"Wrote {path}")
+        else:
+            await restore_backup(argv[1], progress)
+            if progress.skipped:
+                print("Skipped:", ", ".join(progress.skipped))
+            if progress.tables_done == len(progress.skipped):
+                print("Nothing was restored.")
+                status = 1
+    finally:
+        reporter.cancel()
+    print(progress.line())
+    return status
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = sys.argv[1:]
+    if args[:1] == ["list"]:
+        for m in list_backups():
+            print(f"{m['name']}  {m['created_at']}  {m['rows']:,} rows  {m['bytes'] / 2**20:.1f} MiB")
+    elif args[:1] == ["backup"] or (args[:1] == ["restore"] and len(args) == 2):
+        sys.exit(asyncio.run(_cli(args)))
+    else:
+        print("usage: python -m services.backup backup [name] | restore <name> | list")
+        sys.exit(2)
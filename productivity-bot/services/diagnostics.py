@@ -0,0 +1,185 @@
+# services/diagnostics.py
+"""
+Event-loop stall detector (DIAGNOSTICS=1).
+
+A heartbeat task sleeps HEARTBEAT_MS at a time and measures how late it wakes up.
+A watchdog thread notices when the heartbeat has been silent for longer than
+STALL_THRESHOLD_MS and captures the loop thread's stack while it is still stuck.
+It also notes the asyncio task running at that moment. Commands rename their
+task to "!<command>" in a before_invoke hook, and tasks.loop jobs are already
+named after their coroutine, so each stall is attributed to a command or
+background loop. Stalls are aggregated by (label, innermost frame in this
+codebase) for the !stalls report. asyncio debug mode's slow-callback warnings
+are switched on with the same threshold.
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+
+from collections import deque
+from dataclasses import dataclass, field
+from config import BASE_DIR
+
+DIAGNOSTICS = os.getenv("DIAGNOSTICS", "0") in ("1", "true", "yes")
+STALL_THRESHOLD_MS = int(os.getenv("STALL_THRESHOLD_MS", 100))
+HEARTBEAT_MS = int(os.getenv("HEARTBEAT_MS", 20))
+RECENT_STALLS = 20
+
+_REPO_ROOT = str(BASE_DIR)
+
+@dataclass
+class StallStat:
+    label: str
+    site: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    stack: list[str] = field(default_factory=list)  # from the longest occurrence
+
+@dataclass
+class _Capture:
+    label: str
+    site: str
+    stack: list[str]
+
+def _repo_frames(stack: traceback.StackSummary) -> list[traceback.FrameSummary]:
+    return [f for f in stack if f.filename.startswith(_REPO_ROOT)]
+
+def _site(stack: traceback.StackSummary) -> str:
+    """Innermost frame from this codebase (the call that blocked), else the innermost frame."""
+    frames = _repo_frames(stack) or list(stack)
+    if not frames:
+        return "<unknown>"
+    f = frames[-1]
+    return f"{os.path.relpath(f.filename, _REPO_ROOT)}:{f.lineno} {f.name}"
+
+class StallMonitor:
+    def __init__(self, threshold_ms: int = STALL_THRESHOLD_MS, heartbeat_ms: int = HEARTBEAT_MS):
+        self.threshold = threshold_ms / 1000
+        self.interval = heartbeat_ms / 1000
+        self.stats: dict[tuple[str, str], StallStat] = {}
+        self.recent: deque[tuple[float, str, str, float]] = deque(maxlen=RECENT_STALLS)
+        self.started_at = 0.0
+        self.max_lag_ms = 0.0
+        self._beat = time.perf_counter()
+        self._capture: _Capture | None = None
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id = 0
+        self._task: asyncio.Task | None = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._loop.set_debug(True)
+        self._loop.slow_callback_duration = self.threshold
+        self.started_at = time.time()
+        self._beat = time.perf_counter()
+        self._task = asyncio.create_task(self._heartbeat(), name="diagnostics: heartbeat")
+        threading.Thread(target=self._watch, name="stall-watchdog", daemon=True).start()
+        logging.info("Stall monitor on: threshold %.0f ms, heartbeat %.0f ms.",
+                     self.threshold * 1000, self.interval * 1000)
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self.recent.clear()
+            self.max_lag_ms = 0.0
+            self.started_at = time.time()
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - self._beat - self.interval
+            if lag >= self.threshold:
+                self._record(lag)
+            else:
+                with self._lock:
+                    self._capture = None
+
+    def _watch(self):
+        # Poll at half the threshold so a stall is seen while the loop is still inside it
+        period = max(self.threshold / 2, 0.005)
+        while not self._stop.wait(period):
+            if time.perf_counter() - self._beat < self.threshold + self.interval:
+                continue
+            with self._lock:
+                if self._capture is None:
+                    self._capture = self._capture_loop_stack()
+
+    def _capture_loop_stack(self) -> _Capture:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.extract_stack(frame) if frame is not None else traceback.StackSummary()
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        label = task.get_name() if task is not None else "<loop callback>"
+        return _Capture(label, _site(stack), traceback.format_list(stack)[-12:])
+
+    def _record(self, lag: float):
+        lag_ms = lag * 1000
+        with self._lock:
+            capture, self._capture = self._capture, None
+            if capture is None:
+                # Too short for the watchdog to catch mid-stall; count it unattributed
+                capture = _Capture("<unattributed>", "<not captured>", [])
+            key = (capture.label, capture.site)
+            stat = self.stats.get(key)
+            if stat is None:
+                stat = self.stats[key] = StallStat(capture.label, capture.site)
+            stat.count += 1
+            stat.total_ms += lag_ms
+            if lag_ms > stat.max_ms:
+                stat.max_ms = lag_ms
+                stat.stack = capture.stack
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            self.recent.append((time.time(), capture.label, capture.site, lag_ms))
+        logging.warning("Event loop stalled %.0f ms in %s at %s", lag_ms, capture.label, capture.site)
+
+    def ranked(self, limit: int = 10) -> list[StallStat]:
+        with self._lock:
+            return sorted(self.stats.values(), key=lambda s: s.total_ms, reverse=True)[:limit]
+
+    def report(self, limit: int = 10) -> str:
+        ranked = self.ranked(limit)
+        window = time.time() - self.started_at
+        lines = [f"Stalls >= {self.threshold * 1000:.0f} ms over the last {window / 60:.0f} min "
+                 f"(worst {self.max_lag_ms:.0f} ms):"]
+        if not ranked:
+            lines.append("  none")
+        for i, s in enumerate(ranked, start=1):
+            lines.append(f"{i:>2}. {s.total_ms:8.0f} ms total  {s.count:>4}x  max {s.max_ms:6.0f} ms  "
+                         f"{s.label} @ {s.site}")
+        return "\n".join(lines)
+
+monitor = StallMonitor()
+
+async def _label_command(ctx):
+    # Name the invoking task after the command so stalls (and profiles) can be attributed
+    task = asyncio.current_task()
+    if task is not None:
+        task.set_name(f"!{ctx.command.qualified_name}")
+
+def install(bot):
+    bot.before_invoke(_label_command)
+    if DIAGNOSTICS:
+        monitor.start()
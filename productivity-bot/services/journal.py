@@ -0,0 +1,289 @@
+# services/journal.py
+"""
+Local write-ahead journal for !start/!stop.
+
+Mutations are committed to an SQLite database in WAL mode with synchronous=FULL
+(fsynced before the command replies), applied to the in-memory presence index,
+and replicated to Cassandra by a background task. Every entry carries the write
+timestamp it was journaled with and is replayed with USING TIMESTAMP, so
+replaying an entry twice, or out of order with later ones, leaves the same
+result. Leaderboard counters can't be written that way; a closed session's
+increment is awaited as part of its entry and recorded on the session row, so
+an entry is only marked replicated once its seconds are in, and counted once. Entries still pending at startup are replayed before the presence index
+is warmed, and whatever is still unreplicated is overlaid on every warm-up.
+
+The presence index only sees this process's writes. With several processes a
+user can start on one and stop on another, so current_presence reads
+active_tasks_by_user unless the local view is known to be complete.
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import sqlite3
+import threading
+
+from datetime import date, datetime, timezone
+from config import BASE_DIR
+from database.active_task_queries import transition_active_task_aio, get_active_user_task_aio
+from database.daily_remaining_queries import remove_from_today_aio
+from database.cassandra_client import is_connected
+from database.presence_index import (
+    Presence, mark_active, mark_inactive, get_presence, is_warmed, add_warm_overlay, to_millis,
+)
+from services.sharding import PROCESS_COUNT
+
+JOURNAL_PATH = os.getenv("JOURNAL_PATH", str(BASE_DIR / "journal.sqlite3"))
+REPLICATE_BATCH = 100
+RETRY_SECONDS = 5
+
+TRANSITION = "transition"
+DAILY_REMOVE = "daily_remove"
+
+class Journal:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._last_ts = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    write_ts INTEGER NOT NULL
+                )
+            """)
+            self._conn = conn
+        return self._conn
+
+    def _next_ts(self) -> int:
+        # Strictly increasing microseconds, so two mutations in one tick still order
+        self._last_ts = max(self._last_ts + 1, time.time_ns() // 1000)
+        return self._last_ts
+
+    def append(self, kind: str, payload: dict) -> tuple[int, int]:
+        """Durably record one mutation. Blocking (fsync); returns (seq, write_ts)."""
+        with self._lock:
+            ts = self._next_ts()
+            cur = self._db().execute(
+                "INSERT INTO entries (kind, payload, write_ts) VALUES (?, ?, ?)",
+                (kind, json.dumps(payload, default=_encode), ts),
+            )
+            return cur.lastrowid, ts
+
+    def pending(self, limit: int = REPLICATE_BATCH) -> list[tuple[int, str, dict, int]]:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT seq, kind, payload, write_ts FROM entries ORDER BY seq LIMIT ?", (limit,)
+            ).fetchall()
+        return [(seq, kind, json.loads(payload), ts) for seq, kind, payload, ts in rows]
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def mark_replicated(self, seqs: list[int]):
+        if not seqs:
+            return
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            db.executemany("DELETE FROM entries WHERE seq = ?", [(s,) for s in seqs])
+            db.execute("COMMIT")
+
+    def has_pending(self, user_id: str) -> bool:
+        with self._lock:
+            return self._db().execute(
+                "SELECT 1 FROM entries WHERE kind = ? AND json_extract(payload, '$.user_id') = ? LIMIT 1",
+                (TRANSITION, user_id),
+            ).fetchone() is not None
+
+    def forget_user(self, user_id: str) -> int:
+        """Drop a user's unreplicated entries (their data is being purged)."""
+        with self._lock:
+            cur = self._db().execute(
+                "DELETE FROM entries WHERE json_extract(payload, '$.user_id') = ?", (user_id,)
+            )
+            return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+journal = Journal(JOURNAL_PATH)
+_wakeup: asyncio.Event | None = None
+_replicator: asyncio.Task | None = None
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"can't journal {type(value).__name__}")
+
+def _wake():
+    if _wakeup is not None:
+        _wakeup.set()
+
+async def journal_transition(user_id: str, closing=None, start_task_id=None, start_time=None, start_task_name=None):
+    """
+    Journal a !start/!stop state change and apply it to the presence index.
+    Same arguments as transition_active_task_aio; returns once the entry is on disk.
+    """
+    payload = {
+        "user_id": user_id,
+        "closing": list(closing) if closing is not None else None,
+        "start_task_id": start_task_id,
+        "start_time": start_time,
+        "start_task_name": start_task_name,
+    }
+    await asyncio.to_thread(journal.append, TRANSITION, payload)
+    _apply_presence(payload)
+    _wake()
+
+async def journal_daily_remove(user_id: str, task_name: str, day: date):
+    await asyncio.to_thread(journal.append, DAILY_REMOVE, {"user_id": user_id, "task_name": task_name, "day": day})
+    _wake()
+
+def _apply_presence(payload: dict):
+    if payload["start_task_id"] is not None:
+        mark_active(payload["user_id"], uuid.UUID(str(payload["start_task_id"])),
+                    _decode_dt(payload["start_time"]), payload["start_task_name"])
+    else:
+        mark_inactive(payload["user_id"])
+
+def _decode_dt(value) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+async def _replicate_entry(kind: str, p: dict, ts: int):
+    if kind == TRANSITION:
+        closing = None
+        if p["closing"] is not None:
+            task_id, started, ended, hours = p["closing"]
+            closing = (uuid.UUID(task_id), _decode_dt(started), _decode_dt(ended), hours)
+        start_task_id = uuid.UUID(p["start_task_id"]) if p["start_task_id"] else None
+        start_time = _decode_dt(p["start_time"]) if p["start_time"] else None
+        await transition_active_task_aio(
+            p["user_id"], closing=closing, start_task_id=start_task_id, start_time=start_time,
+            timestamp=ts, update_presence=False,
+        )
+    elif kind == DAILY_REMOVE:
+        await remove_from_today_aio(p["user_id"], p["task_name"], day=date.fromisoformat(p["day"]), timestamp=ts)
+    else:
+        logging.error("Journal: dropping entry of unknown kind %r", kind)
+
+async def replicate_pending() -> int:
+    """
+    Push pending entries to Cassandra until the journal is empty. Entries in a batch
+    are written concurrently (explicit timestamps make their order irrelevant) and
+    removed once written; the first failure stops the pass and is re-raised.
+    Returns how many entries were replicated.
+    """
+    done = 0
+    while True:
+        entries = await asyncio.to_thread(journal.pending)
+        if not entries:
+            return done
+        results = await asyncio.gather(
+            *(_replicate_entry(kind, payload, ts) for _, kind, payload, ts in entries),
+            return_exceptions=True,
+        )
+        ok = [seq for (seq, *_), r in zip(entries, results) if not isinstance(r, BaseException)]
+        await asyncio.to_thread(journal.mark_replicated, ok)
+        done += len(ok)
+        for r in results:
+            if isinstance(r, BaseException):
+                raise r
+
+async def _replicator_loop():
+    while True:
+        await _wakeup.wait()
+        _wakeup.clear()
+        try:
+            await replicate_pending()
+        except Exception as exc:
+            left = await asyncio.to_thread(journal.pending_count)
+            logging.warning("Journal replication failed (%s); %d entr(ies) pending, retrying in %ds.",
+                            exc, left, RETRY_SECONDS)
+            await asyncio.sleep(RETRY_SECONDS)
+            _wakeup.set()
+
+async def replay_journal() -> int:
+    """
+    Startup: replicate whatever an earlier run left behind. If Cassandra is still
+    unreachable the entries stay journaled and are re-applied to presence after
+    the index is warmed (see reapply_pending_presence).
+    """
+    try:
+        replayed = await replicate_pending()
+    except Exception as exc:
+        logging.warning("Journal replay incomplete: %s", exc)
+        return 0
+    if replayed:
+        logging.info("Replayed %d journaled write(s) from a previous run.", replayed)
+    return replayed
+
+def reapply_pending_presence():
+    """Overlay still-unreplicated transitions on a freshly warmed presence index."""
+    for _, kind, payload, _ in journal.pending(limit=-1):
+        if kind == TRANSITION:
+            _apply_presence(payload)
+
+add_warm_overlay(reapply_pending_presence)
+
+async def current_presence(user_id: str) -> Presence | None:
+    """
+    The user's active session, for !start/!stop. The presence index answers when it
+    is complete: warmed in a single-process deployment, or holding this process's
+    own unreplicated transition for the user. Otherwise active_tasks_by_user is
+    read; if that fails, the index is the best answer left.
+    """
+    local = get_presence(user_id)
+    if (is_warmed() and PROCESS_COUNT == 1) or await asyncio.to_thread(journal.has_pending, user_id):
+        return local
+    try:
+        row = await get_active_user_task_aio(user_id)
+    except Exception as exc:
+        logging.warning("Active task read for %s failed (%s); using the presence index.", user_id, exc)
+        return local
+    if row is None or row.task_id is None or row.start_time is None:
+        return None
+    start_time = row.start_time.replace(tzinfo=timezone.utc)
+    if local is not None and local.task_id == row.task_id and to_millis(local.start_time) == start_time:
+        return local  # same session; keep the cached task name
+    return Presence(user_id, row.task_id, start_time)
+
+def start_replicator():
+    global _wakeup, _replicator
+    if _replicator is not None:
+        return
+    _wakeup = asyncio.Event()
+    _wakeup.set()  # drain anything left from replay
+    _replicator = asyncio.create_task(_replicator_loop())
+    print("Journal replicator running.")
+
+async def stop_replicator():
+    """Final flush on shutdown; whatever can't be written stays journaled."""
+    global _replicator
+    if _replicator is not None:
+        _replicator.cancel()
+        _replicator = None
+    if not is_connected():
+        journal.close()
+        return
+    try:
+        await asyncio.wait_for(replicate_pending(), timeout=10)
+    except Exception as exc:
+        logging.warning("Journal not fully flushed on shutdown: %s", exc)
+    journal.close()
@@ -0,0 +1,84 @@
+# services/leader.py
+"""
+Lease-based leader election so several replicas can run without double-sending.
+
+Every replica heartbeats each job's lease (Cassandra LWT with a TTL). The holder
+runs the job; the rest skip it. A holder only trusts its lease until
+LEASE_TTL_SECONDS - LEASE_SAFETY_SECONDS after its last successful renewal, so it
+stops before anyone else can take over. Failover takes at most LEASE_TTL_SECONDS +
+LEASE_RENEW_SECONDS. Commands are unaffected: every replica serves them.
+"""
+import os
+import time
+import socket
+import uuid
+import logging
+
+import config  # noqa: F401 -- loads .env before the settings below are read
+from discord.ext import tasks
+from database.lease_queries import acquire_or_renew_lease_aio, release_lease_aio
+from services.sharding import slice_label
+
+LEADER_ELECTION = os.getenv("LEADER_ELECTION", "1") not in ("0", "false", "no")
+LEASE_TTL_SECONDS = int(os.getenv("LEASE_TTL_SECONDS", 30))
+LEASE_RENEW_SECONDS = int(os.getenv("LEASE_RENEW_SECONDS", 10))
+LEASE_SAFETY_SECONDS = 5
+
+# Background jobs that must run on exactly one replica per user slice
+JOBS = ("monitor_reminders", "daily_task_digest", "seed_daily_lists", "presence_status", "session_archive",
+        "auto_stop", "reminder_repair")
+
+REPLICA_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_valid_until: dict[str, float] = {}
+
+def lease_name(job: str) -> str:
+    # One lease per job per user slice: replicas of the same slice compete
+    return f"{job}@{slice_label()}"
+
+def is_leader(job: str) -> bool:
+    if not LEADER_ELECTION:
+        return True
+    return time.monotonic() < _valid_until.get(job, 0.0)
+
+@tasks.loop(seconds=LEASE_RENEW_SECONDS)
+async def lease_heartbeat():
+    for job in JOBS:
+        attempted_at = time.monotonic()
+        was_leader = is_leader(job)
+        try:
+            held = await acquire_or_renew_lease_aio(lease_name(job), REPLICA_ID, LEASE_TTL_SECONDS)
+        except Exception as exc:
+            # Can't confirm the lease: keep it only until the last renewal runs out
+            logging.warning("Lease heartbeat for %s failed: %s", job, exc)
+            continue
+
+        if held:
+            _valid_until[job] = attempted_at + LEASE_TTL_SECONDS - LEASE_SAFETY_SECONDS
+        else:
+            _valid_until.pop(job, None)
+
+        if held and not was_leader:
+            logging.info("Replica %s is now leader for %s", REPLICA_ID, lease_name(job))
+        elif was_leader and not held:
+            logging.warning("Replica %s lost leadership for %s", REPLICA_ID, lease_name(job))
+
+async def release_leases():
+    """Hand jobs over immediately on a clean shutdown instead of waiting for the TTL."""
+    if not LEADER_ELECTION:
+        return
+    lease_heartbeat.cancel()
+    for job in list(_valid_until):
+        try:
+            await release_lease_aio(lease_name(job), REPLICA_ID)
+        except Exception as exc:
+            logging.warning("Releasing lease %s failed: %s", job, exc)
+        _valid_until.pop(job, None)
+
+def start_leader_election():
+    if not LEADER_ELECTION:
+        logging.info("Leader election disabled; this replica runs every background job.")
+        return
+    if not lease_heartbeat.is_running():
+        lease_heartbeat.start()
+    logging.info("Leader election running as %s", REPLICA_ID)
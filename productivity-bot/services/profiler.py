@@ -0,0 +1,156 @@
+# services/profiler.py
+"""
+On-demand profiling of the live process, driven by the admin !profile command.
+
+Nothing is installed until a profile is requested, and everything is torn down
+when it ends, so the bot runs without profiling hooks the rest of the time.
+  cpu:    cProfile on the event-loop thread (where commands and loops run).
+  sample: a thread samples every thread's stack every SAMPLE_INTERVAL_MS and
+          emits collapsed stacks ("a;b;c count") for flamegraph.pl / speedscope.
+          This covers asyncio.to_thread workers, which cProfile does not see.
+  mem:    tracemalloc snapshots at start and end, diffed by allocation site.
+"""
+import io
+import sys
+import time
+import pstats
+import asyncio
+import cProfile
+import threading
+import tracemalloc
+
+from collections import Counter
+
+SAMPLE_INTERVAL_MS = 5
+MAX_SECONDS = 120
+TRACEMALLOC_FRAMES = 10
+
+_busy = asyncio.Lock()
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+async def _exclusive(coro):
+    if _busy.locked():
+        coro.close()
+        raise ProfilerBusy("a profile is already running")
+    async with _busy:
+        return await coro
+
+async def _cpu(seconds: float) -> tuple[str, str]:
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        prof.disable()
+
+    out = io.StringIO()
+    stats = pstats.Stats(prof, stream=out)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(40)
+    out.write("\n\n")
+    stats.sort_stats("tottime").print_stats(40)
+
+    top = sorted(stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)[:5]  # by own time
+    summary = "\n".join(
+        f"{tt * 1000:8.1f} ms  {ncalls:>7}x  {func[2]} ({func[0]}:{func[1]})"
+        for func, (_, ncalls, tt, _, _) in top
+    )
+    return summary, out.getvalue()
+
+def _frame_names(frame) -> list[str]:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+def _sample(seconds: float, stop: threading.Event) -> tuple[Counter, int]:
+    stacks: Counter = Counter()
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    interval = SAMPLE_INTERVAL_MS / 1000
+    deadline = time.perf_counter() + seconds
+    samples = 0
+    while time.perf_counter() < deadline and not stop.is_set():
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            thread = names.get(ident) or f"thread-{ident}"
+            stacks[";".join([thread, *_frame_names(frame)])] += 1
+        samples += 1
+        time.sleep(interval)
+        if samples % 200 == 0:
+            names = {t.ident: t.name for t in threading.enumerate()}
+    return stacks, samples
+
+async def _sampled(seconds: float) -> tuple[str, str]:
+    stop = threading.Event()
+    try:
+        stacks, samples = await asyncio.to_thread(_sample, seconds, stop)
+    finally:
+        stop.set()
+
+    folded = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+    leaf = Counter()
+    for stack, count in stacks.items():
+        leaf[stack.rsplit(";", 1)[-1]] += count
+    total = sum(stacks.values()) or 1
+    summary = "\n".join(f"{count / total:6.1%}  {name}" for name, count in leaf.most_common(5))
+    return f"{samples} samples\n{summary}", folded
+
+def _mem_report(before, after, current: int, peak: int, seconds: float) -> tuple[str, str]:
+    """Blocking: filtering and comparing snapshots of a large heap takes seconds."""
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    before = before.filter_traces(filters)
+    after = after.filter_traces(filters)
+    growth = after.compare_to(before, "lineno")
+    held = after.statistics("lineno")
+
+    out = io.StringIO()
+    out.write(f"Traced memory at end: {current / 1024:.0f} KiB (peak {peak / 1024:.0f} KiB)\n\n")
+    out.write(f"Top growth over {seconds:.0f}s by allocation site:\n")
+    for stat in growth[:30]:
+        out.write(f"  {stat}\n")
+    out.write("\nTop live allocations at end:\n")
+    for stat in held[:30]:
+        out.write(f"  {stat}\n")
+    out.write("\nTracebacks of the 5 largest growth sites:\n")
+    for stat in after.compare_to(before, "traceback")[:5]:
+        out.write(f"\n{stat.size_diff / 1024:+.1f} KiB, {stat.count_diff:+d} blocks\n")
+        out.write("\n".join(stat.traceback.format()) + "\n")
+
+    summary = "\n".join(
+        f"{s.size_diff / 1024:+9.1f} KiB  {s.traceback[0].filename.rsplit('/', 1)[-1]}:{s.traceback[0].lineno}"
+        for s in growth[:5]
+    )
+    return summary, out.getvalue()
+
+async def _mem(seconds: float) -> tuple[str, str]:
+    already = tracemalloc.is_tracing()
+    if not already:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    try:
+        before = await asyncio.to_thread(tracemalloc.take_snapshot)
+        await asyncio.sleep(seconds)
+        after = await asyncio.to_thread(tracemalloc.take_snapshot)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not already:
+            tracemalloc.stop()
+    return await asyncio.to_thread(_mem_report, before, after, current, peak, seconds)
+
+MODES = {
+    "cpu": (_cpu, "profile.txt"),
+    "sample": (_sampled, "stacks.folded"),
+    "mem": (_mem, "memory.txt"),
+}
+
+async def run_profile(mode: str, seconds: float) -> tuple[str, str, str]:
+    """Profile for `seconds`; returns (short summary, full report, report filename)."""
+    fn, filename = MODES[mode]
+    seconds = max(1.0, min(float(seconds), MAX_SECONDS))
+    summary, report = await _exclusive(fn(seconds))
+    return summary, report, filename
@@ -0,0 +1,23 @@
+# services/rate_limit.py
+"""Async token bucket for pacing outbound calls below an external rate limit."""
+import asyncio
+import time
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate            # tokens per second
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
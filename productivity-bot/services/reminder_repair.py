@@ -0,0 +1,158 @@
+# services/reminder_repair.py
+"""
+Consistency sweep between tasks_by_user and its reminders_by_time index.
+
+Both tables are streamed in token slices, paced by a shared RateLimiter of
+REPAIR_PAGES_PER_SECOND pages, and each row is checked against the other table
+by key (REPAIR_READS_PER_SECOND point reads) before the next page is fetched, so
+memory stays at a page per slice however large the tables are:
+  orphan:  index row whose task no longer exists (costs the scheduler a wasted
+           get_user_task lookup every time its minute comes round)
+  stale:   index row for a task that exists but whose type/time/days differ
+  missing: a task's reminder with no index row (the reminder never fires)
+A scan is not a snapshot, so every candidate is re-read on both sides before it
+is reported or fixed. Fixing deletes orphan/stale index rows and re-inserts
+missing ones. slices picks the token ranges to sweep (default: the whole ring);
+the nightly job passes this process's share so processes split the tables
+rather than each reading all of them.
+"""
+import os
+import asyncio
+import logging
+
+from dataclasses import dataclass, field
+from database.cassandra_client import execute_aio, TUPLES
+from database.token_ranges import token_slices, scan_slice
+from database.task_queries import reminder_index_keys
+from database.models import TaskRow, columns, decode_one
+from services.rate_limit import RateLimiter
+
+REPAIR_SLICES = int(os.getenv("REPAIR_SLICES", 16))
+REPAIR_PAGES_PER_SECOND = float(os.getenv("REPAIR_PAGES_PER_SECOND", 20))
+REPAIR_READS_PER_SECOND = float(os.getenv("REPAIR_READS_PER_SECOND", 200))
+REPAIR_FETCH_SIZE = int(os.getenv("REPAIR_FETCH_SIZE", 500))
+VERIFY_CONCURRENCY = 16
+
+# (reminder_type, hour, day_of_week, minute, task_id, user_id): one reminders_by_time row
+IndexKey = tuple
+
+@dataclass
+class RepairReport:
+    tasks_scanned: int = 0
+    index_rows_scanned: int = 0
+    orphans: list[IndexKey] = field(default_factory=list)
+    stale: list[IndexKey] = field(default_factory=list)
+    missing: list[IndexKey] = field(default_factory=list)
+    fixed: int = 0
+    failed: int = 0
+
+    @property
+    def problems(self) -> int:
+        return len(self.orphans) + len(self.stale) + len(self.missing)
+
+async def _get_task(user_id, task_id) -> TaskRow | None:
+    rows = await execute_aio(f"""
+        SELECT {columns(TaskRow)} FROM tasks_by_user WHERE user_id = %s AND task_id = %s
+    """, (user_id, task_id), execution_profile=TUPLES)
+    return decode_one(TaskRow, rows)
+
+async def _index_row_exists(key: IndexKey) -> bool:
+    rtype, hour, dow, minute, task_id, _ = key
+    rows = await execute_aio("""
+        SELECT task_id FROM reminders_by_time
+        WHERE reminder_type = %s AND reminder_hour = %s
+          AND reminder_day_of_week = %s AND reminder_minute = %s AND task_id = %s
+    """, (rtype, hour, dow, minute, task_id), execution_profile=TUPLES)
+    return bool(rows)
+
+async def _classify(key: IndexKey) -> str | None:
+    """Re-read both sides by key; returns "orphan"/"stale"/"missing" or None if consistent now."""
+    task = await _get_task(key[5], key[4])
+    expected = task is not None and tuple(key[:4]) in reminder_index_keys(task)
+    exists = await _index_row_exists(key)
+    if exists and task is None:
+        return "orphan"
+    if exists and not expected:
+        return "stale"
+    if not exists and expected:
+        return "missing"
+    return None
+
+async def _fix(kind: str, key: IndexKey):
+    rtype, hour, dow, minute, task_id, user_id = key
+    if kind == "missing":
+        await execute_aio("""
+            INSERT INTO reminders_by_time (
+                reminder_type, reminder_hour, reminder_day_of_week, reminder_minute, task_id, user_id
+            ) VALUES (%s, %s, %s, %s, %s, %s)
+        """, (rtype, hour, dow, minute, task_id, user_id))
+    else:
+        await execute_aio("""
+            DELETE FROM reminders_by_time
+            WHERE reminder_type = %s AND reminder_hour = %s
+              AND reminder_day_of_week = %s AND reminder_minute = %s AND task_id = %s
+        """, (rtype, hour, dow, minute, task_id))
+
+class _Sweep:
+    def __init__(self, fix: bool):
+        self.fix = fix
+        self.report = RepairReport()
+        self.pages = RateLimiter(REPAIR_PAGES_PER_SECOND, burst=REPAIR_SLICES)
+        self.reads = RateLimiter(REPAIR_READS_PER_SECOND, burst=VERIFY_CONCURRENCY)
+        self.slots = asyncio.Semaphore(VERIFY_CONCURRENCY)
+
+    async def _guarded(self, key: IndexKey, probe):
+        """probe() -> whether the key looks inconsistent; if so, re-read both sides and record/fix it."""
+        async with self.slots:
+            try:
+                await self.reads.acquire()
+                if not await probe():
+                    return
+                await self.reads.acquire()
+                kind = await _classify(key)
+                if kind is None:
+                    return
+                getattr(self.report, "orphans" if kind == "orphan" else kind).append(key)
+                if self.fix:
+                    await _fix(kind, key)
+                    self.report.fixed += 1
+            except Exception as exc:
+                logging.error("Reminder repair of %s failed: %s", key, exc)
+                self.report.failed += 1
+
+    async def tasks(self, lo, hi):
+        async for page in scan_slice("tasks_by_user", ("user_id",), columns(TaskRow), lo, hi,
+                                     REPAIR_FETCH_SIZE, self.pages):
+            checks = []
+            for r in page:
+                t = TaskRow(*r)
+                self.report.tasks_scanned += 1
+                for key in reminder_index_keys(t):
+                    key = (*key, t.task_id, t.user_id)
+                    checks.append(self._guarded(key, lambda key=key: _missing(key)))
+            await asyncio.gather(*checks)
+
+    async def index(self, lo, hi):
+        select = "reminder_type, reminder_hour, reminder_day_of_week, reminder_minute, task_id, user_id"
+        async for page in scan_slice("reminders_by_time", ("reminder_type", "reminder_hour"), select,
+                                     lo, hi, REPAIR_FETCH_SIZE, self.pages):
+            self.report.index_rows_scanned += len(page)
+            await asyncio.gather(*(self._guarded(tuple(r), lambda key=tuple(r): _unexpected(key)) for r in page))
+
+async def _missing(key: IndexKey) -> bool:
+    return not await _index_row_exists(key)
+
+async def _unexpected(key: IndexKey) -> bool:
+    task = await _get_task(key[5], key[4])
+    return task is None or tuple(key[:4]) not in reminder_index_keys(task)
+
+async def repair_reminder_index(fix: bool = False, slices=None) -> RepairReport:
+    sweep = _Sweep(fix)
+    slices = token_slices(REPAIR_SLICES) if slices is None else slices
+    await asyncio.gather(*(scan(lo, hi) for lo, hi in slices for scan in (sweep.tasks, sweep.index)))
+    return sweep.report
+
+def describe(key: IndexKey) -> str:
+    rtype, hour, dow, minute, task_id, user_id = key
+    day = "" if dow < 0 else f" dow={dow}"
+    return f"{rtype} {hour:02d}:{minute:02d}{day} task {task_id} user {user_id}"
@@ -0,0 +1,74 @@
+# services/sharding.py
+"""
+Horizontal split of the bot across processes.
+
+Gateway shards are dealt round-robin to processes (shard s runs in process
+s % PROCESS_COUNT), and background work is split by a stable hash of user_id,
+so every user is owned by exactly one process. With the defaults (one process,
+no SHARD_COUNT) everything behaves like the original single commands.Bot.
+"""
+import os
+import zlib
+import discord
+
+import config  # noqa: F401 -- loads .env before the settings below are read
+from discord.ext import commands
+from database.token_ranges import token_slices
+
+PROCESS_COUNT = max(int(os.getenv("PROCESS_COUNT", 1)), 1)
+PROCESS_INDEX = int(os.getenv("PROCESS_INDEX", 0))
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", 0)) or None  # None: single shard, or Discord's recommendation
+
+if not 0 <= PROCESS_INDEX < PROCESS_COUNT:
+    raise RuntimeError(f"PROCESS_INDEX must be in [0, {PROCESS_COUNT}), got {PROCESS_INDEX}.")
+if PROCESS_COUNT > 1 and (SHARD_COUNT is None or SHARD_COUNT < PROCESS_COUNT):
+    raise RuntimeError("SHARD_COUNT must be set and >= PROCESS_COUNT when running several processes.")
+
+def is_sharded() -> bool:
+    return PROCESS_COUNT > 1 or SHARD_COUNT is not None
+
+def shard_ids() -> list[int] | None:
+    """Gateway shards this process connects, or None to let discord.py run them all."""
+    if SHARD_COUNT is None:
+        return None
+    return [s for s in range(SHARD_COUNT) if s % PROCESS_COUNT == PROCESS_INDEX]
+
+def owns_user(user_id) -> bool:
+    """Whether this process runs reminders/digests/seeding for the user. crc32, not hash(): stable across processes."""
+    if PROCESS_COUNT == 1:
+        return True
+    return zlib.crc32(str(user_id).encode()) % PROCESS_COUNT == PROCESS_INDEX
+
+def owned_token_slices(n: int) -> list[tuple[int, int]]:
+    """This process's n of n * PROCESS_COUNT token slices, for full-table scans split across processes."""
+    return [s for i, s in enumerate(token_slices(n * PROCESS_COUNT)) if i % PROCESS_COUNT == PROCESS_INDEX]
+
+def shard_for_guild(guild_id: int) -> int:
+    return (guild_id >> 22) % (SHARD_COUNT or 1)
+
+def owns_guild(guild_id: int) -> bool:
+    ids = shard_ids()
+    return ids is None or shard_for_guild(guild_id) in ids
+
+def slice_label() -> str:
+    return f"{PROCESS_INDEX}/{PROCESS_COUNT}"
+
+def make_bot(**kwargs) -> commands.Bot:
+    if not is_sharded():
+        return commands.Bot(**kwargs)
+    return commands.AutoShardedBot(shard_count=SHARD_COUNT, shard_ids=shard_ids(), **kwargs)
+
+def delivery_channel(bot: commands.Bot, channel_id: int):
+    """
+    Where to post reminders/digests. If the channel's guild is on one of our shards
+    the cached channel is used; otherwise a PartialMessageable, which posts over
+    REST without touching another process's gateway connection.
+    """
+    channel = bot.get_channel(channel_id)
+    if channel is not None:
+        return channel
+    return bot.get_partial_messageable(channel_id, type=discord.ChannelType.text)
+
+def owns_channel(bot: commands.Bot, channel_id: int) -> bool:
+    """True if the channel is visible on this process's shards."""
+    return bot.get_channel(channel_id) is not None
@@ -0,0 +1,44 @@
+# services/startup.py
+"""Phase timings for bot startup, reported once the bot is ready."""
+import time
+import logging
+
+from contextlib import contextmanager
+
+class StartupTimer:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.phases: list[tuple[str, float, float]] = []  # (name, start offset, duration)
+        self._open: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.phases.append((name, start - self.t0, end - start))
+
+    def begin(self, name: str):
+        """For phases that start and end in different places (e.g. gateway login)."""
+        self._open[name] = time.perf_counter()
+
+    def end(self, name: str):
+        start = self._open.pop(name, None)
+        if start is not None:
+            self.phases.append((name, start - self.t0, time.perf_counter() - start))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.t0
+
+    def report(self) -> str:
+        lines = [f"Startup finished in {self.elapsed() * 1000:.0f} ms:"]
+        for name, offset, duration in sorted(self.phases, key=lambda p: p[1]):
+            lines.append(f"  {name:<24} +{offset * 1000:7.0f} ms  {duration * 1000:7.0f} ms")
+        return "\n".join(lines)
+
+    def log(self):
+        logging.info(self.report())
+
+startup_timer = StartupTimer()
@@ -0,0 +1,188 @@
+# services/task_index.py
+"""
+Per-user in-memory task-name index for slash-command autocomplete and name lookup.
+
+Built lazily from tasks_by_user on a user's first lookup, kept in an LRU of
+TASK_INDEX_MAX_USERS users, and dropped whenever that user creates or deletes a
+task (the next lookup rebuilds it). Those drops are local to this process, so
+an index older than TASK_INDEX_TTL_SECONDS is refreshed in the background (it
+keeps answering until the new one is in), and an exact lookup that misses
+re-reads tasks_by_user before reporting "not found": a task created through
+another process is found right away. Matching is prefix first (bisect over the
+sorted lower-cased names), then trigram similarity for typos and infix matches,
+so a keystroke is answered from memory.
+"""
+import os
+import time
+import asyncio
+import logging
+
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from uuid import UUID
+from database.task_queries import get_all_user_tasks_aio
+
+TASK_INDEX_MAX_USERS = int(os.getenv("TASK_INDEX_MAX_USERS", 5000))
+TASK_INDEX_TTL_SECONDS = float(os.getenv("TASK_INDEX_TTL_SECONDS", 60))
+BUILD_WAIT_SECONDS = 1.5  # autocomplete must answer within Discord's 3s deadline
+MAX_CHOICES = 25          # Discord's autocomplete limit
+MIN_TRIGRAM_COVERAGE = 0.3
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+@dataclass
+class UserTaskIndex:
+    names: list[str] = field(default_factory=list)      # original spelling, sorted by lower()
+    lowers: list[str] = field(default_factory=list)
+    ids: list[UUID] = field(default_factory=list)
+    sizes: list[int] = field(default_factory=list)      # trigram count per name
+    grams: dict[str, list[int]] = field(default_factory=dict)
+    built_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def build(cls, tasks) -> "UserTaskIndex":
+        entries = sorted(
+            ((t.task_name, t.task_id) for t in tasks if t.task_name),
+            key=lambda e: e[0].lower(),
+        )
+        idx = cls(
+            names=[n for n, _ in entries],
+            lowers=[n.lower() for n, _ in entries],
+            ids=[tid for _, tid in entries],
+        )
+        for i, low in enumerate(idx.lowers):
+            grams = trigrams(low)
+            idx.sizes.append(len(grams))
+            for g in grams:
+                idx.grams.setdefault(g, []).append(i)
+        return idx
+
+    def exact(self, name: str) -> UUID | None:
+        low = name.strip().lower()
+        i = bisect_left(self.lowers, low)
+        if i < len(self.lowers) and self.lowers[i] == low:
+            return self.ids[i]
+        return None
+
+    def search(self, query: str, limit: int = MAX_CHOICES) -> list[tuple[str, UUID]]:
+        q = query.strip().lower()
+        if not q:
+            return list(zip(self.names, self.ids))[:limit]
+
+        picked: list[int] = []
+        i = bisect_left(self.lowers, q)
+        while i < len(self.lowers) and self.lowers[i].startswith(q) and len(picked) < limit:
+            picked.append(i)
+            i += 1
+
+        if len(picked) < limit:
+            q_grams = trigrams(q)
+            scores: dict[int, int] = {}
+            for g in q_grams:
+                for j in self.grams.get(g, ()):
+                    scores[j] = scores.get(j, 0) + 1
+            seen = set(picked)
+            # Rank by how much of the query a name covers (typos inside long names still
+            # match), then by Dice similarity so closer-length names win ties
+            ranked = sorted(
+                (j for j in scores if j not in seen),
+                key=lambda j: (-scores[j], -scores[j] / (len(q_grams) + self.sizes[j])),
+            )
+            for j in ranked:
+                if scores[j] / len(q_grams) < MIN_TRIGRAM_COVERAGE:
+                    break
+                picked.append(j)
+                if len(picked) >= limit:
+                    break
+        return [(self.names[j], self.ids[j]) for j in picked]
+
+_indexes: OrderedDict[str, UserTaskIndex] = OrderedDict()
+_building: dict[str, asyncio.Task] = {}
+_generation: dict[str, int] = {}
+_global_generation = 0  # bumped by invalidate_all
+
+def cached(user_id: str) -> UserTaskIndex | None:
+    idx = _indexes.get(user_id)
+    if idx is None:
+        return None
+    _indexes.move_to_end(user_id)
+    if time.monotonic() - idx.built_at > TASK_INDEX_TTL_SECONDS and user_id not in _building:
+        _start_build(user_id).add_done_callback(_log_refresh_failure)
+    return idx
+
+def _log_refresh_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logging.warning("Task index refresh failed: %s", task.exception())
+
+def _current_generation(user_id: str) -> tuple[int, int]:
+    return _global_generation, _generation.get(user_id, 0)
+
+async def _build(user_id: str, generation: tuple[int, int]) -> UserTaskIndex:
+    try:
+        idx = UserTaskIndex.build(await get_all_user_tasks_aio(user_id))
+        if _current_generation(user_id) != generation:
+            return idx  # invalidated mid-build: answer this caller, don't cache it
+        _indexes[user_id] = idx
+        while len(_indexes) > TASK_INDEX_MAX_USERS:
+            _indexes.popitem(last=False)
+        return idx
+    finally:
+        # An invalidation may already have started a newer build; leave that one registered
+        if _building.get(user_id) is asyncio.current_task():
+            del _building[user_id]
+
+def _start_build(user_id: str) -> asyncio.Task:
+    task = _building[user_id] = asyncio.create_task(_build(user_id, _current_generation(user_id)))
+    return task
+
+async def get_index(user_id: str) -> UserTaskIndex:
+    idx = cached(user_id)
+    if idx is not None:
+        return idx
+    # Concurrent keystrokes share one build
+    task = _building.get(user_id) or _start_build(user_id)
+    return await asyncio.shield(task)
+
+async def autocomplete(user_id: str, query: str, limit: int = MAX_CHOICES) -> list[tuple[str, UUID]]:
+    """Matches for a partial task name; only the user's first keystroke can wait on a build."""
+    try:
+        idx = await asyncio.wait_for(get_index(user_id), BUILD_WAIT_SECONDS)
+    except asyncio.TimeoutError:
+        return []
+    except Exception as exc:
+        logging.warning("Task index build for %s failed: %s", user_id, exc)
+        return []
+    return idx.search(query, limit)
+
+async def lookup(user_id: str, name: str) -> UUID | None:
+    """
+    task_id for an exact (case-insensitive) task name, or None. A miss on an index
+    built before this call re-reads tasks_by_user once before giving up.
+    """
+    asked = time.monotonic()
+    idx = await get_index(user_id)
+    task_id = idx.exact(name)
+    if task_id is None and idx.built_at < asked:
+        invalidate(user_id)
+        task_id = (await get_index(user_id)).exact(name)
+    return task_id
+
+def suggest(user_id: str, name: str, limit: int = 3) -> list[str]:
+    """Close names from an already-built index (never triggers a build)."""
+    idx = cached(user_id)
+    return [n for n, _ in idx.search(name, limit)] if idx else []
+
+def invalidate(user_id: str):
+    _indexes.pop(user_id, None)
+    _building.pop(user_id, None)  # an in-flight build may predate the change; don't share it
+    _generation[user_id] = _generation.get(user_id, 0) + 1
+
+def invalidate_all():
+    """Drop every index, including builds still in flight (e.g. after a restore)."""
+    global _global_generation
+    _global_generation += 1
+    _indexes.clear()
+    _building.clear()
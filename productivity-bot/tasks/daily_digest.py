@@ -1,36 +1,85 @@
 import os
+import time
+import asyncio
+import logging
 import discord
 
+from dataclasses import dataclass, field
 from datetime import datetime, time as dtime
 from zoneinfo import ZoneInfo
 from discord.ext import tasks
-from database.cassandra_client import session
-from database.task_queries import get_user_task
-from database.reminder_queries import fetch_due_today_user_task_ids
+from database.task_queries import get_all_user_tasks_aio
+from database.reminder_queries import fetch_due_today_user_task_ids_aio
+from services.sharding import owns_user, delivery_channel
+from services.leader import is_leader
+from services.rate_limit import RateLimiter
+from config import CHANNEL_ID
 from .daily_seed import start_seed_task
 
 TZ = ZoneInfo("America/Toronto")
-CHANNEL_ID = int(os.getenv("CHANNEL_ID"))
 DAILY_SENTINEL_DOW = -1
 
+# Pipeline tuning. Sends are the bottleneck by design: Discord allows ~5 messages
+# per 5s per channel, so everything upstream only needs to stay ahead of that.
+RESOLVE_CONCURRENCY = int(os.getenv("DIGEST_RESOLVE_CONCURRENCY", 16))
+SENDS_PER_SECOND = float(os.getenv("DIGEST_SENDS_PER_SECOND", 1.0))
+SEND_BURST = int(os.getenv("DIGEST_SEND_BURST", 5))
+QUEUE_SIZE = 64
+PROGRESS_EVERY = 50
+
 def today_dow_sunday0(now_local: datetime) -> int:
     return (now_local.weekday() + 1) % 7
 
-async def send_user_digest(bot: discord.Client, user_id: str, task_rows: list[object]):
-    if not CHANNEL_ID:
-        return
-    channel = bot.get_channel(CHANNEL_ID)
-    if not channel:
-        return
+@dataclass
+class DigestMetrics:
+    started: float = field(default_factory=time.perf_counter)
+    scanned: int = 0     # users with a reminder today (this slice)
+    resolved: int = 0    # users with at least one live task row
+    sent: int = 0
+    failed: int = 0
+    scan_seconds: float = 0.0
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        elapsed = self.elapsed()
+        rate = self.sent / elapsed if elapsed > 0 else 0.0
+        return (f"Daily digest: {self.sent}/{self.resolved} sent, {self.failed} failed, "
+                f"{self.scanned} scanned in {elapsed:.1f}s "
+                f"(scan {self.scan_seconds:.2f}s, {rate:.2f} digests/s)")
 
-    today_str = datetime.now(TZ).strftime("%Y-%m-%d")
+def _reminder_sort_key(r):
+    t = getattr(r, "reminder_time", None)
+    if t is None:
+        return (99, 99)
+    try:
+        return (t.hour, t.minute)
+    except Exception:
+        s = str(t)[:5]
+        try:
+            h, m = map(int, s.split(":"))
+            return (h, m)
+        except Exception:
+            return (99, 99)
+
+async def gather_task_rows_for_user(user_id: str, task_ids: set) -> list[object]:
+    """
+    Fetch the tasks_by_user rows for display (name, time, type).
+    One partition read per user instead of one point read per task.
+    """
+    out = [r for r in await get_all_user_tasks_aio(user_id) if r.task_id in task_ids]
+    out.sort(key=_reminder_sort_key)
+    return out
+
+def render_digest(user_id: str, task_rows: list[object], today_str: str) -> tuple[str, discord.Embed]:
     embed = discord.Embed(
         title=f"Today's Tasks — {today_str}",
         description="Here are your tasks scheduled for today:",
         color=discord.Color.blurple(),
     )
 
-    for r in task_rows:
+    for r in task_rows[:25]:  # embed field limit
         time_str = "N/A"
         if getattr(r, "reminder_time", None) is not None:
             time_str = str(r.reminder_time)[:5]  # "HH:MM"
@@ -41,53 +90,95 @@ async def send_user_digest(bot: discord.Client, user_id: str, task_rows: list[ob
             inline=False
         )
 
-    try:
-        user = await bot.fetch_user(int(user_id))
-        mention = user.mention if user else f"<@{user_id}>"
-    except Exception:
-        mention = f"<@{user_id}>"
-
-    await channel.send(content=f"{mention} — your daily task digest:", embed=embed)
+    # A raw mention renders the same as user.mention and saves a fetch_user round trip
+    return f"<@{user_id}> — your daily task digest:", embed
 
-async def gather_task_rows_for_user(user_id: str, task_ids: set) -> list[object]:
+async def run_digest_pipeline(bot: discord.Client, now_local: datetime) -> DigestMetrics:
     """
-    Fetch the tasks_by_user rows for display (name, time, type).
+    scan -> resolve (RESOLVE_CONCURRENCY workers) -> render -> send (rate limited),
+    joined by bounded queues so a slow stage applies backpressure instead of
+    buffering every user in memory.
     """
-    out = []
-    for tid in task_ids:
-        row = get_user_task(user_id, tid)
-        if row:
-            out.append(row)
-    def _key(r):
-        t = getattr(r, "reminder_time", None)
-        if t is None:
-            return (99, 99)
-        try:
-            return (t.hour, t.minute) 
-        except Exception:
-            s = str(t)[:5]
+    metrics = DigestMetrics()
+    channel = delivery_channel(bot, CHANNEL_ID)
+    limiter = RateLimiter(SENDS_PER_SECOND, SEND_BURST)
+    today_str = now_local.strftime("%Y-%m-%d")
+
+    resolve_q: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+    render_q: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+    send_q: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+
+    async def produce():
+        by_user = await fetch_due_today_user_task_ids_aio(now_local)
+        metrics.scan_seconds = metrics.elapsed()
+        for user_id, task_ids in by_user.items():
+            if task_ids and owns_user(user_id):
+                metrics.scanned += 1
+                await resolve_q.put((user_id, task_ids))
+
+    async def resolve():
+        while True:
+            user_id, task_ids = await resolve_q.get()
             try:
-                h, m = map(int, s.split(":"))
-                return (h, m)
-            except Exception:
-                return (99, 99)
-    out.sort(key=_key)
-    return out
+                rows = await gather_task_rows_for_user(user_id, task_ids)
+                if rows:
+                    metrics.resolved += 1
+                    await render_q.put((user_id, rows))
+            except Exception as exc:
+                metrics.failed += 1
+                logging.error("Digest: resolving tasks for %s failed: %s", user_id, exc)
+            finally:
+                resolve_q.task_done()
+
+    async def render():
+        while True:
+            user_id, rows = await render_q.get()
+            try:
+                await send_q.put((user_id, *render_digest(user_id, rows, today_str)))
+            except Exception as exc:
+                metrics.failed += 1
+                logging.error("Digest: rendering for %s failed: %s", user_id, exc)
+            finally:
+                render_q.task_done()
+
+    async def send():
+        while True:
+            user_id, content, embed = await send_q.get()
+            try:
+                await limiter.acquire()
+                await channel.send(content=content, embed=embed)
+                metrics.sent += 1
+                if metrics.sent % PROGRESS_EVERY == 0:
+                    logging.info("Daily digest progress: %d sent, %d queued, %.1fs elapsed.",
+                                 metrics.sent, send_q.qsize() + render_q.qsize() + resolve_q.qsize(),
+                                 metrics.elapsed())
+            except Exception as exc:
+                metrics.failed += 1
+                logging.error("Digest: sending to %s failed: %s", user_id, exc)
+            finally:
+                send_q.task_done()
+
+    workers = [asyncio.create_task(resolve()) for _ in range(RESOLVE_CONCURRENCY)]
+    workers += [asyncio.create_task(render()), asyncio.create_task(send())]
+    try:
+        await produce()
+        # Drain stage by stage; each join returns once everything upstream has flowed through
+        await resolve_q.join()
+        await render_q.join()
+        await send_q.join()
+    finally:
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    return metrics
 
 # Schedule at 6am
 @tasks.loop(time=dtime(hour=6, tzinfo=TZ))
 async def daily_task_digest():
-    bot = daily_task_digest.bot
-    now_local = datetime.now(TZ)
-
-    by_user_taskids = fetch_due_today_user_task_ids(now_local)
-
-    for user_id, task_ids in by_user_taskids.items():
-        if not task_ids:
-            continue
-        task_rows = await gather_task_rows_for_user(user_id, task_ids)
-        if task_rows:
-            await send_user_digest(bot, user_id, task_rows)
+    if not is_leader("daily_task_digest") or not CHANNEL_ID:
+        return
+    metrics = await run_digest_pipeline(daily_task_digest.bot, datetime.now(TZ))
+    logging.info(metrics.summary())
 
 def start_daily_digest(bot: discord.Client | discord.ext.commands.Bot):
     start_seed_task(bot)
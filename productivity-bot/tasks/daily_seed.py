@@ -2,13 +2,20 @@ from datetime import time as dtime
 from zoneinfo import ZoneInfo
 from discord.ext import tasks
 from database.daily_remaining_queries import seed_today_from_reminders
+from database.streak_queries import finalize_streaks
+from services.sharding import owns_user
+from services.leader import is_leader
 
 TZ = ZoneInfo("America/Toronto")
 
 @tasks.loop(time=dtime(hour=6, tzinfo=TZ))
 async def seed_daily_lists():
-    seed_today_from_reminders()
+    if not is_leader("seed_daily_lists"):
+        return
+    seed_today_from_reminders(user_filter=owns_user)
     print("Seeded today's daily task lists.")
+    closed = finalize_streaks(user_filter=owns_user)
+    print(f"Closed {closed} broken streak(s).")
 
 def start_seed_task(bot):
     seed_daily_lists.bot = bot
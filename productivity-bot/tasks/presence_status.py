@@ -0,0 +1,79 @@
+import os
+import time
+import asyncio
+import logging
+import discord
+
+from datetime import datetime, timezone
+from discord.ext import tasks
+from database.presence_index import list_presence, warm_presence_index
+from services.sharding import PROCESS_COUNT, owns_channel
+from services.leader import is_leader
+from config import CHANNEL_ID
+
+PRESENCE_STATUS_MINUTES = int(os.getenv("PRESENCE_STATUS_MINUTES", 15))
+# Multi-process only: how stale other processes' starts/stops may be in the status
+PRESENCE_REWARM_MINUTES = max(int(os.getenv("PRESENCE_REWARM_MINUTES", 60)), PRESENCE_STATUS_MINUTES)
+
+_status_message: discord.Message | None = None
+_rewarmed_at: float | None = None
+
+def format_elapsed(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m"
+
+def presence_lines(now: datetime | None = None) -> list[str]:
+    """One line per active user, straight from the in-memory presence index."""
+    now = now or datetime.now(timezone.utc)
+    lines = []
+    for p in list_presence():
+        elapsed = format_elapsed(max((now - p.start_time).total_seconds(), 0.0))
+        lines.append(f"• <@{p.user_id}> — **{p.task_name or p.task_id}** for {elapsed}")
+    return lines
+
+def render_status() -> str:
+    lines = presence_lines()
+    if not lines:
+        return "🟢 Nobody is tracking a task right now."
+    content = f"🟢 **{len(lines)}** working right now:\n" + "\n".join(lines)
+    if len(content) > 2000:
+        content = content[:1990] + "\n…"
+    return content
+
+@tasks.loop(minutes=max(PRESENCE_STATUS_MINUTES, 1))
+async def post_presence_status():
+    """Keep a single status message in the channel up to date (edit, don't spam)."""
+    global _status_message, _rewarmed_at
+    if not is_leader("presence_status"):
+        return
+    bot = post_presence_status.bot
+    if PROCESS_COUNT > 1:
+        # Only the process whose shard hosts the channel posts. Other processes
+        # update presence too, so re-read it now and then rather than trust local
+        # writes only; each re-read is a full scan, so not every tick.
+        if not owns_channel(bot, CHANNEL_ID):
+            return
+        if _rewarmed_at is None or time.monotonic() - _rewarmed_at >= PRESENCE_REWARM_MINUTES * 60:
+            await asyncio.to_thread(warm_presence_index)
+            _rewarmed_at = time.monotonic()
+    content = render_status()
+
+    if _status_message is not None:
+        try:
+            await _status_message.edit(content=content, allowed_mentions=discord.AllowedMentions.none())
+            return
+        except discord.HTTPException:
+            _status_message = None
+
+    channel = bot.get_channel(CHANNEL_ID)
+    if not channel:
+        return
+    _status_message = await channel.send(content, allowed_mentions=discord.AllowedMentions.none())
+
+def start_presence_status(bot):
+    if PRESENCE_STATUS_MINUTES <= 0:
+        logging.info("Presence status message disabled.")
+        return
+    post_presence_status.bot = bot
+    post_presence_status.start()
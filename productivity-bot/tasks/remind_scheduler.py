@@ -1,86 +1,105 @@
 import os
+import asyncio
 import logging
 import pytz
 
-from pathlib import Path
-from dotenv import load_dotenv, find_dotenv
 from discord.ext import tasks
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone, time as dtime
 from database.reminder_queries import get_daily_window, get_weekly_window
 from database.task_queries import get_user_task
+from database.cursor_queries import get_cursor, set_cursor
+from services.sharding import owns_user, delivery_channel, slice_label
+from services.leader import is_leader
+from config import CHANNEL_ID
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-ENV_FILE = ".env"
-
-# Load env
-candidates = [BASE_DIR / ENV_FILE, BASE_DIR.parent / ENV_FILE]
-loaded = False
-for p in candidates:
-    if p.is_file():
-        load_dotenv(p)
-        loaded = True
-        break
-if not loaded:
-    dp = find_dotenv(usecwd=True)
-    if dp:
-        load_dotenv(dp)
-        loaded = True
-
-CHANNEL_ID = int(os.getenv("CHANNEL_ID"))
-
-sent_recently = {}
-DEDUP_WINDOW_MINUTES = 15
 LOCAL_TZ = pytz.timezone("America/Toronto")
+# After a long outage, fire at most this far back instead of flooding the channel
+MAX_CATCHUP_MINUTES = int(os.getenv("REMINDER_MAX_CATCHUP_MINUTES", 60))
+# Tick exactly on every wall-clock minute (UTC, so DST can't shift the grid)
+EVERY_MINUTE = [dtime(hour=h, minute=m, tzinfo=timezone.utc) for h in range(24) for m in range(60)]
+
+def cursor_name() -> str:
+    return f"reminders@{slice_label()}"
 
 async def ping_user(bot, user_id, task_name):
     user = await bot.fetch_user(int(user_id))
     if not user:
         return
 
-    channel = bot.get_channel(CHANNEL_ID)
+    channel = delivery_channel(bot, CHANNEL_ID)
 
     content = f"{user.mention} ⏰ It's time for your task: **{task_name}**!"
 
     await channel.send(content=content)
 
-async def check_reminders(bot):
-    logging.info("Running reminder scheduler")
-    now = datetime.now(LOCAL_TZ)
-    current_hour = now.hour
-    current_minute = now.minute
-    current_day_of_week = (now.weekday() + 1) % 7
-
-    cutoff = now - timedelta(minutes=DEDUP_WINDOW_MINUTES)
-    for key, last_sent in list(sent_recently.items()):
-        if last_sent < cutoff:
-            del sent_recently[key]
+def minute_blocks(after: datetime, up_to: datetime) -> list[tuple[int, int, int, int, datetime]]:
+    """
+    Split the minutes in (after, up_to] into runs sharing one local (date, hour), i.e.
+    one reminders_by_time partition. Returns (dow, hour, first_minute, last_minute,
+    last_instant_utc) per run, oldest first.
+    """
+    blocks = []
+    minute = after + timedelta(minutes=1)
+    while minute <= up_to:
+        local = minute.astimezone(LOCAL_TZ)
+        key = ((local.weekday() + 1) % 7, local.hour)
+        if blocks and blocks[-1][:2] == key and blocks[-1][3] == local.minute - 1:
+            dow, hour, first, _, _ = blocks[-1]
+            blocks[-1] = (dow, hour, first, local.minute, minute)
+        else:
+            blocks.append((key[0], key[1], local.minute, local.minute, minute))
+        minute += timedelta(minutes=1)
+    return blocks
 
-    daily_reminders = get_daily_window(current_hour, current_minute, current_minute + 5)
-    print("reminders: ", daily_reminders)
-    for reminder in daily_reminders:
-        print("info: ", reminder.user_id, reminder.task_id)
-        key = (reminder.user_id, reminder.task_id)
-        if key in sent_recently:
-            print("skipping current reminder")
+def due_in_block(dow: int, hour: int, first_minute: int, last_minute: int) -> list[tuple[str, str]]:
+    """(user_id, task_name) for this process's reminders in one minute run. Blocking."""
+    rows = get_daily_window(hour, first_minute, last_minute + 1)
+    rows += get_weekly_window(dow, hour, first_minute, last_minute + 1)
+    due = []
+    for reminder in rows:
+        if not owns_user(reminder.user_id):
             continue
         task = get_user_task(reminder.user_id, reminder.task_id)
-        if task:
-            print("pinging user")
-            await ping_user(bot, reminder.user_id, task.task_name)
-            sent_recently[key] = now
+        if task:  # index rows without a task are orphans; skip them
+            due.append((reminder.user_id, task.task_name))
+    return due
 
-    weekly_reminders = get_weekly_window(current_day_of_week, current_hour, current_minute, current_minute + 5)
-    for reminder in weekly_reminders:
-        key = (reminder.user_id, reminder.task_id)
-        if key in sent_recently:
-            continue
-        task = get_user_task(reminder.user_id, reminder.task_id)
-        if task:
-            await ping_user(bot, reminder.user_id, task.task_name)
-            sent_recently[key] = now
+async def check_reminders(bot):
+    """
+    Fire every reminder scheduled after the stored cursor, up to the current minute,
+    then advance the cursor. Each minute is read exactly once, even across hour/day
+    boundaries, stalls and restarts.
+    """
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    name = cursor_name()
+    last = await asyncio.to_thread(get_cursor, name)
+    if last is None:
+        last = now - timedelta(minutes=1)  # first run: just this minute
+    if last >= now:
+        return
+
+    earliest = now - timedelta(minutes=MAX_CATCHUP_MINUTES)
+    if last < earliest:
+        logging.warning("Reminder cursor %s is %s behind; skipping to the last %d minutes.",
+                        name, now - last, MAX_CATCHUP_MINUTES)
+        last = earliest
 
-@tasks.loop(minutes=1)
+    for dow, hour, first_minute, last_minute, block_end in minute_blocks(last, now):
+        due = await asyncio.to_thread(due_in_block, dow, hour, first_minute, last_minute)
+        for user_id, task_name in due:
+            try:
+                await ping_user(bot, user_id, task_name)
+            except Exception as exc:
+                logging.error("Reminder for %s (%s) failed: %s", user_id, task_name, exc)
+        await asyncio.to_thread(set_cursor, name, block_end)
+
+    if now - last > timedelta(minutes=1):
+        logging.info("Reminder scheduler caught up %d minute(s).", int((now - last).total_seconds() // 60))
+
+@tasks.loop(time=EVERY_MINUTE)
 async def monitor_reminders():
+    if not is_leader("monitor_reminders"):
+        return
     await check_reminders(monitor_reminders.bot)
 
 def start_monitor(bot):
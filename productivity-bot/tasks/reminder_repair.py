@@ -0,0 +1,34 @@
+import os
+import logging
+
+from datetime import time as dtime
+from zoneinfo import ZoneInfo
+from discord.ext import tasks
+from services.reminder_repair import repair_reminder_index, REPAIR_SLICES
+from services.sharding import owned_token_slices
+from services.leader import is_leader
+
+TZ = ZoneInfo("America/Toronto")
+REMINDER_REPAIR_FIX = os.getenv("REMINDER_REPAIR_FIX", "1") in ("1", "true", "yes")
+
+# After the 3am session archive, before the 6am digest/seed jobs
+@tasks.loop(time=dtime(hour=4, tzinfo=TZ))
+async def reminder_repair():
+    if not is_leader("reminder_repair"):
+        return
+    try:
+        report = await repair_reminder_index(fix=REMINDER_REPAIR_FIX, slices=owned_token_slices(REPAIR_SLICES))
+    except Exception as exc:
+        # A failed sweep is retried tomorrow; don't let it stop the loop
+        logging.error("Reminder repair failed: %s", exc)
+        return
+    logging.info(
+        "Reminder repair: scanned %d task(s) and %d index row(s); %d orphan, %d stale, %d missing; %d fixed, %d failed.",
+        report.tasks_scanned, report.index_rows_scanned, len(report.orphans), len(report.stale),
+        len(report.missing), report.fixed, report.failed,
+    )
+
+def start_reminder_repair(bot):
+    reminder_repair.bot = bot
+    reminder_repair.start()
+    print("Reminder index repair scheduled (4am America/Toronto).")
@@ -0,0 +1,27 @@
+import asyncio
+import logging
+
+from datetime import time as dtime
+from zoneinfo import ZoneInfo
+from discord.ext import tasks
+from database.session_archive_queries import archive_old_sessions, SESSION_ARCHIVE_AFTER_DAYS
+from services.sharding import owns_user
+from services.leader import is_leader
+
+TZ = ZoneInfo("America/Toronto")
+
+# Nightly, well clear of the 6am digest/seed jobs
+@tasks.loop(time=dtime(hour=3, tzinfo=TZ))
+async def session_archive():
+    if not is_leader("session_archive"):
+        return
+    stats = await asyncio.to_thread(archive_old_sessions, owns_user)
+    logging.info(
+        "Session archive: rolled %d session(s) into %d monthly summar(ies) across %d task(s) (older than %dd).",
+        stats["sessions"], stats["months"], stats["tasks"], SESSION_ARCHIVE_AFTER_DAYS,
+    )
+
+def start_session_archive(bot):
+    session_archive.bot = bot
+    session_archive.start()
+    print("Session archival scheduled (3am America/Toronto).")